@@ -223,7 +223,7 @@ async def check_providers_health() -> Dict[str, bool]:
             "cerebras": false
         }
     """
-    return LLMProviderFactory.health_check_all()
+    return await LLMProviderFactory.ahealth_check_all()
 
 
 @router.get("/health/{provider_id}", response_model=ProviderHealthResponse)
@@ -251,7 +251,7 @@ async def check_provider_health(provider_id: str) -> ProviderHealthResponse:
     
     try:
         provider = LLMProviderFactory.get_provider(provider_id)
-        healthy = provider.health_check()
+        healthy = await provider.ahealth_check()
         latency_ms = (time.time() - t0) * 1000
     except Exception:
         healthy = False
@@ -289,7 +289,7 @@ async def test_provider(request: LLMTestRequest) -> LLMTestResponse:
     try:
         provider = LLMProviderFactory.get_provider(request.provider)
         
-        result = provider.generate(
+        result = await provider.agenerate(
             prompt=request.prompt,
             model=request.model,
             system_prompt=request.system_prompt,
@@ -352,7 +352,8 @@ async def get_available_providers() -> List[str]:
     Returns:
         Sağlıklı provider ID'leri
     """
-    return LLMProviderFactory.get_available_providers()
+    health = await LLMProviderFactory.ahealth_check_all()
+    return [pid for pid, healthy in health.items() if healthy]
 
 
 # ============================================================================
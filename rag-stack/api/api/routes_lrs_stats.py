@@ -14,15 +14,16 @@ router = APIRouter(
 
 
 @router.get("/stats/general")
-async def get_lrs_general_stats() -> Dict[str, Any]:
+async def get_lrs_general_stats(exact: bool = False) -> Dict[str, Any]:
     """
     LRS için genel istatistik endpoint'i.
 
     LRSQueryService.get_general_statistics ile Mongo'dan gerçek
     değerleri okur ve Streamlit arayüzünün beklediği formatta döner.
+    exact=true → uniqueVehicles HLL tahmini yerine kesin sayılır.
     """
     service = LRSQueryService()
-    stats = service.get_general_statistics()
+    stats = service.get_general_statistics(exact=exact)
 
     return {
         "status": "ok",
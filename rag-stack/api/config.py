@@ -42,10 +42,63 @@ LRS_MONGO_PORT = int(os.getenv("LRS_MONGO_PORT", 27017))
 LRS_MONGO_DB = os.getenv("LRS_MONGO_DB") or os.getenv("LRS_MONGO_DB_NAME", "learninglocker")
 LRS_MONGO_COLLECTION = os.getenv("LRS_MONGO_COLLECTION", "statements")
 
-mongo_client = MongoClient(f"mongodb://{LRS_MONGO_HOST}:{LRS_MONGO_PORT}")
+LRS_MONGO_URI = f"mongodb://{LRS_MONGO_HOST}:{LRS_MONGO_PORT}"
+
+mongo_client = MongoClient(LRS_MONGO_URI)
 lrs_db = mongo_client[LRS_MONGO_DB]
 lrs_statements = lrs_db[LRS_MONGO_COLLECTION]
 
+# Atlas Search index adı (materialName_contains için). Boş ise (Atlas dışı
+# kurulumlar) case-insensitive $regex fallback'i kullanılır. Index Türkçe
+# analyzer ile (diakritik katlama) object.definition.name.tr-TR ve
+# statement.object.definition.name.tr-TR alanlarını kapsamalıdır.
+LRS_ATLAS_SEARCH_INDEX = os.getenv("LRS_ATLAS_SEARCH_INDEX", "").strip()
+
+# Statement'lara materialize edilmiş top-level operationDateISO (Date) alanı
+# kullanılsın mı? `python -m services.lrs_materialized` backfill'i ve index'i
+# kurulduktan sonra açılır; kapalıyken tarih filtreleri $getField + $toDate
+# ile her dokümanda yeniden hesaplanır.
+LRS_OPDATE_FIELD_ENABLED = os.getenv("LRS_OPDATE_FIELD", "false").lower() in ("1", "true", "yes")
+
+# hasFault filtresi materialize edilmiş faultCodeStr alanı (partial index)
+# üzerinden mi çalışsın? Aynı migration ile kurulur; kapalıyken $expr kullanılır.
+LRS_FAULT_FIELD_ENABLED = os.getenv("LRS_FAULT_FIELD", "false").lower() in ("1", "true", "yes")
+
+# vehicleType / vehicleModel filtre ve group_by'ları materialize edilmiş
+# vehicleTypeStr / vehicleModelStr alanları (compound index) üzerinden mi çalışsın?
+LRS_VEHICLE_FIELDS_ENABLED = os.getenv("LRS_VEHICLE_FIELDS", "false").lower() in ("1", "true", "yes")
+
+# Bakım/onarım verb filtresi materialize edilmiş verbKind alanı (verb.id'nin
+# son parçası, compound index) üzerinden mi çalışsın? Kapalıyken verb.id /
+# statement.verb.id üzerinde regex $or kullanılır.
+LRS_VERB_KIND_FIELD_ENABLED = os.getenv("LRS_VERB_KIND_FIELD", "false").lower() in ("1", "true", "yes")
+
+# Araç ID filtresi (top entities vehicle_filter) materialize edilmiş vehicleIds
+# dizisi (actor adı / vehicleId / vehicleNo → son segment, küçük harf; multikey
+# index) üzerinden eşitlikle mi çalışsın? Kapalıyken regex $or kullanılır.
+LRS_VEHICLE_ID_FIELD_ENABLED = os.getenv("LRS_VEHICLE_ID_FIELD", "false").lower() in ("1", "true", "yes")
+
+# Malzeme adı / araç modeli filtreleri materialize edilmiş, normalize_tr ile
+# normalize edilmiş materialNameNorm / vehicleModelNorm alanları (verbKind ile
+# compound index) üzerinden mi çalışsın? Kapalıyken ham alanlarda case-insensitive
+# regex, model filtresi ise Python'da uygulanır.
+LRS_NORM_FIELDS_ENABLED = os.getenv("LRS_NORM_FIELDS", "false").lower() in ("1", "true", "yes")
+
+# Genel istatistiklerde uniqueVehicles, `python -m services.lrs_vehicle_hll`
+# ile kurulan HyperLogLog sketch'ten (yaklaşık, ~%1.6) mi okunsun?
+LRS_VEHICLE_HLL_ENABLED = os.getenv("LRS_VEHICLE_HLL", "false").lower() in ("1", "true", "yes")
+
+# Materialize maintainer'ı eksik alanlı kayıtları (change stream kesintisi,
+# app kapalıyken gelen insert'ler) kaç saniyede bir backfill etsin? Her
+# (yeniden) başlangıçta da bir kez çalışır; 0 → yalnızca başlangıçta.
+LRS_MATERIALIZE_BACKFILL_INTERVAL = float(os.getenv("LRS_MATERIALIZE_BACKFILL_INTERVAL", "3600"))
+
+# Python tarafında sayım yapan büyük taramalar (ör. model filtreli top entities)
+# kaç process'e bölünsün? 1 → paralel yok. Yalnızca koleksiyon
+# LRS_PARALLEL_MIN_DOCS'tan büyükse devreye girer.
+LRS_PARALLEL_SHARDS = max(1, int(os.getenv("LRS_PARALLEL_SHARDS", "1")))
+LRS_PARALLEL_MIN_DOCS = int(os.getenv("LRS_PARALLEL_MIN_DOCS", "1000000"))
+
 # ============================================================================
 # QDRANT CONFIG
 # ============================================================================
@@ -112,6 +165,55 @@ DEFAULT_LLM_MODEL = os.getenv("DEFAULT_LLM_MODEL", "gemma2:2b")
 DEFAULT_LLM_ROLE = os.getenv("DEFAULT_LLM_ROLE", "servis_analisti")
 DEFAULT_LLM_BEHAVIOR = os.getenv("DEFAULT_LLM_BEHAVIOR", "balanced")
 
+# ============================================================================
+# 🆕 LLM RESPONSE CACHE
+# ============================================================================
+
+# Semantik cache: benzer (system_prompt + prompt) istekleri aynı model için
+# tekrar API'ye gitmeden yanıtlar. LRS verisi içeren promptlarda sayılar
+# farklı olsa da benzerlik yüksek çıkabileceği için varsayılan olarak kapalı.
+LLM_SEMANTIC_CACHE_ENABLED = os.getenv("LLM_SEMANTIC_CACHE", "false").lower() in ("1", "true", "yes")
+LLM_SEMANTIC_CACHE_THRESHOLD = float(os.getenv("LLM_SEMANTIC_CACHE_THRESHOLD", 0.92))
+LLM_SEMANTIC_CACHE_SIZE = int(os.getenv("LLM_SEMANTIC_CACHE_SIZE", 512))
+
+# Exact-match cache: sadece temperature == 0 (deterministik) istekler için.
+LLM_EXACT_CACHE_SIZE = int(os.getenv("LLM_EXACT_CACHE_SIZE", 2048))
+LLM_EXACT_CACHE_TTL = float(os.getenv("LLM_EXACT_CACHE_TTL", 3600))
+
+# ============================================================================
+# 🆕 LLM MULTIPLEX (FAILOVER)
+# ============================================================================
+
+# "multiplex" provider'ı aynı açık model ailesini sunan OpenAI uyumlu
+# provider'lar arasında ağırlıklı dağıtım + 429/5xx'te failover yapar.
+# Format: "provider:model:ağırlık,..." (ağırlık opsiyonel, varsayılan 1)
+_MULTIPLEX_POOL_DEFAULT = (
+    "groq:llama-3.3-70b-versatile:1,"
+    "cerebras:llama-3.3-70b:1,"
+    "openrouter:meta-llama/llama-3.3-70b-instruct:0.5"
+)
+
+
+def _parse_multiplex_pool(spec: str):
+    pool = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        provider_id, _, rest = item.partition(":")
+        model, sep, weight = rest.rpartition(":")
+        try:
+            weight = float(weight) if sep else 1.0
+        except ValueError:
+            # Model adında ":" var, ağırlık verilmemiş (ör. "llama3.1:8b")
+            model, weight = rest, 1.0
+        pool.append((provider_id, model or rest, weight))
+    return pool
+
+
+LLM_MULTIPLEX_POOL = _parse_multiplex_pool(os.getenv("LLM_MULTIPLEX_POOL", _MULTIPLEX_POOL_DEFAULT))
+LLM_MULTIPLEX_COOLDOWN = float(os.getenv("LLM_MULTIPLEX_COOLDOWN", 30))
+
 # ============================================================================
 # 🆕 PROVIDER MODEL CATALOGS
 # ============================================================================
@@ -200,6 +302,7 @@ PROVIDER_DEFAULTS = {
     "google": "gemini-2.5-flash",
     "cerebras": "llama-3.3-70b",
     "mistral": "mistral-large-latest",
+    "multiplex": "auto",
 }
 
 # ============================================================================
@@ -255,6 +358,14 @@ PROVIDERS_CONFIG = {
         "pricing": "Rekabetçi fiyatlandırma",
         "latency": "~150ms",
     },
+    "multiplex": {
+        "id": "multiplex",
+        "name": "Multiplex (Failover)",
+        "icon": "🔀",
+        "description": "Groq/Cerebras/OpenRouter arasında gecikmeye göre dağıtım ve otomatik failover",
+        "pricing": "Seçilen provider'a göre",
+        "latency": "En hızlı sağlıklı provider",
+    },
 }
 
 # ============================================================================
@@ -307,6 +418,18 @@ __all__ = [
     "DEBUG",
     # MongoDB
     "lrs_statements",
+    "LRS_ATLAS_SEARCH_INDEX",
+    "LRS_OPDATE_FIELD_ENABLED",
+    "LRS_FAULT_FIELD_ENABLED",
+    "LRS_VEHICLE_FIELDS_ENABLED",
+    "LRS_VERB_KIND_FIELD_ENABLED",
+    "LRS_VEHICLE_ID_FIELD_ENABLED",
+    "LRS_NORM_FIELDS_ENABLED",
+    "LRS_VEHICLE_HLL_ENABLED",
+    "LRS_MATERIALIZE_BACKFILL_INTERVAL",
+    "LRS_PARALLEL_SHARDS",
+    "LRS_PARALLEL_MIN_DOCS",
+    "LRS_MONGO_URI",
     "lrs_db",
     "mongo_client",
     # Qdrant
@@ -345,4 +468,13 @@ __all__ = [
     "PROVIDERS_CONFIG",
     "LLM_ROLES",
     "LLM_BEHAVIORS",
+    # 🆕 LLM Response Cache
+    "LLM_SEMANTIC_CACHE_ENABLED",
+    "LLM_SEMANTIC_CACHE_THRESHOLD",
+    "LLM_SEMANTIC_CACHE_SIZE",
+    "LLM_EXACT_CACHE_SIZE",
+    "LLM_EXACT_CACHE_TTL",
+    # 🆕 LLM Multiplex
+    "LLM_MULTIPLEX_POOL",
+    "LLM_MULTIPLEX_COOLDOWN",
 ]
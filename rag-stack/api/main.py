@@ -72,6 +72,41 @@ app.include_router(email_router)
 app.include_router(llm_router)
 
 
+# ============================================================================
+# Yaşam Döngüsü
+# ============================================================================
+
+
+@app.on_event("startup")
+async def start_background_tasks():
+    """
+    Arka plan görevlerini başlatır (email log flusher, LLM bağlantı ısıtma,
+    materialize alan / HLL maintainer'ı).
+    """
+    import asyncio
+    from services.email_service import start_log_flusher
+    from services.llm_providers import LLMProviderFactory
+    from services.lrs_materialized import start_materialize_maintainer
+    start_log_flusher()
+    # Açık materialize / HLL flag'i yoksa no-op
+    start_materialize_maintainer()
+    # Provider host'larına TLS bağlantılarını arka planda aç; startup'ı bekletmez
+    app.state.llm_prewarm = asyncio.create_task(LLMProviderFactory.prewarm())
+
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    """
+    Kuyrukta kalan email loglarını yazar, flusher'ı ve shard sayım havuzunu durdurur.
+    """
+    from services.email_service import stop_log_flusher
+    from services.lrs_materialized import stop_materialize_maintainer
+    from services.lrs_parallel import shutdown_shard_pool
+    await stop_log_flusher()
+    stop_materialize_maintainer()
+    shutdown_shard_pool()
+
+
 # ============================================================================
 # Basit Bilgi / Sağlık Endpoint'leri
 # ============================================================================
@@ -145,7 +180,7 @@ async def health():
     # 🆕 LLM Provider kontrolü (5 provider)
     try:
         from services.llm_providers import LLMProviderFactory
-        provider_health = LLMProviderFactory.health_check_all()
+        provider_health = await LLMProviderFactory.ahealth_check_all()
         details["llm_providers"] = provider_health
 
         # Eski ollama alanı için geriye dönük uyumluluk
@@ -207,7 +242,7 @@ async def llm_summary():
         from services.llm_providers import LLMProviderFactory
         from config import PROVIDERS_CONFIG
         
-        health = LLMProviderFactory.health_check_all()
+        health = await LLMProviderFactory.ahealth_check_all()
         
         summary = []
         for provider_id, config in PROVIDERS_CONFIG.items():
@@ -13,11 +13,17 @@ Backend sadece HTML oluşturur ve n8n webhook'u çağırır.
 from __future__ import annotations
 import os
 import re
+import html
+import asyncio
 import httpx
+import orjson
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Tuple, Union
 from bson import ObjectId
 import logging
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter
 
 logger = logging.getLogger(__name__)
 
@@ -43,10 +49,99 @@ except:
     logger.warning("MongoDB bağlantısı yok, sadece instant email çalışacak")
 
 
+# ============================================================================
+# LOG KUYRUĞU - MongoDB log yazımı request path'inden çıkarıldı
+# ============================================================================
+
+_LOG_BATCH_SIZE = 100
+# MongoDB takılırsa loglar bellekte sınırsız birikmesin; dolunca yeni kayıt düşer
+_LOG_QUEUE_MAXSIZE = 10_000
+_log_queue: asyncio.Queue = asyncio.Queue(maxsize=_LOG_QUEUE_MAXSIZE)
+_log_flusher_task: Optional[asyncio.Task] = None
+
+
+def _drain_log_queue(limit: int = _LOG_BATCH_SIZE) -> List[Dict[str, Any]]:
+    """Kuyrukta bekleyen log dokümanlarını (en fazla limit kadar) al."""
+    docs = []
+    while not _log_queue.empty() and len(docs) < limit:
+        docs.append(_log_queue.get_nowait())
+    return docs
+
+
+async def _write_logs(docs: List[Dict[str, Any]]) -> None:
+    """Blocking insert_many çağrısını executor'da çalıştır."""
+    try:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, logs_collection.insert_many, docs)
+    except Exception as e:
+        logger.warning(f"Log kaydedilemedi ({len(docs)} kayıt): {e}")
+
+
+async def _log_flusher() -> None:
+    """Kuyruktaki logları toplu (insert_many) olarak MongoDB'ye yazar."""
+    while True:
+        docs = [await _log_queue.get()]
+        docs.extend(_drain_log_queue(_LOG_BATCH_SIZE - 1))
+        # Kuyruktan alınmış batch iptalde kaybolmasın: yazım bitmeden çıkılmaz
+        write = asyncio.ensure_future(_write_logs(docs))
+        try:
+            await asyncio.shield(write)
+        except asyncio.CancelledError:
+            await write
+            raise
+
+
+def start_log_flusher() -> None:
+    """App startup'ta çağrılır; MongoDB yoksa hiçbir şey yapmaz."""
+    global _log_flusher_task
+    if HAS_MONGO and _log_flusher_task is None:
+        _log_flusher_task = asyncio.create_task(_log_flusher())
+
+
+async def stop_log_flusher() -> None:
+    """App shutdown'da flusher'ı durdur ve kalan logları yaz."""
+    global _log_flusher_task
+    task, _log_flusher_task = _log_flusher_task, None
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    # Kalan her şey tek insert_many ile
+    docs = _drain_log_queue(_log_queue.qsize())
+    if docs:
+        await _write_logs(docs)
+
+
 # ============================================================================
 # MARKDOWN TO HTML CONVERTER
 # ============================================================================
 
+# Tek geçişte HTML escape (zincirleme .replace yerine)
+_HTML_ESCAPE_TABLE = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;'})
+
+# Markdown işareti yoksa (düz metin LLM cevapları) regex hattı atlanır
+_MD_METACHARS_RE = re.compile(r'[*`#-]|^\d+\.\s', re.MULTILINE)
+_PARAGRAPH_BREAK_RE = re.compile(r'\n\n+')
+_PARAGRAPH_OPEN = '<p style="margin: 12px 0; line-height: 1.7;">'
+
+
+def _wrap_paragraphs(text: str) -> str:
+    """Satır sonlarını <p>/<br> yapısına çevirir ve paragrafa sarar."""
+    # Paragraphs: Double newlines → </p><p>
+    text = _PARAGRAPH_BREAK_RE.sub('</p>' + _PARAGRAPH_OPEN, text)
+    
+    # Single newlines → <br>
+    text = text.replace('\n', '<br>')
+    
+    # Wrap in paragraph if not already
+    if not text.startswith('<'):
+        text = f'{_PARAGRAPH_OPEN}{text}</p>'
+    
+    return text
+
+
 def markdown_to_html(text: str) -> str:
     """
     Basit markdown → HTML dönüştürücü.
@@ -56,7 +151,11 @@ def markdown_to_html(text: str) -> str:
         return ""
     
     # Escape HTML karakterleri (güvenlik)
-    text = text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+    text = text.translate(_HTML_ESCAPE_TABLE)
+    
+    # Düz metin: başlık/liste/vurgu yoksa doğrudan paragrafa sar
+    if not _MD_METACHARS_RE.search(text):
+        return _wrap_paragraphs(text)
     
     # Headers: ## Header → <h3>Header</h3>
     text = re.sub(r'^### (.+)$', r'<h4 style="color: #374151; margin: 16px 0 8px 0; font-size: 14px;">\1</h4>', text, flags=re.MULTILINE)
@@ -99,17 +198,7 @@ def markdown_to_html(text: str) -> str:
     # Code inline: `code` → <code>code</code>
     text = re.sub(r'`([^`]+)`', r'<code style="background: #f3f4f6; padding: 2px 6px; border-radius: 4px; font-family: monospace; font-size: 13px;">\1</code>', text)
     
-    # Paragraphs: Double newlines → </p><p>
-    text = re.sub(r'\n\n+', '</p><p style="margin: 12px 0; line-height: 1.7;">', text)
-    
-    # Single newlines → <br>
-    text = re.sub(r'\n', '<br>', text)
-    
-    # Wrap in paragraph if not already
-    if not text.startswith('<'):
-        text = f'<p style="margin: 12px 0; line-height: 1.7;">{text}</p>'
-    
-    return text
+    return _wrap_paragraphs(text)
 
 
 # ============================================================================
@@ -267,6 +356,62 @@ EMAIL_TEMPLATE = """
 </html>
 """
 
+# Şablon bir kez format'lanır; içerik prefix/suffix arasına eklenir
+_EMAIL_PREFIX, _EMAIL_SUFFIX = EMAIL_TEMPLATE.format(content="\0").split("\0")
+
+
+def _render_email(content: str) -> str:
+    return "".join((_EMAIL_PREFIX, content, _EMAIL_SUFFIX))
+
+
+# Tarih formatı ve sabit HTML parçaları (her çağrıda yeniden kurulmasın)
+_NOW_FMT = '%d.%m.%Y %H:%M'
+
+_STAT_LABELS = {
+    "total_count": "Toplam Kayıt",
+    "total_vehicles": "Araç Sayısı",
+    "total_cost": "Toplam Maliyet",
+    "avg_cost": "Ort. Maliyet",
+    "unique_materials": "Benzersiz Malzeme",
+    "unique_vehicles": "Benzersiz Araç",
+    "avg_per_vehicle": "Araç Başına Ort.",
+    "min_value": "Min Değer",
+    "max_value": "Max Değer",
+}
+
+_CHAT_FOOTER_HTML = """
+    <div class="footer">
+        <p>Bu email <strong>Promptever RAG</strong> sistemi tarafından otomatik olarak oluşturulmuştur.</p>
+        <p style="margin-top: 8px;">© 2024 Promptever - Kurumsal Deneyim Mimarisi</p>
+    </div>
+    """
+
+_ALERT_FOOTER_HTML = """
+    <div class="footer">
+        <p>Bu alert <strong>Promptever Monitoring</strong> sistemi tarafından gönderilmiştir.</p>
+    </div>
+    """
+
+_CURRENCY_SUBSTRS = ('cost', 'maliyet', 'tutar', 'fiyat', 'price')
+
+
+@lru_cache(maxsize=512)
+def _is_currency(name: str) -> bool:
+    """Kolon/istatistik adı para birimi içeriyor mu? (aynı adlar sık tekrar eder)"""
+    n = name.casefold()
+    return any(sub in n for sub in _CURRENCY_SUBSTRS)
+
+
+def _format_cell(value: Any, is_currency: bool) -> str:
+    """Tablo hücresini formatla ve HTML escape et."""
+    if isinstance(value, (int, float)):
+        if is_currency:
+            return f"₺{value:,.2f}"
+        if isinstance(value, float):
+            return f"{value:,.2f}"
+        return f"{value:,}"
+    return html.escape(str(value), quote=False)
+
 
 def generate_chat_email_html(
     query_text: str,
@@ -289,13 +434,14 @@ def generate_chat_email_html(
     6. Footer
     """
     
-    intent = chat_response.get("intent", "unknown")
-    scenario = chat_response.get("scenario", "")
+    # Kullanıcı / LLM kaynaklı metinler HTML'e escape edilerek girer
+    intent = html.escape(str(chat_response.get("intent", "unknown")), quote=False)
+    scenario = html.escape(str(chat_response.get("scenario") or ""), quote=False)
     
     # =========================================================================
     # 1. HEADER
     # =========================================================================
-    title = report_name or "Sorgu Sonucu"
+    title = html.escape(report_name or "Sorgu Sonucu", quote=False)
     content = f"""
     <div class="header">
         <h1>📊 {title}</h1>
@@ -304,7 +450,7 @@ def generate_chat_email_html(
             {f'<span class="badge badge-scenario">{scenario}</span>' if scenario else ''}
         </div>
         <div class="meta" style="margin-top: 12px;">
-            <strong>Tarih:</strong> {datetime.now().strftime('%d.%m.%Y %H:%M')}
+            <strong>Tarih:</strong> {datetime.now().strftime(_NOW_FMT)}
         </div>
     </div>
     """
@@ -316,7 +462,7 @@ def generate_chat_email_html(
     <div class="section">
         <div class="section-title">🔍 Sorgu</div>
         <div class="query-box">
-            {query_text}
+            {html.escape(query_text, quote=False)}
         </div>
     </div>
     """
@@ -329,7 +475,7 @@ def generate_chat_email_html(
     <div class="section">
         <div class="section-title">📝 Not</div>
         <div class="note-box">
-            {user_note}
+            {html.escape(user_note, quote=False)}
         </div>
     </div>
         """
@@ -359,43 +505,23 @@ def generate_chat_email_html(
     # =========================================================================
     if include_statistics and chat_response.get("statistics"):
         stats = chat_response["statistics"]
-        stats_html = '<div class="stats-grid">'
-        
-        stat_labels = {
-            "total_count": "Toplam Kayıt",
-            "total_vehicles": "Araç Sayısı",
-            "total_cost": "Toplam Maliyet",
-            "avg_cost": "Ort. Maliyet",
-            "unique_materials": "Benzersiz Malzeme",
-            "unique_vehicles": "Benzersiz Araç",
-            "avg_per_vehicle": "Araç Başına Ort.",
-            "min_value": "Min Değer",
-            "max_value": "Max Değer",
-        }
+        card_htmls = []
         
         for key, value in stats.items():
             if key.startswith("_"):
                 continue
-            label = stat_labels.get(key, key.replace("_", " ").title())
+            label = _STAT_LABELS.get(key, key.replace("_", " ").title())
             
-            if isinstance(value, (int, float)):
-                if "cost" in key.lower() or "maliyet" in key.lower():
-                    display_value = f"₺{value:,.2f}"
-                elif isinstance(value, float):
-                    display_value = f"{value:,.2f}"
-                else:
-                    display_value = f"{value:,}"
-            else:
-                display_value = str(value)
+            display_value = _format_cell(value, _is_currency(key))
             
-            stats_html += f"""
+            card_htmls.append(f"""
             <div class="stat-card">
                 <div class="stat-value">{display_value}</div>
-                <div class="stat-label">{label}</div>
+                <div class="stat-label">{html.escape(label, quote=False)}</div>
             </div>
-            """
+            """)
         
-        stats_html += '</div>'
+        stats_html = '<div class="stats-grid">' + ''.join(card_htmls) + '</div>'
         
         content += f"""
     <div class="section">
@@ -409,45 +535,51 @@ def generate_chat_email_html(
     # =========================================================================
     if include_tables and chat_response.get("tables"):
         for table in chat_response["tables"]:
-            table_title = table.get("title", "Veri Tablosu")
-            table_desc = table.get("description", "")
+            table_title = html.escape(str(table.get("title", "Veri Tablosu")), quote=False)
+            table_desc = html.escape(str(table.get("description") or ""), quote=False)
             columns = table.get("columns", [])
             rows = table.get("rows", [])
             
             # Maximum 30 satır göster (email boyutu için)
             max_rows = 30
-            showing = min(len(rows), max_rows)
             total = len(rows)
-            display_rows = rows[:max_rows]
+            showing = min(total, max_rows)
+            display_rows = islice(rows, max_rows)
             
             # Tablo HTML'i oluştur
-            table_html = '<table>'
+            table_parts = ['<table>']
             
             # Header
-            table_html += '<thead><tr>'
-            table_html += '<th style="width: 40px;">#</th>'
-            for col in columns:
-                table_html += f'<th>{col}</th>'
-            table_html += '</tr></thead>'
+            table_parts.append(
+                '<thead><tr><th style="width: 40px;">#</th>'
+                + ''.join(f'<th>{html.escape(str(c), quote=False)}</th>' for c in columns)
+                + '</tr></thead>'
+            )
             
-            # Body
-            table_html += '<tbody>'
+            # Body - kolon başına para birimi kararı bir kez verilir
+            col_currency = [_is_currency(str(col)) for col in columns]
+            getter = itemgetter(*columns) if columns else (lambda r: ())
+            single_column = len(columns) == 1
+            row_parts = []
             for idx, row in enumerate(display_rows, 1):
-                table_html += '<tr>'
-                table_html += f'<td style="color: #9ca3af; font-size: 12px;">{idx}</td>'
-                for col in columns:
-                    cell_value = row.get(col, "")
-                    # Sayı formatla
-                    if isinstance(cell_value, (int, float)):
-                        if "cost" in col.lower() or "maliyet" in col.lower() or "tutar" in col.lower():
-                            cell_value = f"₺{cell_value:,.2f}"
-                        elif isinstance(cell_value, float):
-                            cell_value = f"{cell_value:,.2f}"
-                        else:
-                            cell_value = f"{cell_value:,}"
-                    table_html += f'<td>{cell_value}</td>'
-                table_html += '</tr>'
-            table_html += '</tbody></table>'
+                # Hücreleri tek seferde çek; eksik kolon varsa .get ile doldur
+                try:
+                    values = getter(row)
+                    if single_column:
+                        values = (values,)
+                except KeyError:
+                    values = [row.get(col, "") for col in columns]
+                cells = ['<tr>', f'<td style="color: #9ca3af; font-size: 12px;">{idx}</td>']
+                cells.extend(
+                    f'<td>{_format_cell(value, is_cur)}</td>'
+                    for value, is_cur in zip(values, col_currency)
+                )
+                cells.append('</tr>')
+                row_parts.append(''.join(cells))
+            table_parts.append('<tbody>')
+            table_parts.extend(row_parts)
+            table_parts.append('</tbody></table>')
+            table_html = ''.join(table_parts)
             
             content += f"""
     <div class="section">
@@ -463,14 +595,9 @@ def generate_chat_email_html(
     # =========================================================================
     # 7. FOOTER
     # =========================================================================
-    content += """
-    <div class="footer">
-        <p>Bu email <strong>Promptever RAG</strong> sistemi tarafından otomatik olarak oluşturulmuştur.</p>
-        <p style="margin-top: 8px;">© 2024 Promptever - Kurumsal Deneyim Mimarisi</p>
-    </div>
-    """
+    content += _CHAT_FOOTER_HTML
     
-    return EMAIL_TEMPLATE.format(content=content)
+    return _render_email(content)
 
 
 def generate_alert_email_html(
@@ -496,11 +623,16 @@ def generate_alert_email_html(
     
     change_text = f"{'+' if change_pct > 0 else ''}{change_pct:.1f}%" if change_pct != 0 else "Değişim var"
     
+    alert_name = html.escape(alert_name, quote=False)
+    metric_path = html.escape(metric_path, quote=False)
+    old_value = html.escape(str(old_value), quote=False)
+    new_value = html.escape(str(new_value), quote=False)
+    
     content = f"""
     <div class="header">
         <h1>{change_icon} Alert: {alert_name}</h1>
         <div class="meta">
-            <strong>Tarih:</strong> {datetime.now().strftime('%d.%m.%Y %H:%M')}
+            <strong>Tarih:</strong> {datetime.now().strftime(_NOW_FMT)}
         </div>
     </div>
     
@@ -514,51 +646,64 @@ def generate_alert_email_html(
     
     <div class="section">
         <div class="section-title">🔍 Sorgu</div>
-        <div class="query-box">{query_text}</div>
+        <div class="query-box">{html.escape(query_text, quote=False)}</div>
     </div>
+    {_ALERT_FOOTER_HTML}"""
     
-    <div class="footer">
-        <p>Bu alert <strong>Promptever Monitoring</strong> sistemi tarafından gönderilmiştir.</p>
-    </div>
-    """
-    
-    return EMAIL_TEMPLATE.format(content=content)
+    return _render_email(content)
 
 
 # ============================================================================
 # N8N WEBHOOK INTEGRATION
 # ============================================================================
 
+def encode_html_field(html_content: str) -> bytes:
+    """
+    HTML içeriğini webhook payload'ı için JSON string olarak encode et.
+    
+    Aynı HTML birden fazla alıcıya gönderildiğinde bir kez çağrılır.
+    """
+    return orjson.dumps(html_content)
+
+
 async def send_via_n8n_webhook(
     to_email: str,
     subject: str,
-    html_content: str,
+    html_content: Union[str, bytes],
     from_name: str = "Promptever",
 ) -> Dict[str, Any]:
     """
     Mevcut n8n workflow'unu çağır.
+    
+    html_content, encode_html_field() ile önceden encode edilmiş bytes
+    olarak da verilebilir; bu durumda tekrar encode edilmez.
     """
+    if isinstance(html_content, str):
+        html_content = encode_html_field(html_content)
+    
     payload = {
         "email": to_email,
         "subject": subject,
-        "html": html_content,
         "name": from_name,
         "timestamp": datetime.now().isoformat(),
         "source": "promptever-rag",
     }
+    # {"html": <önceden encode edilmiş>, ...diğer alanlar}
+    rest = orjson.dumps(payload)
+    body = b"".join((b'{"html":', html_content, b",", rest[1:]))
     
     try:
         async with httpx.AsyncClient(timeout=30.0) as client:
             response = await client.post(
                 N8N_EMAIL_WEBHOOK,
-                json=payload,
+                content=body,
                 headers={"Content-Type": "application/json"}
             )
             
             logger.info(f"n8n webhook response: {response.status_code}")
             
             if response.status_code == 200:
-                return {"success": True, "data": response.json() if response.text else {}}
+                return {"success": True, "data": orjson.loads(response.content) if response.content else {}}
             else:
                 return {"success": False, "error": f"HTTP {response.status_code}: {response.text}"}
                 
@@ -602,7 +747,8 @@ class EmailService:
             user_note=user_note,
         )
         
-        # Her alıcıya gönder
+        # Her alıcıya gönder (HTML bir kez encode edilir)
+        html_field = encode_html_field(html_content)
         sent_to = []
         errors = []
         
@@ -610,7 +756,7 @@ class EmailService:
             result = await send_via_n8n_webhook(
                 to_email=recipient,
                 subject=subject,
-                html_content=html_content,
+                html_content=html_field,
             )
             
             if result["success"]:
@@ -618,16 +764,17 @@ class EmailService:
             else:
                 errors.append(f"{recipient}: {result.get('error')}")
         
-        # Log kaydet (MongoDB varsa)
+        # Log kaydet (MongoDB varsa) - arka plandaki flusher toplu yazar
         if HAS_MONGO:
+            sent_at = datetime.now()
             try:
-                logs_collection.insert_one({
+                _log_queue.put_nowait({
                     "_id": ObjectId(),
                     "type": "instant",
                     "query_text": query_text,
                     "recipients": recipients,
                     "subject": subject,
-                    "sent_at": datetime.now(),
+                    "sent_at": sent_at,
                     "status": "sent" if sent_to else "failed",
                     "sent_to": sent_to,
                     "errors": errors,
@@ -637,6 +784,10 @@ class EmailService:
                         "table_count": len(chat_response.get("tables", [])),
                     },
                 })
+            except asyncio.QueueFull:
+                logger.warning(
+                    f"Log kuyruğu dolu ({_LOG_QUEUE_MAXSIZE}), kayıt atlandı: {subject!r}"
+                )
             except Exception as e:
                 logger.warning(f"Log kaydedilemedi: {e}")
         
@@ -670,12 +821,13 @@ class EmailService:
             change_pct=change_pct,
         )
         
+        html_field = encode_html_field(html_content)
         sent_to = []
         for recipient in recipients:
             result = await send_via_n8n_webhook(
                 to_email=recipient,
                 subject=subject,
-                html_content=html_content,
+                html_content=html_field,
             )
             if result["success"]:
                 sent_to.append(recipient)
@@ -0,0 +1,292 @@
+"""
+services/llm_cache.py
+=====================
+
+LLM yanıt cache'leri.
+
+ExactCache:
+    temperature == 0 olan (deterministik) istekler için payload'ın SHA256
+    özetine göre TTL'li LRU cache. Embedding maliyeti yoktur.
+
+SemanticCache:
+    (system_prompt + prompt) metnini config'deki paylaşılan embedding modeli
+    ile vektöre çevirir; aynı provider/model için daha önce cevaplanmış ve
+    cosine benzerliği eşiğin üzerinde olan bir istek varsa kayıtlı
+    LLMAnalysis'i döndürür. Eşzamanlı encode istekleri kısa bir pencerede
+    toplanıp tek batch halinde encode edilir.
+
+Kullanım:
+    from services.llm_cache import exact_cache, semantic_cache
+
+    key = exact_cache.make_key("groq", model, system_prompt, prompt, 0.0, 1024)
+    hit = exact_cache.get(key)
+
+    hit = semantic_cache.lookup("groq", model, system_prompt, prompt)
+    if hit is None:
+        result = ...  # API çağrısı
+        semantic_cache.store("groq", model, system_prompt, prompt, result)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from models import LLMAnalysis
+
+from config import (
+    LLM_EXACT_CACHE_SIZE,
+    LLM_EXACT_CACHE_TTL,
+    LLM_SEMANTIC_CACHE_ENABLED,
+    LLM_SEMANTIC_CACHE_THRESHOLD,
+    LLM_SEMANTIC_CACHE_SIZE,
+)
+
+
+def _cache_text(system_prompt: Optional[str], prompt: str) -> str:
+    return f"{system_prompt}\n\n{prompt}" if system_prompt else prompt
+
+
+def request_key(
+    provider_id: str,
+    model: str,
+    system_prompt: Optional[str],
+    prompt: str,
+    temperature: float,
+    max_tokens: Optional[int],
+    **extra: object,
+) -> str:
+    """İstek payload'ının SHA256 özeti (cache ve in-flight birleştirme anahtarı)."""
+    payload = json.dumps(
+        {
+            "provider": provider_id,
+            "model": model,
+            "system_prompt": system_prompt,
+            "prompt": prompt,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            **extra,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class _EmbeddingBatcher:
+    """
+    Kısa bir pencere (varsayılan 5 ms) içinde gelen encode isteklerini tek
+    model.encode(batch) çağrısında toplar; CPU'da BLAS maliyeti paylaşılır.
+
+    Arka plan thread'i yoktur: pencereyi açan ilk çağıran (leader) bekler,
+    biriken metinleri encode eder ve diğerlerinin Future'larını doldurur.
+    Model config'deki paylaşılan embedding_model'dir (tek instance).
+    """
+
+    def __init__(self, window: float = 0.005, batch_size: int = 32):
+        self.window = window
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._pending: List[Tuple[str, Future]] = []
+
+    def encode(self, text: str) -> np.ndarray:
+        future: Future = Future()
+        with self._lock:
+            self._pending.append((text, future))
+            leader = len(self._pending) == 1
+
+        if leader:
+            time.sleep(self.window)
+            with self._lock:
+                batch, self._pending = self._pending, []
+            self._run(batch)
+
+        return future.result()
+
+    def _run(self, batch: List[Tuple[str, Future]]) -> None:
+        from config import embedding_model
+
+        try:
+            vectors = embedding_model.encode(
+                [text for text, _ in batch],
+                normalize_embeddings=True,
+                batch_size=self.batch_size,
+            )
+        except Exception as exc:
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        for (_, future), vector in zip(batch, vectors):
+            future.set_result(vector)
+
+
+_batcher = _EmbeddingBatcher()
+
+
+@lru_cache(maxsize=256)
+def _embed(text: str) -> np.ndarray:
+    """Normalize embedding; lookup + store aynı metni iki kez encode etmesin."""
+    return _batcher.encode(text)
+
+
+def _mark_cached(result: LLMAnalysis, kind: str) -> LLMAnalysis:
+    """Cache'ten dönen yanıtı işaretle (orijinal kayıt değişmez)."""
+    return result.model_copy(update={"latency_sec": 0, "provider_info": {"cache": kind}})
+
+
+# ============================================================================
+# EXACT-MATCH CACHE
+# ============================================================================
+
+
+class ExactCache:
+    """
+    Deterministik istekler için SHA256 anahtarlı, TTL'li LRU cache.
+
+    Tüm provider'lar paylaşır; provider_id anahtarın parçasıdır.
+    """
+
+    def __init__(self, max_entries: int = LLM_EXACT_CACHE_SIZE, ttl: float = LLM_EXACT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[float, LLMAnalysis]]" = OrderedDict()
+
+    @staticmethod
+    def make_key(
+        provider_id: str,
+        model: str,
+        system_prompt: Optional[str],
+        prompt: str,
+        temperature: float,
+        max_tokens: Optional[int],
+    ) -> Optional[str]:
+        """Sadece temperature == 0 için anahtar üretir; aksi halde None."""
+        if temperature != 0:
+            return None
+        return request_key(provider_id, model, system_prompt, prompt, temperature, max_tokens)
+
+    def get(self, key: Optional[str]) -> Optional[LLMAnalysis]:
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, result = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return _mark_cached(result, "exact")
+
+    def put(self, key: Optional[str], result: LLMAnalysis) -> None:
+        if key is None:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# ============================================================================
+# SEMANTIC CACHE
+# ============================================================================
+
+
+class SemanticCache:
+    """
+    Embedding benzerliğine dayalı, (provider, model) bazında ayrılmış cache.
+
+    Her namespace en fazla max_entries kayıt tutar (FIFO). Vektörler
+    normalize edildiği için cosine benzerliği tek bir matris çarpımıdır.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = LLM_SEMANTIC_CACHE_ENABLED,
+        threshold: float = LLM_SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = LLM_SEMANTIC_CACHE_SIZE,
+    ):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], Deque[Tuple[np.ndarray, LLMAnalysis]]] = {}
+        self._matrices: Dict[Tuple[str, str], np.ndarray] = {}
+
+    def lookup(
+        self,
+        provider_id: str,
+        model: str,
+        system_prompt: Optional[str],
+        prompt: str,
+    ) -> Optional[LLMAnalysis]:
+        if not self.enabled:
+            return None
+
+        key = (provider_id, model)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                return None
+            matrix = self._matrices.get(key)
+            if matrix is None:
+                matrix = np.vstack([vec for vec, _ in entries])
+                self._matrices[key] = matrix
+            results = [res for _, res in entries]
+
+        scores = matrix @ _embed(_cache_text(system_prompt, prompt))
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        return _mark_cached(results[best], "hit")
+
+    def store(
+        self,
+        provider_id: str,
+        model: str,
+        system_prompt: Optional[str],
+        prompt: str,
+        result: LLMAnalysis,
+    ) -> None:
+        if not self.enabled:
+            return
+
+        vector = _embed(_cache_text(system_prompt, prompt))
+        key = (provider_id, model)
+        with self._lock:
+            entries = self._entries.setdefault(key, deque(maxlen=self.max_entries))
+            entries.append((vector, result))
+            self._matrices.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._matrices.clear()
+
+
+exact_cache = ExactCache()
+semantic_cache = SemanticCache()
+
+
+__all__ = [
+    "request_key",
+    "ExactCache",
+    "SemanticCache",
+    "exact_cache",
+    "semantic_cache",
+]
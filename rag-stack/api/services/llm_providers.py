@@ -22,16 +22,31 @@ Kullanım:
     
     provider = LLMProviderFactory.get_provider("groq")
     result = provider.generate(prompt="...", model="llama-3.3-70b-versatile")
+    
+    # Async (FastAPI endpoint'leri içinden)
+    result = await provider.agenerate(prompt="...", model="llama-3.3-70b-versatile")
 """
 
 from __future__ import annotations
 
 import time
+import random
+import asyncio
+import threading
+import weakref
+from concurrent.futures import Future
+from functools import lru_cache, partial
+import httpx
+import msgspec
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Type
+from typing import Any, Dict, List, Optional, Tuple, Type
 
 from models import LLMAnalysis, ProviderInfo, ProviderModelInfo
+from services.llm_cache import exact_cache, request_key, semantic_cache
 
 from config import (
     # Ollama
@@ -52,10 +67,139 @@ from config import (
     PROVIDER_MODELS,
     PROVIDER_DEFAULTS,
     PROVIDERS_CONFIG,
+    # Multiplex
+    LLM_MULTIPLEX_POOL,
+    LLM_MULTIPLEX_COOLDOWN,
     DEBUG,
 )
 
 
+# ============================================================================
+# SHARED HTTP SESSION
+# ============================================================================
+
+# 429 ve geçici 5xx'ler provider içinde üstel backoff ile tekrar denenir
+# (sync: urllib3 Retry, async: _apost_with_retry). Retry-After varsa ona
+# uyulur ama _RETRY_MAX_SLEEP'ten uzun beklenmez. Okuma timeout'ları hiç
+# tekrarlanmaz; bağlantı hataları (istek sunucuya ulaşmadı) en fazla
+# _RETRY_CONNECT kez. Böylece bir çağrı en çok bir request_timeout kadar
+# yanıt bekler.
+#
+# MultiplexedProvider üzerinden gelen çağrılarda 429 provider içinde
+# beklenmez (_FAILOVER_RETRY_STATUSES): mux girişe cooldown koyup hemen
+# sıradaki provider'a geçer. Sağlık kontrolleri hiç tekrarlanmaz.
+_RETRY_TOTAL = 3
+_RETRY_CONNECT = 1
+_RETRY_BACKOFF = 0.5
+_RETRY_MAX_SLEEP = 30.0
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+_FAILOVER_RETRY_STATUSES = _RETRY_STATUSES - {429}
+
+
+class _CappedRetry(Retry):
+    """Retry-After'a _RETRY_MAX_SLEEP tavanıyla uyar (async yol ile aynı)."""
+    
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        return None if retry_after is None else min(retry_after, _RETRY_MAX_SLEEP)
+
+
+def _build_session(retry_statuses: Optional[frozenset] = _RETRY_STATUSES) -> requests.Session:
+    """
+    Provider'ların paylaştığı HTTP oturumu.
+    
+    Keep-alive sayesinde her çağrıda yeniden TCP+TLS handshake yapılmaz.
+    retry_statuses None ise hiçbir istek tekrar denenmez.
+    """
+    session = requests.Session()
+    if retry_statuses is None:
+        max_retries: Any = 0
+    else:
+        max_retries = _CappedRetry(
+            total=_RETRY_TOTAL,
+            connect=_RETRY_CONNECT,
+            read=0,  # Okuma hatası/timeout: POST sunucuya ulaşmış olabilir, tekrar gönderme
+            other=0,
+            status=_RETRY_TOTAL,
+            backoff_factor=_RETRY_BACKOFF,
+            status_forcelist=sorted(retry_statuses),
+            allowed_methods=["POST", "GET"],  # Varsayılan listede POST yok
+            respect_retry_after_header=True,
+            raise_on_status=False,  # Son yanıt raise_for_status'a kalsın
+        )
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=max_retries)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_SESSION = _build_session()
+_FAILOVER_SESSION = _build_session(_FAILOVER_RETRY_STATUSES)
+_HEALTH_SESSION = _build_session(None)
+
+
+def get_http_session() -> requests.Session:
+    """
+    Provider'ların kullandığı paylaşılan HTTP oturumu.
+    
+    Aynı upstream'lere giden diğer servisler (ör. LLMService) kendi Session'ını
+    açmak yerine bunu kullanır; keep-alive havuzu ve retry ayarları ortak kalır.
+    """
+    return _SESSION
+
+
+# ============================================================================
+# SHARED ASYNC HTTP CLIENT
+# ============================================================================
+
+_ASYNC_CLIENT: Optional[httpx.AsyncClient] = None
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    """
+    agenerate/ahealth_check için paylaşılan httpx.AsyncClient (lazy).
+    """
+    global _ASYNC_CLIENT
+    if _ASYNC_CLIENT is None or _ASYNC_CLIENT.is_closed:
+        _ASYNC_CLIENT = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=256, max_keepalive_connections=64),
+            timeout=120,
+        )
+    return _ASYNC_CLIENT
+
+
+async def _apost_with_retry(
+    url: str, retry_statuses: frozenset = _RETRY_STATUSES, **kwargs: Any
+) -> httpx.Response:
+    """
+    AsyncClient.post + retry_statuses (varsayılan 429/5xx) ve bağlantı
+    kurulamadığında üstel backoff.
+    
+    Bekleme: Retry-After varsa o, yoksa min(backoff * 2^n, 30) + jitter.
+    Son denemenin yanıtı/hatası olduğu gibi döner.
+    """
+    client = _get_async_client()
+    connect_retries = _RETRY_CONNECT
+    for attempt in range(_RETRY_TOTAL + 1):
+        last = attempt == _RETRY_TOTAL
+        try:
+            response = await client.post(url, **kwargs)
+        except (httpx.ConnectError, httpx.ConnectTimeout):
+            # İstek sunucuya ulaşmadı; okuma timeout'ları gibi diğer hatalar tekrarlanmaz
+            if last or connect_retries <= 0:
+                raise
+            connect_retries -= 1
+            response = None
+        
+        if response is not None and (last or response.status_code not in retry_statuses):
+            return response
+        
+        delay = _retry_after(response)
+        if delay is None:
+            delay = _RETRY_BACKOFF * (2 ** attempt) + random.uniform(0, 0.25)
+        await asyncio.sleep(min(delay, _RETRY_MAX_SLEEP))
+
+
 # ============================================================================
 # ABSTRACT BASE PROVIDER
 # ============================================================================
@@ -63,17 +207,32 @@ from config import (
 
 class BaseLLMProvider(ABC):
     """
-    Tüm LLM provider'ların base class'ı.
+    Tüm LLM provider'ların ortak arayüzü.
     
-    Her provider bu class'tan türemeli ve şu metodları implement etmeli:
-    - generate(): LLM çağrısı
-    - health_check(): Sağlık kontrolü
-    - get_models(): Model listesi
-    - get_default_model(): Varsayılan model
+    Router'lar ve LLMService yalnızca bu metodları kullanır:
+    - generate()/agenerate(): LLM çağrısı
+    - health_check()/ahealth_check(): Erişilebilirlik
+    - get_models(), get_default_model(), get_info(): Config metadata'sı
+    
+    Tek bir HTTP endpoint'ine giden provider'lar HTTPLLMProvider'dan türer;
+    MultiplexedProvider gibi başka provider'lara delege edenler doğrudan
+    bu sınıftan.
     """
     
     provider_id: str = ""
     
+    # API key (yoksa generate hata mesajı döner, health_check False)
+    api_key: Optional[str] = None
+    api_key_name: Optional[str] = None
+    
+    # Model/Provider metadata'sı config'den gelir ve değişmez;
+    # provider_id bazında bir kez kurulup paylaşılır.
+    _models_cache: Dict[str, List[ProviderModelInfo]] = {}
+    _info_cache: Dict[str, ProviderInfo] = {}
+    
+    def is_configured(self) -> bool:
+        return self.api_key_name is None or bool(self.api_key)
+    
     @abstractmethod
     def generate(
         self,
@@ -81,32 +240,37 @@ class BaseLLMProvider(ABC):
         model: str,
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
-        max_tokens: int = 2048,
+        max_tokens: Optional[int] = None,
+        stream: bool = False,
+        dynamic_context: Optional[str] = None,
         **kwargs,
     ) -> LLMAnalysis:
-        """
-        LLM'e istek gönder ve yanıt al.
-        
-        Args:
-            prompt: Kullanıcı promptu
-            model: Model adı
-            system_prompt: Sistem promptu (opsiyonel)
-            temperature: Yaratıcılık (0.0-2.0)
-            max_tokens: Maksimum token sayısı
-            
-        Returns:
-            LLMAnalysis: Yanıt ve metadata
-        """
+        """LLM'e istek gönder ve yanıt al."""
+        pass
+    
+    @abstractmethod
+    async def agenerate(
+        self,
+        prompt: str,
+        model: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        stream: bool = False,
+        dynamic_context: Optional[str] = None,
+        **kwargs,
+    ) -> LLMAnalysis:
+        """generate()'in asenkron karşılığı."""
         pass
     
     @abstractmethod
     def health_check(self) -> bool:
-        """
-        Provider'ın erişilebilir olup olmadığını kontrol et.
-        
-        Returns:
-            bool: Erişilebilir ise True
-        """
+        """Provider erişilebilir ise True."""
+        pass
+    
+    @abstractmethod
+    async def ahealth_check(self) -> bool:
+        """health_check()'in asenkron karşılığı."""
         pass
     
     def get_models(self) -> List[ProviderModelInfo]:
@@ -116,8 +280,11 @@ class BaseLLMProvider(ABC):
         Returns:
             List[ProviderModelInfo]: Model listesi
         """
-        models = PROVIDER_MODELS.get(self.provider_id, [])
-        return [ProviderModelInfo(**m) for m in models]
+        cache = BaseLLMProvider._models_cache
+        if self.provider_id not in cache:
+            models = PROVIDER_MODELS.get(self.provider_id, [])
+            cache[self.provider_id] = [ProviderModelInfo(**m) for m in models]
+        return cache[self.provider_id]
     
     def get_default_model(self) -> str:
         """
@@ -135,121 +302,161 @@ class BaseLLMProvider(ABC):
         Returns:
             ProviderInfo: Provider bilgisi
         """
-        config = PROVIDERS_CONFIG.get(self.provider_id, {})
-        return ProviderInfo(
-            id=self.provider_id,
-            name=config.get("name", self.provider_id),
-            icon=config.get("icon", "🤖"),
-            description=config.get("description"),
-            models=self.get_models(),
-            default_model=self.get_default_model(),
-            pricing=config.get("pricing"),
-            latency=config.get("latency"),
-        )
-
-
-# ============================================================================
-# LOCAL (OLLAMA) PROVIDER
-# ============================================================================
+        cache = BaseLLMProvider._info_cache
+        if self.provider_id not in cache:
+            config = PROVIDERS_CONFIG.get(self.provider_id, {})
+            cache[self.provider_id] = ProviderInfo(
+                id=self.provider_id,
+                name=config.get("name", self.provider_id),
+                icon=config.get("icon", "🤖"),
+                description=config.get("description"),
+                models=self.get_models(),
+                default_model=self.get_default_model(),
+                pricing=config.get("pricing"),
+                latency=config.get("latency"),
+            )
+        return cache[self.provider_id]
 
 
-class OllamaProvider(BaseLLMProvider):
+class HTTPLLMProvider(BaseLLMProvider):
     """
-    Yerel Ollama sunucusu provider'ı.
+    Tek bir HTTP endpoint'ine giden provider'ların base class'ı.
     
-    Endpoint: http://{OLLAMA_HOST}/api/chat
-    Auth: Yok (yerel sunucu)
+    generate()/agenerate() ve health_check()/ahealth_check() burada ortak
+    olarak yazılmıştır; her provider sadece şu kancaları implement eder:
+    - _build_request(): URL, body ve query parametreleri
+    - _parse_response(): Yanıttan cevap ve token bilgisi
+    - _health_request(): Sağlık kontrolü URL'i, header ve parametreleri
     """
     
-    provider_id = "local"
+    # Hata mesajı önekleri; api_error_prefix None ise HTTP hataları da
+    # genel hata gibi formatlanır.
+    error_prefix: str = "[LLM Hatası]"
+    api_error_prefix: Optional[str] = None
     
-    def generate(
+    request_timeout: float = 120
+    health_timeout: float = 10
+    default_max_tokens: int = 2048
+    
+    # Aynı anda gelen özdeş istekler tek bir upstream çağrıda birleştirilir
+    # (single-flight). Sync yol thread Future'ları, async yol event loop
+    # başına ayrı tutulan asyncio Task'ları kullanır (başka loop'un
+    # Task'ı hiçbir zaman await edilmez).
+    _inflight: Dict[str, Future] = {}
+    _inflight_lock = threading.Lock()
+    _ainflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Task]]" = (
+        weakref.WeakKeyDictionary()
+    )
+    
+    def __init__(self):
+        # Header'lar ve sağlık isteği sabittir (key config'den gelir);
+        # her çağrıda dict/f-string üretmemek için bir kez kurulur.
+        # Key yoksa None kalır, generate/health_check zaten erken döner.
+        configured = self.is_configured()
+        self._post_headers = self._request_headers() if configured else None
+        self._health = self._health_request() if configured else None
+    
+    # ------------------------------------------------------------------
+    # Provider kancaları
+    # ------------------------------------------------------------------
+    
+    @abstractmethod
+    def _build_request(
         self,
         prompt: str,
         model: str,
-        system_prompt: Optional[str] = None,
-        temperature: float = 0.7,
-        max_tokens: int = 2048,
-        **kwargs,
-    ) -> LLMAnalysis:
-        
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": prompt})
-        
-        t0 = time.time()
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        dynamic_context: Optional[str] = None,
+    ) -> Tuple[str, Dict[str, Any], Optional[Dict[str, str]]]:
+        """
+        system_prompt sabit kısım olarak en başta kalmalı; sorguya özel
+        dynamic_context ayrı bir user bloğuna gider (prefix cache korunur).
         
-        try:
-            response = requests.post(
-                f"{OLLAMA_HOST}/api/chat",
-                json={
-                    "model": model,
-                    "messages": messages,
-                    "stream": False,
-                    "options": {
-                        "temperature": temperature,
-                        "num_predict": max_tokens,
-                    },
-                },
-                timeout=300,
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            answer = data.get("message", {}).get("content", "")
-            
-            # Token istatistikleri (Ollama formatı)
-            prompt_tokens = data.get("prompt_eval_count")
-            completion_tokens = data.get("eval_count")
-            total_tokens = None
-            if prompt_tokens and completion_tokens:
-                total_tokens = prompt_tokens + completion_tokens
-            
-        except Exception as exc:
-            answer = f"[Ollama Hatası] {exc}"
-            prompt_tokens = None
-            completion_tokens = None
-            total_tokens = None
+        Returns:
+            (url, json body, query params)
+        """
+        pass
+    
+    @abstractmethod
+    def _parse_response(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Provider yanıtını LLMAnalysis alanlarına çevir.
         
-        latency = time.time() - t0
+        Returns:
+            Dict: answer, prompt_tokens, completion_tokens, total_tokens,
+                  (opsiyonel) provider_info
+        """
+        pass
+    
+    @abstractmethod
+    def _health_request(self) -> Tuple[str, Optional[Dict[str, str]], Optional[Dict[str, str]]]:
+        """
+        Returns:
+            (url, headers, query params)
+        """
+        pass
+    
+    def _stream_request(
+        self, url: str, body: Dict[str, Any], params: Optional[Dict[str, str]]
+    ) -> Tuple[str, Dict[str, Any], Optional[Dict[str, str]]]:
+        """stream=True için isteği dönüştür (varsayılan: body["stream"] = True)."""
+        return url, {**body, "stream": True}, params
+    
+    def _decode_response(self, content: bytes) -> Any:
+        """
+        Ham yanıt gövdesi → _parse_response'un beklediği nesne.
         
+        Varsayılan orjson ile dict; typed şeması olan provider'lar msgspec
+        Struct'a decode eder (ara {} / [{}] literal'leri oluşmaz).
+        """
+        return orjson.loads(content)
+    
+    def _decode_stream_line(self, line: bytes) -> Any:
+        """SSE satırı → JSON parça ("data: {...}"; "[DONE]" ve boş satırlar atlanır)."""
+        if not line.startswith(b"data:"):
+            return None
+        payload = line[5:].strip()
+        if not payload or payload == b"[DONE]":
+            return None
+        return self._decode_response(payload)
+    
+    def _parse_stream_chunk(self, data: Any) -> Dict[str, Any]:
+        """Stream parçası → _parse_response ile aynı alanlar (answer = delta)."""
+        return self._parse_response(data)
+    
+    def _request_headers(self) -> Dict[str, str]:
+        return {"Content-Type": "application/json"}
+    
+    def _error_detail(self, data: Dict[str, Any]) -> Optional[str]:
+        """HTTP hata yanıtından okunabilir mesaj."""
+        return data.get("error", {}).get("message")
+    
+    # ------------------------------------------------------------------
+    # Ortak yardımcılar
+    # ------------------------------------------------------------------
+    
+    def _missing_key_result(self, model: str) -> LLMAnalysis:
         return LLMAnalysis(
             provider=self.provider_id,
             model=model,
-            answer=answer,
-            latency_sec=latency,
-            prompt_tokens=prompt_tokens,
-            completion_tokens=completion_tokens,
-            total_tokens=total_tokens,
+            answer=f"[Hata] {self.api_key_name} tanımlı değil.",
+            latency_sec=0,
         )
     
-    def health_check(self) -> bool:
+    def _format_http_error(self, response: Any, exc: Exception) -> str:
+        if self.api_error_prefix is None:
+            return f"{self.error_prefix} {exc}"
         try:
-            response = requests.get(
-                f"{OLLAMA_HOST}/api/tags",
-                timeout=5,
-            )
-            return response.status_code == 200
+            error_detail = self._error_detail(orjson.loads(response.content)) or str(exc)
         except Exception:
-            return False
-
-
-# ============================================================================
-# GROQ PROVIDER
-# ============================================================================
-
-
-class GroqProvider(BaseLLMProvider):
-    """
-    Groq Cloud provider'ı.
-    
-    Endpoint: https://api.groq.com/openai/v1/chat/completions
-    Auth: Bearer token
-    Format: OpenAI uyumlu
-    """
+            error_detail = str(exc)
+        return f"{self.api_error_prefix} {error_detail}"
     
-    provider_id = "groq"
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
     
     def generate(
         self,
@@ -257,360 +464,716 @@ class GroqProvider(BaseLLMProvider):
         model: str,
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
-        max_tokens: int = 2048,
+        max_tokens: Optional[int] = None,
+        stream: bool = False,
+        dynamic_context: Optional[str] = None,
+        rate_limit_retry: bool = True,
         **kwargs,
     ) -> LLMAnalysis:
+        """
+        LLM'e istek gönder ve yanıt al.
         
-        if not GROQ_API_KEY:
-            return LLMAnalysis(
-                provider=self.provider_id,
-                model=model,
-                answer="[Hata] GROQ_API_KEY tanımlı değil.",
-                latency_sec=0,
-            )
+        Args:
+            prompt: Kullanıcı promptu
+            model: Model adı
+            system_prompt: Sistem promptu (opsiyonel)
+            temperature: Yaratıcılık (0.0-2.0)
+            max_tokens: Maksimum token sayısı (None → provider varsayılanı)
+            stream: True ise yanıt parça parça okunur; ilk token süresi
+                provider_info["first_token_sec"] içinde döner
+            dynamic_context: Sorguya özel bağlam (retrieval, hafıza vb.).
+                system_prompt'a gömülmez; ayrı user bloğu olarak gider ki
+                provider'ların prompt prefix cache'i her çağrıda bozulmasın.
+            rate_limit_retry: False ise 429 provider içinde beklenmeden döner
+                (MultiplexedProvider failover'ı için)
+            
+        Returns:
+            LLMAnalysis: Yanıt ve metadata
+        """
+        if not self.is_configured():
+            return self._missing_key_result(model)
         
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": prompt})
+        max_tokens = max_tokens or self.default_max_tokens
+        cache_prompt = _with_context(prompt, dynamic_context)
+        cache_key = exact_cache.make_key(
+            self.provider_id, model, system_prompt, cache_prompt, temperature, max_tokens
+        )
+        cached = exact_cache.get(cache_key) or semantic_cache.lookup(
+            self.provider_id, model, system_prompt, cache_prompt
+        )
+        if cached is not None:
+            return cached
+        
+        flight_key = request_key(
+            self.provider_id, model, system_prompt, cache_prompt, temperature, max_tokens,
+            stream=stream, rate_limit_retry=rate_limit_retry,
+        )
+        with HTTPLLMProvider._inflight_lock:
+            future = HTTPLLMProvider._inflight.get(flight_key)
+            leader = future is None
+            if leader:
+                future = Future()
+                HTTPLLMProvider._inflight[flight_key] = future
         
-        t0 = time.time()
+        if not leader:
+            return future.result()
         
         try:
-            response = requests.post(
-                f"{GROQ_API_BASE}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {GROQ_API_KEY}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": model,
-                    "messages": messages,
-                    "temperature": temperature,
-                    "max_tokens": max_tokens,
-                },
-                timeout=120,
+            result = self._request(
+                prompt, model, system_prompt, temperature, max_tokens, stream, cache_key,
+                dynamic_context, rate_limit_retry,
             )
-            response.raise_for_status()
-            data = response.json()
-            
-            answer = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-            
-            usage = data.get("usage", {})
-            prompt_tokens = usage.get("prompt_tokens")
-            completion_tokens = usage.get("completion_tokens")
-            total_tokens = usage.get("total_tokens")
+            future.set_result(result)
+            return result
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        finally:
+            with HTTPLLMProvider._inflight_lock:
+                HTTPLLMProvider._inflight.pop(flight_key, None)
+    
+    def _request(
+        self,
+        prompt: str,
+        model: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        stream: bool,
+        cache_key: Optional[str],
+        dynamic_context: Optional[str] = None,
+        rate_limit_retry: bool = True,
+    ) -> LLMAnalysis:
+        """generate()'in upstream kısmı: HTTP çağrısı + cache'e yazma."""
+        session = _SESSION if rate_limit_retry else _FAILOVER_SESSION
+        url, body, params = self._build_request(
+            prompt, model, system_prompt, temperature, max_tokens, dynamic_context
+        )
+        
+        t0 = time.perf_counter()
+        ok = False
+        
+        try:
+            if stream:
+                fields = self._post_stream(url, body, params, t0, session)
+            else:
+                response = session.post(
+                    url,
+                    headers=self._post_headers,
+                    params=params,
+                    data=_encode_body(body),
+                    timeout=self.request_timeout,
+                )
+                response.raise_for_status()
+                fields = self._parse_response(self._decode_response(response.content))
+            ok = True
             
         except requests.exceptions.HTTPError as exc:
-            error_detail = ""
-            try:
-                error_detail = exc.response.json().get("error", {}).get("message", str(exc))
-            except Exception:
-                error_detail = str(exc)
-            answer = f"[Groq API Hatası] {error_detail}"
-            prompt_tokens = None
-            completion_tokens = None
-            total_tokens = None
+            fields = {
+                "answer": self._format_http_error(exc.response, exc),
+                "provider_info": _error_info(exc.response),
+            }
             
         except Exception as exc:
-            answer = f"[Groq Hatası] {exc}"
-            prompt_tokens = None
-            completion_tokens = None
-            total_tokens = None
+            fields = {"answer": f"{self.error_prefix} {exc}", "provider_info": _error_info(None)}
         
-        latency = time.time() - t0
+        latency = time.perf_counter() - t0
         
-        return LLMAnalysis(
+        result = LLMAnalysis(
             provider=self.provider_id,
             model=model,
-            answer=answer,
             latency_sec=latency,
-            prompt_tokens=prompt_tokens,
-            completion_tokens=completion_tokens,
-            total_tokens=total_tokens,
+            **fields,
         )
-    
-    def health_check(self) -> bool:
-        if not GROQ_API_KEY:
-            return False
-        try:
-            response = requests.get(
-                f"{GROQ_API_BASE}/models",
-                headers={"Authorization": f"Bearer {GROQ_API_KEY}"},
-                timeout=10,
+        if ok:
+            exact_cache.put(cache_key, result)
+            semantic_cache.store(
+                self.provider_id, model, system_prompt, _with_context(prompt, dynamic_context), result
             )
-            return response.status_code == 200
-        except Exception:
-            return False
-
-
-# ============================================================================
-# OPENROUTER PROVIDER
-# ============================================================================
-
-
-class OpenRouterProvider(BaseLLMProvider):
-    """
-    OpenRouter provider'ı.
-    
-    Endpoint: https://openrouter.ai/api/v1/chat/completions
-    Auth: Bearer token
-    Format: OpenAI uyumlu
-    
-    Özellikler:
-    - 200+ model desteği (Claude, GPT-4, Gemini, Llama, vb.)
-    - Otomatik fallback
-    - Kullandıkça öde
-    """
-    
-    provider_id = "openrouter"
+        return result
     
-    def generate(
+    async def agenerate(
         self,
         prompt: str,
         model: str,
         system_prompt: Optional[str] = None,
         temperature: float = 0.7,
-        max_tokens: int = 2048,
+        max_tokens: Optional[int] = None,
+        stream: bool = False,
+        dynamic_context: Optional[str] = None,
+        rate_limit_retry: bool = True,
         **kwargs,
     ) -> LLMAnalysis:
+        """
+        generate() ile aynı, paylaşılan httpx.AsyncClient üzerinden asenkron.
+        """
+        if not self.is_configured():
+            return self._missing_key_result(model)
         
-        if not OPENROUTER_API_KEY:
-            return LLMAnalysis(
-                provider=self.provider_id,
-                model=model,
-                answer="[Hata] OPENROUTER_API_KEY tanımlı değil.",
-                latency_sec=0,
+        max_tokens = max_tokens or self.default_max_tokens
+        cache_prompt = _with_context(prompt, dynamic_context)
+        cache_key = exact_cache.make_key(
+            self.provider_id, model, system_prompt, cache_prompt, temperature, max_tokens
+        )
+        cached = exact_cache.get(cache_key)
+        if cached is None and semantic_cache.enabled:
+            cached = await asyncio.to_thread(
+                semantic_cache.lookup, self.provider_id, model, system_prompt, cache_prompt
             )
+        if cached is not None:
+            return cached
         
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": prompt})
+        flight_key = request_key(
+            self.provider_id, model, system_prompt, cache_prompt, temperature, max_tokens,
+            stream=stream, rate_limit_retry=rate_limit_retry,
+        )
+        inflight = HTTPLLMProvider._ainflight.setdefault(asyncio.get_running_loop(), {})
+        task = inflight.get(flight_key)
+        if task is None:
+            # Upstream çağrı ayrı bir Task: ilk çağıranın iptali (client
+            # disconnect) birleşen diğer istekleri iptal etmez
+            task = asyncio.ensure_future(
+                self._arequest(
+                    prompt, model, system_prompt, temperature, max_tokens, stream, cache_key,
+                    dynamic_context, rate_limit_retry,
+                )
+            )
+            inflight[flight_key] = task
+            task.add_done_callback(partial(_forget_inflight, inflight, flight_key))
+        return await asyncio.shield(task)
+    
+    async def _arequest(
+        self,
+        prompt: str,
+        model: str,
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        stream: bool,
+        cache_key: Optional[str],
+        dynamic_context: Optional[str] = None,
+        rate_limit_retry: bool = True,
+    ) -> LLMAnalysis:
+        """agenerate()'in upstream kısmı: HTTP çağrısı + cache'e yazma."""
+        url, body, params = self._build_request(
+            prompt, model, system_prompt, temperature, max_tokens, dynamic_context
+        )
         
-        t0 = time.time()
+        t0 = time.perf_counter()
+        ok = False
         
         try:
-            response = requests.post(
-                f"{OPENROUTER_API_BASE}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-                    "Content-Type": "application/json",
-                    "HTTP-Referer": "https://promptever.com",  # OpenRouter için gerekli
-                    "X-Title": "Promptever RAG Stack",
-                },
-                json={
-                    "model": model,
-                    "messages": messages,
-                    "temperature": temperature,
-                    "max_tokens": max_tokens,
-                },
-                timeout=120,
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            answer = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-            
-            usage = data.get("usage", {})
-            prompt_tokens = usage.get("prompt_tokens")
-            completion_tokens = usage.get("completion_tokens")
-            total_tokens = usage.get("total_tokens")
+            if stream:
+                fields = await self._apost_stream(url, body, params, t0)
+            else:
+                response = await _apost_with_retry(
+                    url,
+                    _RETRY_STATUSES if rate_limit_retry else _FAILOVER_RETRY_STATUSES,
+                    headers=self._post_headers,
+                    params=params,
+                    content=_encode_body(body),
+                    timeout=self.request_timeout,
+                )
+                response.raise_for_status()
+                fields = self._parse_response(self._decode_response(response.content))
+            ok = True
             
-            # OpenRouter ekstra bilgileri
-            provider_info = {
-                "id": data.get("id"),
-                "model_used": data.get("model"),  # Gerçekte kullanılan model
+        except httpx.HTTPStatusError as exc:
+            fields = {
+                "answer": self._format_http_error(exc.response, exc),
+                "provider_info": _error_info(exc.response),
             }
             
-        except requests.exceptions.HTTPError as exc:
-            error_detail = ""
-            try:
-                error_detail = exc.response.json().get("error", {}).get("message", str(exc))
-            except Exception:
-                error_detail = str(exc)
-            answer = f"[OpenRouter API Hatası] {error_detail}"
-            prompt_tokens = None
-            completion_tokens = None
-            total_tokens = None
-            provider_info = None
-            
         except Exception as exc:
-            answer = f"[OpenRouter Hatası] {exc}"
-            prompt_tokens = None
-            completion_tokens = None
-            total_tokens = None
-            provider_info = None
+            fields = {"answer": f"{self.error_prefix} {exc}", "provider_info": _error_info(None)}
         
-        latency = time.time() - t0
+        latency = time.perf_counter() - t0
         
-        return LLMAnalysis(
+        result = LLMAnalysis(
             provider=self.provider_id,
             model=model,
-            answer=answer,
             latency_sec=latency,
-            prompt_tokens=prompt_tokens,
-            completion_tokens=completion_tokens,
-            total_tokens=total_tokens,
-            provider_info=provider_info,
+            **fields,
         )
+        if ok:
+            exact_cache.put(cache_key, result)
+        if ok and semantic_cache.enabled:
+            await asyncio.to_thread(
+                semantic_cache.store,
+                self.provider_id,
+                model,
+                system_prompt,
+                _with_context(prompt, dynamic_context),
+                result,
+            )
+        return result
+    
+    def _post_stream(
+        self,
+        url: str,
+        body: Dict[str, Any],
+        params: Optional[Dict[str, str]],
+        t0: float,
+        session: requests.Session = _SESSION,
+    ) -> Dict[str, Any]:
+        url, body, params = self._stream_request(url, body, params)
+        acc = _StreamAccumulator(self, t0)
+        with session.post(
+            url,
+            headers=self._post_headers,
+            params=params,
+            data=_encode_body(body),
+            timeout=self.request_timeout,
+            stream=True,
+        ) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                acc.feed(line)
+        return acc.fields()
+    
+    async def _apost_stream(
+        self, url: str, body: Dict[str, Any], params: Optional[Dict[str, str]], t0: float
+    ) -> Dict[str, Any]:
+        url, body, params = self._stream_request(url, body, params)
+        acc = _StreamAccumulator(self, t0)
+        async with _get_async_client().stream(
+            "POST",
+            url,
+            headers=self._post_headers,
+            params=params,
+            content=_encode_body(body),
+            timeout=self.request_timeout,
+        ) as response:
+            if response.is_error:
+                await response.aread()  # Hata mesajı için gövde okunmalı
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                acc.feed(line.encode("utf-8"))
+        return acc.fields()
     
     def health_check(self) -> bool:
-        if not OPENROUTER_API_KEY:
+        """
+        Provider'ın erişilebilir olup olmadığını kontrol et.
+        
+        Returns:
+            bool: Erişilebilir ise True
+        """
+        if not self.is_configured():
+            return False
+        url, headers, params = self._health
+        try:
+            response = _HEALTH_SESSION.get(url, headers=headers, params=params, timeout=self.health_timeout)
+            return response.status_code == 200
+        except Exception:
+            return False
+    
+    async def ahealth_check(self) -> bool:
+        """health_check()'in asenkron karşılığı."""
+        if not self.is_configured():
             return False
+        url, headers, params = self._health
         try:
-            response = requests.get(
-                f"{OPENROUTER_API_BASE}/models",
-                headers={"Authorization": f"Bearer {OPENROUTER_API_KEY}"},
-                timeout=10,
+            response = await _get_async_client().get(
+                url, headers=headers, params=params, timeout=self.health_timeout
             )
             return response.status_code == 200
         except Exception:
             return False
 
 
-# ============================================================================
-# GOOGLE AI STUDIO (GEMINI) PROVIDER
-# ============================================================================
+def _forget_inflight(inflight: Dict[str, asyncio.Task], key: str, task: asyncio.Task) -> None:
+    """Biten upstream Task'ı single-flight tablosundan çıkarır."""
+    if inflight.get(key) is task:
+        del inflight[key]
+    if not task.cancelled():
+        task.exception()  # Bekleyen kalmadıysa "never retrieved" uyarısı çıkmasın
 
 
-class GoogleProvider(BaseLLMProvider):
+@lru_cache(maxsize=64)
+def _body_tail(fixed: Tuple[Tuple[str, type, Any], ...]) -> bytes:
+    """Sabit alanların JSON'u, açılış '{' olmadan ('"model":...,"max_tokens":2048}')."""
+    # Tip anahtarın parçası: 0 / 0.0 / False aynı hash'e düşmesin
+    return orjson.dumps({k: v for k, _, v in fixed})[1:]
+
+
+def _encode_body(body: Dict[str, Any]) -> bytes:
     """
-    Google AI Studio (Gemini) provider'ı.
+    İstek gövdesi → JSON bytes.
     
-    Endpoint: https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent
-    Auth: API Key (query param)
-    Format: Google özel format
+    Chat formatında sadece messages her çağrıda değişir; model/temperature/
+    max_tokens/stream kısmı hazır şablondan eklenir. messages olmayan ya da
+    hashlenemeyen alan içeren gövdeler (Gemini, Ollama options) doğrudan
+    orjson ile serialize edilir.
+    """
+    messages = body.get("messages")
+    fixed = tuple((k, type(v), v) for k, v in body.items() if k != "messages")
+    if messages is None or not fixed:
+        return orjson.dumps(body)
+    try:
+        tail = _body_tail(fixed)
+    except TypeError:
+        return orjson.dumps(body)
+    return b'{"messages":' + orjson.dumps(messages) + b"," + tail
+
+
+def _error_info(response: Any) -> Dict[str, Any]:
+    """Başarısız çağrı metadata'sı (failover kararları status_code'a bakar)."""
+    return {
+        "error": True,
+        "status_code": getattr(response, "status_code", None),
+        "retry_after": _retry_after(response),
+    }
+
+
+def _retry_after(response: Any) -> Optional[float]:
+    """Retry-After header'ı (saniye); yoksa veya tarih formatındaysa None."""
+    headers = getattr(response, "headers", None)
+    value = headers.get("Retry-After") if headers is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _with_context(prompt: str, dynamic_context: Optional[str]) -> str:
+    """Cache anahtarları için dinamik bağlam + prompt."""
+    return f"{dynamic_context}\n\n{prompt}" if dynamic_context else prompt
+
+
+def _chat_messages(
+    prompt: str,
+    system_prompt: Optional[str],
+    dynamic_context: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    OpenAI/Ollama formatında mesaj listesi.
     
-    Özellikler:
-    - Gemini 1.5/2.0 modelleri
-    - 1M+ token context window
-    - Multimodal destek
+    Sıra: sabit system → dinamik bağlam (user) → soru (user). Sabit kısım
+    her çağrıda aynı kaldığı için provider tarafı prefix cache'i tutar.
     """
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    if dynamic_context:
+        messages.append({"role": "user", "content": dynamic_context})
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+# ----------------------------------------------------------------------------
+# Yanıt şemaları (msgspec)
+# ----------------------------------------------------------------------------
+
+
+class _OAIUsage(msgspec.Struct):
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    total_tokens: Optional[int] = None
+
+
+class _OAIMessage(msgspec.Struct):
+    content: Optional[str] = None
+
+
+class _OAIChoice(msgspec.Struct):
+    message: Optional[_OAIMessage] = None  # Normal yanıt
+    delta: Optional[_OAIMessage] = None    # Stream parçası
+
+
+class _OAICompletion(msgspec.Struct):
+    """OpenAI uyumlu chat/completions yanıtı ve stream parçası."""
+    choices: List[_OAIChoice] = msgspec.field(default_factory=list)
+    usage: Optional[_OAIUsage] = None
+    id: Optional[str] = None
+    model: Optional[str] = None
+    time_info: Optional[Dict[str, Any]] = None  # Cerebras
+
+
+class _GeminiPart(msgspec.Struct):
+    text: str = ""
+
+
+class _GeminiContent(msgspec.Struct):
+    parts: List[_GeminiPart] = msgspec.field(default_factory=list)
+
+
+class _GeminiCandidate(msgspec.Struct):
+    content: Optional[_GeminiContent] = None
+
+
+class _GeminiUsage(msgspec.Struct):
+    promptTokenCount: Optional[int] = None
+    candidatesTokenCount: Optional[int] = None
+    totalTokenCount: Optional[int] = None
+
+
+class _GeminiResponse(msgspec.Struct):
+    candidates: List[_GeminiCandidate] = msgspec.field(default_factory=list)
+    usageMetadata: Optional[_GeminiUsage] = None
+
+
+_OAI_DECODER = msgspec.json.Decoder(_OAICompletion)
+_GEMINI_DECODER = msgspec.json.Decoder(_GeminiResponse)
+
+
+def _usage_fields(usage: Optional[_OAIUsage]) -> Dict[str, Optional[int]]:
+    if usage is None:
+        return {"prompt_tokens": None, "completion_tokens": None, "total_tokens": None}
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens,
+    }
+
+
+def _parse_openai_response(resp: _OAICompletion) -> Dict[str, Any]:
+    """OpenAI uyumlu chat/completions yanıtı."""
+    message = resp.choices[0].message if resp.choices else None
+    return {
+        "answer": (message.content if message else None) or "",
+        **_usage_fields(resp.usage),
+    }
+
+
+def _parse_openai_stream_chunk(resp: _OAICompletion) -> Dict[str, Any]:
+    """OpenAI uyumlu SSE parçası (choices[0].delta); usage son parçada gelir."""
+    delta = resp.choices[0].delta if resp.choices else None
+    return {
+        "answer": (delta.content if delta else None) or "",
+        **_usage_fields(resp.usage),
+    }
+
+
+class _StreamAccumulator:
+    """
+    Stream parçalarını tek bir LLMAnalysis alan setinde toplar.
     
-    provider_id = "google"
+    answer parçaları birleştirilir, diğer alanlarda son dolu değer kalır.
+    """
     
-    def generate(
-        self,
-        prompt: str,
-        model: str,
-        system_prompt: Optional[str] = None,
-        temperature: float = 0.7,
-        max_tokens: int = 8192,
-        **kwargs,
-    ) -> LLMAnalysis:
-        
-        if not GOOGLE_API_KEY:
-            return LLMAnalysis(
-                provider=self.provider_id,
-                model=model,
-                answer="[Hata] GOOGLE_API_KEY tanımlı değil.",
-                latency_sec=0,
-            )
-        
-        # Google formatında içerik oluştur
-        contents = []
-        
-        # System instruction (Gemini'de ayrı bir alan)
-        system_instruction = None
-        if system_prompt:
-            system_instruction = {"parts": [{"text": system_prompt}]}
-        
-        # User message
-        contents.append({
-            "role": "user",
-            "parts": [{"text": prompt}]
-        })
-        
-        t0 = time.time()
-        
-        try:
-            request_body = {
-                "contents": contents,
-                "generationConfig": {
-                    "temperature": temperature,
-                    "maxOutputTokens": max_tokens,
-                },
-            }
-            
-            if system_instruction:
-                request_body["systemInstruction"] = system_instruction
-            
-            response = requests.post(
-                f"{GOOGLE_API_BASE}/models/{model}:generateContent",
-                params={"key": GOOGLE_API_KEY},
-                headers={"Content-Type": "application/json"},
-                json=request_body,
-                timeout=120,
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            # Gemini response parsing
-            candidates = data.get("candidates", [])
-            if candidates:
-                content = candidates[0].get("content", {})
-                parts = content.get("parts", [])
-                answer = parts[0].get("text", "") if parts else ""
-            else:
-                answer = ""
-            
-            # Token istatistikleri
-            usage_metadata = data.get("usageMetadata", {})
-            prompt_tokens = usage_metadata.get("promptTokenCount")
-            completion_tokens = usage_metadata.get("candidatesTokenCount")
-            total_tokens = usage_metadata.get("totalTokenCount")
-            
-        except requests.exceptions.HTTPError as exc:
-            error_detail = ""
-            try:
-                error_data = exc.response.json()
-                error_detail = error_data.get("error", {}).get("message", str(exc))
-            except Exception:
-                error_detail = str(exc)
-            answer = f"[Google AI Hatası] {error_detail}"
-            prompt_tokens = None
-            completion_tokens = None
-            total_tokens = None
-            
-        except Exception as exc:
-            answer = f"[Google AI Hatası] {exc}"
-            prompt_tokens = None
-            completion_tokens = None
-            total_tokens = None
-        
-        latency = time.time() - t0
+    def __init__(self, provider: HTTPLLMProvider, t0: float):
+        self.provider = provider
+        self.t0 = t0
+        self.parts: List[str] = []
+        self.extra: Dict[str, Any] = {}
+        self.first_token_sec: Optional[float] = None
+    
+    def feed(self, line: bytes) -> None:
+        data = self.provider._decode_stream_line(line)
+        if data is None:
+            return
+        chunk = self.provider._parse_stream_chunk(data)
+        text = chunk.pop("answer", None)
+        if text:
+            if self.first_token_sec is None:
+                self.first_token_sec = time.perf_counter() - self.t0
+            self.parts.append(text)
+        for key, value in chunk.items():
+            if value is not None:
+                self.extra[key] = value
+    
+    def fields(self) -> Dict[str, Any]:
+        provider_info = dict(self.extra.get("provider_info") or {})
+        provider_info["stream"] = True
+        provider_info["first_token_sec"] = self.first_token_sec
+        return {
+            **self.extra,
+            "answer": "".join(self.parts),
+            "provider_info": provider_info,
+        }
+
+
+# ============================================================================
+# LOCAL (OLLAMA) PROVIDER
+# ============================================================================
+
+
+class OllamaProvider(HTTPLLMProvider):
+    """
+    Yerel Ollama sunucusu provider'ı.
+    
+    Endpoint: http://{OLLAMA_HOST}/api/chat
+    Auth: Yok (yerel sunucu)
+    """
+    
+    provider_id = "local"
+    error_prefix = "[Ollama Hatası]"
+    request_timeout = 300
+    health_timeout = 5
+    
+    def _build_request(self, prompt, model, system_prompt, temperature, max_tokens, dynamic_context=None):
+        body = {
+            "model": model,
+            "messages": _chat_messages(prompt, system_prompt, dynamic_context),
+            "stream": False,
+            "options": {
+                "temperature": temperature,
+                "num_predict": max_tokens,
+            },
+        }
+        return f"{OLLAMA_HOST}/api/chat", body, None
+    
+    def _parse_response(self, data):
+        # Token istatistikleri (Ollama formatı)
+        prompt_tokens = data.get("prompt_eval_count")
+        completion_tokens = data.get("eval_count")
+        total_tokens = None
+        if prompt_tokens and completion_tokens:
+            total_tokens = prompt_tokens + completion_tokens
         
-        return LLMAnalysis(
-            provider=self.provider_id,
-            model=model,
-            answer=answer,
-            latency_sec=latency,
-            prompt_tokens=prompt_tokens,
-            completion_tokens=completion_tokens,
-            total_tokens=total_tokens,
-        )
+        return {
+            "answer": data.get("message", {}).get("content", ""),
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": total_tokens,
+        }
     
-    def health_check(self) -> bool:
-        if not GOOGLE_API_KEY:
-            return False
-        try:
-            response = requests.get(
-                f"{GOOGLE_API_BASE}/models",
-                params={"key": GOOGLE_API_KEY},
-                timeout=10,
-            )
-            return response.status_code == 200
-        except Exception:
-            return False
+    def _decode_stream_line(self, line):
+        # Ollama stream'i SSE değil, satır başına bir JSON (NDJSON)
+        return orjson.loads(line) if line.strip() else None
+    
+    def _health_request(self):
+        return f"{OLLAMA_HOST}/api/tags", None, None
 
 
 # ============================================================================
-# CEREBRAS PROVIDER
+# OPENAI UYUMLU PROVIDER'LAR
 # ============================================================================
 
 
-class CerebrasProvider(BaseLLMProvider):
+class OpenAICompatibleProvider(HTTPLLMProvider):
+    """
+    OpenAI uyumlu /chat/completions API'leri için ortak provider.
+    
+    Alt sınıflar sadece yapılandırma verir:
+    - base_url: API kök adresi (…/chat/completions ve …/models buna eklenir)
+    - extra_headers: Authorization/Content-Type dışındaki header'lar
+    - error_json_path: Hata yanıtında mesajın JSON yolu
+    - _provider_info(): Yanıttan provider'a özel metadata (opsiyonel)
+    """
+    
+    base_url: str = ""
+    extra_headers: Optional[Dict[str, str]] = None
+    error_json_path: Tuple[str, ...] = ("error", "message")
+    
+    def _request_headers(self):
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            **(self.extra_headers or {}),
+        }
+    
+    def _build_request(self, prompt, model, system_prompt, temperature, max_tokens, dynamic_context=None):
+        body = {
+            "model": model,
+            "messages": _chat_messages(prompt, system_prompt, dynamic_context),
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        return f"{self.base_url}/chat/completions", body, None
+    
+    def _provider_info(self, resp: _OAICompletion) -> Optional[Dict[str, Any]]:
+        """Provider'a özel ekstra bilgi; None ise provider_info set edilmez."""
+        return None
+    
+    def _decode_response(self, content):
+        return _OAI_DECODER.decode(content)
+    
+    def _parse_response(self, resp):
+        fields = _parse_openai_response(resp)
+        info = self._provider_info(resp)
+        if info is not None:
+            fields["provider_info"] = info
+        return fields
+    
+    def _parse_stream_chunk(self, resp):
+        fields = _parse_openai_stream_chunk(resp)
+        info = self._provider_info(resp)
+        if info is not None:
+            fields["provider_info"] = info
+        return fields
+    
+    def _error_detail(self, data):
+        for key in self.error_json_path:
+            if not isinstance(data, dict):
+                return None
+            data = data.get(key)
+        return data
+    
+    def _health_request(self):
+        return f"{self.base_url}/models", {"Authorization": f"Bearer {self.api_key}"}, None
+
+
+class GroqProvider(OpenAICompatibleProvider):
+    """
+    Groq Cloud provider'ı.
+    
+    Endpoint: https://api.groq.com/openai/v1/chat/completions
+    Auth: Bearer token
+    Format: OpenAI uyumlu
+    """
+    
+    provider_id = "groq"
+    api_key = GROQ_API_KEY
+    api_key_name = "GROQ_API_KEY"
+    error_prefix = "[Groq Hatası]"
+    api_error_prefix = "[Groq API Hatası]"
+    base_url = GROQ_API_BASE
+
+
+class OpenRouterProvider(OpenAICompatibleProvider):
+    """
+    OpenRouter provider'ı.
+    
+    Endpoint: https://openrouter.ai/api/v1/chat/completions
+    Auth: Bearer token
+    Format: OpenAI uyumlu
+    
+    Özellikler:
+    - 200+ model desteği (Claude, GPT-4, Gemini, Llama, vb.)
+    - Otomatik fallback
+    - Kullandıkça öde
+    """
+    
+    provider_id = "openrouter"
+    api_key = OPENROUTER_API_KEY
+    api_key_name = "OPENROUTER_API_KEY"
+    error_prefix = "[OpenRouter Hatası]"
+    api_error_prefix = "[OpenRouter API Hatası]"
+    base_url = OPENROUTER_API_BASE
+    extra_headers = {
+        "HTTP-Referer": "https://promptever.com",  # OpenRouter için gerekli
+        "X-Title": "Promptever RAG Stack",
+    }
+    
+    def _build_request(self, prompt, model, system_prompt, temperature, max_tokens, dynamic_context=None):
+        url, body, params = super()._build_request(
+            prompt, model, system_prompt, temperature, max_tokens, dynamic_context
+        )
+        # Anthropic modelleri prompt cache'i açıkça ister: sabit system
+        # bloğunu cache_control ile işaretle.
+        if system_prompt and model.startswith("anthropic/"):
+            body["messages"][0] = {
+                "role": "system",
+                "content": [{
+                    "type": "text",
+                    "text": system_prompt,
+                    "cache_control": {"type": "ephemeral"},
+                }],
+            }
+        return url, body, params
+    
+    def _provider_info(self, resp):
+        # Stream'de id her parçada gelir; boş parçalarda atla
+        if not resp.id:
+            return None
+        return {
+            "id": resp.id,
+            "model_used": resp.model,  # Gerçekte kullanılan model
+        }
+
+
+class CerebrasProvider(OpenAICompatibleProvider):
     """
     Cerebras Cloud provider'ı.
     
@@ -625,114 +1188,24 @@ class CerebrasProvider(BaseLLMProvider):
     """
     
     provider_id = "cerebras"
+    api_key = CEREBRAS_API_KEY
+    api_key_name = "CEREBRAS_API_KEY"
+    error_prefix = "[Cerebras Hatası]"
+    api_error_prefix = "[Cerebras API Hatası]"
+    request_timeout = 60  # Cerebras çok hızlı, kısa timeout yeterli
+    base_url = CEREBRAS_API_BASE
     
-    def generate(
-        self,
-        prompt: str,
-        model: str,
-        system_prompt: Optional[str] = None,
-        temperature: float = 0.7,
-        max_tokens: int = 2048,
-        **kwargs,
-    ) -> LLMAnalysis:
-        
-        if not CEREBRAS_API_KEY:
-            return LLMAnalysis(
-                provider=self.provider_id,
-                model=model,
-                answer="[Hata] CEREBRAS_API_KEY tanımlı değil.",
-                latency_sec=0,
-            )
-        
-        messages = []
-        if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": prompt})
-        
-        t0 = time.time()
-        
-        try:
-            response = requests.post(
-                f"{CEREBRAS_API_BASE}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {CEREBRAS_API_KEY}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": model,
-                    "messages": messages,
-                    "temperature": temperature,
-                    "max_tokens": max_tokens,
-                },
-                timeout=60,  # Cerebras çok hızlı, kısa timeout yeterli
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            answer = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-            
-            usage = data.get("usage", {})
-            prompt_tokens = usage.get("prompt_tokens")
-            completion_tokens = usage.get("completion_tokens")
-            total_tokens = usage.get("total_tokens")
-            
-            # Cerebras performans metrikleri
-            provider_info = {
-                "time_info": data.get("time_info", {}),  # Cerebras'ın detaylı timing bilgisi
-            }
-            
-        except requests.exceptions.HTTPError as exc:
-            error_detail = ""
-            try:
-                error_detail = exc.response.json().get("error", {}).get("message", str(exc))
-            except Exception:
-                error_detail = str(exc)
-            answer = f"[Cerebras API Hatası] {error_detail}"
-            prompt_tokens = None
-            completion_tokens = None
-            total_tokens = None
-            provider_info = None
-            
-        except Exception as exc:
-            answer = f"[Cerebras Hatası] {exc}"
-            prompt_tokens = None
-            completion_tokens = None
-            total_tokens = None
-            provider_info = None
-        
-        latency = time.time() - t0
-        
-        return LLMAnalysis(
-            provider=self.provider_id,
-            model=model,
-            answer=answer,
-            latency_sec=latency,
-            prompt_tokens=prompt_tokens,
-            completion_tokens=completion_tokens,
-            total_tokens=total_tokens,
-            provider_info=provider_info,
-        )
+    def _provider_info(self, resp):
+        # Cerebras'ın detaylı timing bilgisi (stream'de sadece son parçada gelir)
+        return {"time_info": resp.time_info} if resp.time_info else None
     
-    def health_check(self) -> bool:
-        if not CEREBRAS_API_KEY:
-            return False
-        try:
-            response = requests.get(
-                f"{CEREBRAS_API_BASE}/models",
-                headers={"Authorization": f"Bearer {CEREBRAS_API_KEY}"},
-                timeout=10,
-            )
-            return response.status_code == 200
-        except Exception:
-            return False
+    def _parse_response(self, resp):
+        fields = super()._parse_response(resp)
+        fields.setdefault("provider_info", {"time_info": {}})
+        return fields
 
 
-# ============================================================================
-# MISTRAL AI PROVIDER
-# ============================================================================
-
-
-class MistralProvider(BaseLLMProvider):
+class MistralProvider(OpenAICompatibleProvider):
     """
     Mistral AI provider'ı.
     
@@ -748,98 +1221,218 @@ class MistralProvider(BaseLLMProvider):
     """
     
     provider_id = "mistral"
+    api_key = MISTRAL_API_KEY
+    api_key_name = "MISTRAL_API_KEY"
+    error_prefix = "[Mistral Hatası]"
+    api_error_prefix = "[Mistral API Hatası]"
+    base_url = MISTRAL_API_BASE
+    error_json_path = ("message",)
+
+
+# ============================================================================
+# GOOGLE AI STUDIO (GEMINI) PROVIDER
+# ============================================================================
+
+
+class GoogleProvider(HTTPLLMProvider):
+    """
+    Google AI Studio (Gemini) provider'ı.
     
-    def generate(
-        self,
-        prompt: str,
-        model: str,
-        system_prompt: Optional[str] = None,
-        temperature: float = 0.7,
-        max_tokens: int = 2048,
-        **kwargs,
-    ) -> LLMAnalysis:
-        
-        if not MISTRAL_API_KEY:
-            return LLMAnalysis(
-                provider=self.provider_id,
-                model=model,
-                answer="[Hata] MISTRAL_API_KEY tanımlı değil.",
-                latency_sec=0,
-            )
+    Endpoint: https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent
+    Auth: API Key (query param)
+    Format: Google özel format
+    
+    Özellikler:
+    - Gemini 1.5/2.0 modelleri
+    - 1M+ token context window
+    - Multimodal destek
+    """
+    
+    provider_id = "google"
+    api_key = GOOGLE_API_KEY
+    api_key_name = "GOOGLE_API_KEY"
+    error_prefix = "[Google AI Hatası]"
+    api_error_prefix = "[Google AI Hatası]"
+    default_max_tokens = 8192
+    
+    def _build_request(self, prompt, model, system_prompt, temperature, max_tokens, dynamic_context=None):
+        # Google formatında içerik oluştur; dinamik bağlam contents'e gider,
+        # systemInstruction sadece sabit kısmı taşır (implicit context cache)
+        parts = [{"text": dynamic_context}] if dynamic_context else []
+        parts.append({"text": prompt})
+        request_body = {
+            "contents": [{
+                "role": "user",
+                "parts": parts
+            }],
+            "generationConfig": {
+                "temperature": temperature,
+                "maxOutputTokens": max_tokens,
+            },
+        }
         
-        messages = []
+        # System instruction (Gemini'de ayrı bir alan)
         if system_prompt:
-            messages.append({"role": "system", "content": system_prompt})
-        messages.append({"role": "user", "content": prompt})
+            request_body["systemInstruction"] = {"parts": [{"text": system_prompt}]}
         
-        t0 = time.time()
+        url = f"{GOOGLE_API_BASE}/models/{model}:generateContent"
+        return url, request_body, {"key": GOOGLE_API_KEY}
+    
+    def _decode_response(self, content):
+        return _GEMINI_DECODER.decode(content)
+    
+    def _parse_response(self, resp):
+        # Gemini response parsing
+        content = resp.candidates[0].content if resp.candidates else None
+        answer = content.parts[0].text if content and content.parts else ""
         
-        try:
-            response = requests.post(
-                f"{MISTRAL_API_BASE}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {MISTRAL_API_KEY}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": model,
-                    "messages": messages,
-                    "temperature": temperature,
-                    "max_tokens": max_tokens,
-                },
-                timeout=120,
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            answer = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-            
-            usage = data.get("usage", {})
-            prompt_tokens = usage.get("prompt_tokens")
-            completion_tokens = usage.get("completion_tokens")
-            total_tokens = usage.get("total_tokens")
-            
-        except requests.exceptions.HTTPError as exc:
-            error_detail = ""
-            try:
-                error_detail = exc.response.json().get("message", str(exc))
-            except Exception:
-                error_detail = str(exc)
-            answer = f"[Mistral API Hatası] {error_detail}"
-            prompt_tokens = None
-            completion_tokens = None
-            total_tokens = None
+        # Token istatistikleri
+        usage = resp.usageMetadata
+        if usage is None:
+            return {"answer": answer, "prompt_tokens": None, "completion_tokens": None, "total_tokens": None}
+        return {
+            "answer": answer,
+            "prompt_tokens": usage.promptTokenCount,
+            "completion_tokens": usage.candidatesTokenCount,
+            "total_tokens": usage.totalTokenCount,
+        }
+    
+    def _stream_request(self, url, body, params):
+        # Gemini: ayrı endpoint + SSE formatı
+        url = url.replace(":generateContent", ":streamGenerateContent")
+        return url, body, {**(params or {}), "alt": "sse"}
+    
+    def _health_request(self):
+        return f"{GOOGLE_API_BASE}/models", None, {"key": GOOGLE_API_KEY}
+
+
+# ============================================================================
+# MULTIPLEX (FAILOVER) PROVIDER
+# ============================================================================
+
+
+class _MuxEntry:
+    """Multiplex havuzundaki tek bir (provider, model) ve istatistikleri."""
+    
+    __slots__ = ("provider", "model", "weight", "ewma_latency", "failure_count", "cooldown_until")
+    
+    def __init__(self, provider: BaseLLMProvider, model: str, weight: float):
+        self.provider = provider
+        self.model = model
+        self.weight = weight
+        self.ewma_latency = 0.0
+        self.failure_count = 0
+        self.cooldown_until = 0.0
+
+
+class MultiplexedProvider(BaseLLMProvider):
+    """
+    Eşdeğer OpenAI uyumlu provider'lar üzerinde ağırlıklı yük dağıtımı.
+    
+    Seçim ağırlığı: weight / ((1 + ewma_latency) * (1 + ardışık hata)). 429 alan giriş
+    Retry-After (yoksa LLM_MULTIPLEX_COOLDOWN) süresince devre dışı kalır;
+    429/5xx ve bağlantı hatalarında istek sıradaki provider'a aktarılır.
+    
+    model parametresi yok sayılır; her giriş kendi modelini kullanır.
+    Havuz config'deki LLM_MULTIPLEX_POOL'dan gelir.
+    """
+    
+    provider_id = "multiplex"
+    error_prefix = "[Multiplex Hatası]"
+    
+    _EWMA_ALPHA = 0.3
+    
+    def __init__(self, providers: Optional[List[Tuple[BaseLLMProvider, str, float]]] = None):
+        if providers is None:
+            providers = [
+                (LLMProviderFactory.get_provider(pid), model, weight)
+                for pid, model, weight in LLM_MULTIPLEX_POOL
+            ]
+        self._entries = [_MuxEntry(p, model, weight) for p, model, weight in providers]
+        self._lock = threading.Lock()
+    
+    def is_configured(self) -> bool:
+        return any(e.provider.is_configured() for e in self._entries)
+    
+    def _pick(self, tried: List[_MuxEntry]) -> Optional[_MuxEntry]:
+        now = time.monotonic()
+        candidates = [
+            e for e in self._entries
+            if e not in tried and e.provider.is_configured()
+        ]
+        ready = [e for e in candidates if e.cooldown_until <= now]
+        pool = ready or candidates
+        if not pool:
+            return None
+        weights = [e.weight / ((1.0 + e.ewma_latency) * (1 + e.failure_count)) for e in pool]
+        return random.choices(pool, weights=weights)[0]
+    
+    def _record(self, entry: _MuxEntry, result: LLMAnalysis) -> bool:
+        """Sonucu istatistiklere işle; failover gerekiyorsa True döner."""
+        info = result.provider_info or {}
+        with self._lock:
+            if not info.get("error"):
+                alpha = self._EWMA_ALPHA
+                entry.ewma_latency = (1 - alpha) * entry.ewma_latency + alpha * (result.latency_sec or 0.0)
+                entry.failure_count = 0
+                return False
             
-        except Exception as exc:
-            answer = f"[Mistral Hatası] {exc}"
-            prompt_tokens = None
-            completion_tokens = None
-            total_tokens = None
-        
-        latency = time.time() - t0
-        
+            status = info.get("status_code")
+            retryable = status is None or status == 429 or status >= 500
+            if retryable:
+                entry.failure_count += 1
+                if status == 429:
+                    cooldown = info.get("retry_after") or LLM_MULTIPLEX_COOLDOWN
+                    entry.cooldown_until = time.monotonic() + cooldown
+            return retryable
+    
+    def _no_provider_result(self, last: Optional[LLMAnalysis]) -> LLMAnalysis:
+        if last is not None:
+            return last
         return LLMAnalysis(
             provider=self.provider_id,
-            model=model,
-            answer=answer,
-            latency_sec=latency,
-            prompt_tokens=prompt_tokens,
-            completion_tokens=completion_tokens,
-            total_tokens=total_tokens,
+            model="auto",
+            answer=f"{self.error_prefix} Havuzda yapılandırılmış provider yok.",
+            latency_sec=0,
         )
     
-    def health_check(self) -> bool:
-        if not MISTRAL_API_KEY:
-            return False
-        try:
-            response = requests.get(
-                f"{MISTRAL_API_BASE}/models",
-                headers={"Authorization": f"Bearer {MISTRAL_API_KEY}"},
-                timeout=10,
+    def generate(self, prompt, model=None, system_prompt=None, temperature=0.7,
+                 max_tokens=None, stream=False, dynamic_context=None, **kwargs) -> LLMAnalysis:
+        tried: List[_MuxEntry] = []
+        result: Optional[LLMAnalysis] = None
+        while (entry := self._pick(tried)) is not None:
+            tried.append(entry)
+            result = entry.provider.generate(
+                prompt, entry.model, system_prompt, temperature, max_tokens,
+                stream=stream, dynamic_context=dynamic_context, rate_limit_retry=False,
             )
-            return response.status_code == 200
-        except Exception:
-            return False
+            if not self._record(entry, result):
+                return result
+        return self._no_provider_result(result)
+    
+    async def agenerate(self, prompt, model=None, system_prompt=None, temperature=0.7,
+                        max_tokens=None, stream=False, dynamic_context=None, **kwargs) -> LLMAnalysis:
+        tried: List[_MuxEntry] = []
+        result: Optional[LLMAnalysis] = None
+        while (entry := self._pick(tried)) is not None:
+            tried.append(entry)
+            result = await entry.provider.agenerate(
+                prompt, entry.model, system_prompt, temperature, max_tokens,
+                stream=stream, dynamic_context=dynamic_context, rate_limit_retry=False,
+            )
+            if not self._record(entry, result):
+                return result
+        return self._no_provider_result(result)
+    
+    def health_check(self) -> bool:
+        return any(e.provider.health_check() for e in self._entries)
+    
+    async def ahealth_check(self) -> bool:
+        checks = await asyncio.gather(
+            *(e.provider.ahealth_check() for e in self._entries),
+            return_exceptions=True,
+        )
+        return any(ok is True for ok in checks)
 
 
 # ============================================================================
@@ -861,6 +1454,11 @@ class LLMProviderFactory:
         
         # Sağlık kontrolü
         health = LLMProviderFactory.health_check_all()
+        
+        # Birden fazla provider'ı paralel karşılaştır
+        results = await LLMProviderFactory.ainvoke_all(
+            prompt="...", models={"groq": "llama-3.3-70b-versatile", "cerebras": "llama3.1-8b"}
+        )
     """
     
     _providers: Dict[str, Type[BaseLLMProvider]] = {
@@ -870,9 +1468,17 @@ class LLMProviderFactory:
         "google": GoogleProvider,
         "cerebras": CerebrasProvider,
         "mistral": MistralProvider,
+        "multiplex": MultiplexedProvider,
     }
     
     _instances: Dict[str, BaseLLMProvider] = {}
+    # RLock: MultiplexedProvider kurulurken havuzdaki provider'lar için
+    # get_provider tekrar çağrılır.
+    _lock = threading.RLock()
+    
+    # Sağlık sonuçları kısa süre cache'lenir (provider_id -> (zaman, sonuç))
+    _HEALTH_TTL: float = 30.0
+    _health_cache: Dict[str, Tuple[float, bool]] = {}
     
     @classmethod
     def get_provider(cls, provider_id: str) -> BaseLLMProvider:
@@ -892,10 +1498,16 @@ class LLMProviderFactory:
             valid = list(cls._providers.keys())
             raise ValueError(f"Geçersiz provider: {provider_id}. Geçerli değerler: {valid}")
         
-        if provider_id not in cls._instances:
-            cls._instances[provider_id] = cls._providers[provider_id]()
+        instance = cls._instances.get(provider_id)
+        if instance is None:
+            # Double-checked locking: eşzamanlı ilk çağrılar tek instance kurar
+            with cls._lock:
+                instance = cls._instances.get(provider_id)
+                if instance is None:
+                    instance = cls._providers[provider_id]()
+                    cls._instances[provider_id] = instance
         
-        return cls._instances[provider_id]
+        return instance
     
     @classmethod
     def list_providers(cls) -> List[ProviderInfo]:
@@ -925,22 +1537,149 @@ class LLMProviderFactory:
         provider = cls.get_provider(provider_id)
         return provider.get_models()
     
+    @classmethod
+    def _cached_health(cls) -> Tuple[Dict[str, bool], List[str]]:
+        """TTL içindeki sonuçlar ve yenilenmesi gereken provider ID'leri."""
+        now = time.monotonic()
+        fresh, stale = {}, []
+        for provider_id in cls._providers.keys():
+            entry = cls._health_cache.get(provider_id)
+            if entry is not None and now - entry[0] < cls._HEALTH_TTL:
+                fresh[provider_id] = entry[1]
+            else:
+                stale.append(provider_id)
+        return fresh, stale
+    
+    @classmethod
+    def _store_health(cls, provider_id: str, healthy: bool) -> None:
+        cls._health_cache[provider_id] = (time.monotonic(), healthy)
+    
+    @classmethod
+    def invalidate_health(cls, provider_id: Optional[str] = None) -> None:
+        """
+        Sağlık cache'ini temizle (tek provider veya hepsi).
+        """
+        if provider_id is None:
+            cls._health_cache.clear()
+        else:
+            cls._health_cache.pop(provider_id, None)
+    
     @classmethod
     def health_check_all(cls) -> Dict[str, bool]:
         """
         Tüm provider'ların sağlık durumunu kontrol et.
         
+        Son _HEALTH_TTL saniye içinde kontrol edilenler tekrar sorgulanmaz.
+        
         Returns:
             Dict[str, bool]: Provider ID -> sağlık durumu
         """
-        results = {}
-        for provider_id in cls._providers.keys():
+        results, stale = cls._cached_health()
+        for provider_id in stale:
             try:
                 provider = cls.get_provider(provider_id)
                 results[provider_id] = provider.health_check()
             except Exception:
                 results[provider_id] = False
-        return results
+            cls._store_health(provider_id, results[provider_id])
+        return {pid: results[pid] for pid in cls._providers.keys()}
+    
+    @classmethod
+    async def ahealth_check_all(cls) -> Dict[str, bool]:
+        """
+        Tüm provider'ları paralel (asyncio.gather) kontrol et.
+        
+        Son _HEALTH_TTL saniye içinde kontrol edilenler tekrar sorgulanmaz.
+        
+        Returns:
+            Dict[str, bool]: Provider ID -> sağlık durumu
+        """
+        results, stale = cls._cached_health()
+        checks = await asyncio.gather(
+            *(cls.get_provider(pid).ahealth_check() for pid in stale),
+            return_exceptions=True,
+        )
+        for provider_id, ok in zip(stale, checks):
+            results[provider_id] = ok is True
+            cls._store_health(provider_id, results[provider_id])
+        return {pid: results[pid] for pid in cls._providers.keys()}
+    
+    @classmethod
+    async def prewarm(cls) -> Dict[str, bool]:
+        """
+        Process başında tüm provider host'larına bağlantı aç.
+        
+        Hem sync Session hem AsyncClient havuzunda TCP+TLS handshake'i
+        önceden yapılır; ilk kullanıcı isteği bunu beklemez. Sonuçlar
+        sağlık cache'ine de yazılır.
+        
+        Returns:
+            Dict[str, bool]: Provider ID -> sağlık durumu
+        """
+        providers = [
+            cls.get_provider(pid) for pid in cls._providers.keys()
+        ]
+        # Multiplex kendi HTTP bağlantısı açmaz, havuzdakiler zaten ısınıyor
+        direct = [
+            p for p in providers
+            if p.is_configured() and not isinstance(p, MultiplexedProvider)
+        ]
+        await asyncio.gather(
+            *(asyncio.to_thread(p.health_check) for p in direct),
+            return_exceptions=True,
+        )
+        cls.invalidate_health()
+        return await cls.ahealth_check_all()
+    
+    @classmethod
+    async def ainvoke_all(
+        cls,
+        prompt: str,
+        models: Dict[str, str],
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        dynamic_context: Optional[str] = None,
+    ) -> Dict[str, LLMAnalysis]:
+        """
+        Aynı promptu birden fazla provider'a paralel (asyncio.gather) gönder.
+        
+        Toplam süre en yavaş provider kadardır (sıralı döngüde toplamı).
+        
+        Args:
+            prompt: Kullanıcı promptu
+            models: Provider ID -> model adı
+            
+        Returns:
+            Dict[str, LLMAnalysis]: Provider ID -> yanıt (hata olursa answer
+            alanında hata mesajı)
+        """
+        async def _invoke(provider_id: str, model: str) -> LLMAnalysis:
+            return await cls.get_provider(provider_id).agenerate(
+                prompt,
+                model,
+                system_prompt=system_prompt,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                dynamic_context=dynamic_context,
+            )
+        
+        results = await asyncio.gather(
+            *(_invoke(pid, model) for pid, model in models.items()),
+            return_exceptions=True,
+        )
+        
+        out: Dict[str, LLMAnalysis] = {}
+        for (provider_id, model), result in zip(models.items(), results):
+            if isinstance(result, BaseException):
+                result = LLMAnalysis(
+                    provider=provider_id,
+                    model=model,
+                    answer=f"[Hata] {result}",
+                    latency_sec=0,
+                )
+            out[provider_id] = result
+        return out
     
     @classmethod
     def get_available_providers(cls) -> List[str]:
@@ -960,11 +1699,14 @@ class LLMProviderFactory:
 
 __all__ = [
     "BaseLLMProvider",
+    "HTTPLLMProvider",
     "OllamaProvider",
     "GroqProvider",
     "OpenRouterProvider",
     "GoogleProvider",
     "CerebrasProvider",
     "MistralProvider",
+    "MultiplexedProvider",
     "LLMProviderFactory",
+    "get_http_session",
 ]
@@ -1,8 +1,9 @@
 import time
-import requests
-from typing import Optional
+import orjson
+from typing import Iterator, Optional
 from models import LLMAnalysis
 from config import OLLAMA_HOST, LLM_MODEL_NAME
+from services.llm_providers import get_http_session
 
 
 class LLMService:
@@ -15,6 +16,42 @@ class LLMService:
     def __init__(self, base_url: str = OLLAMA_HOST, default_model: str = LLM_MODEL_NAME):
         self.base_url = base_url.rstrip("/")
         self.default_model = default_model
+        # Provider'larla aynı keep-alive havuzu (ayrı Session açılmaz)
+        self._session = get_http_session()
+
+    def _post_generate(self, model: str, prompt: str, stream: bool):
+        return self._session.post(
+            f"{self.base_url}/api/generate",
+            data=orjson.dumps({
+                "model": model,
+                "prompt": prompt,
+                "stream": stream,
+            }),
+            headers={"Content-Type": "application/json"},
+            timeout=(10, 300),  # connect, read
+            stream=stream,
+        )
+
+    def stream_generate(self, prompt: str, model: Optional[str] = None) -> Iterator[str]:
+        """
+        Ollama yanıtını parça parça üretir (NDJSON, satır başına bir JSON).
+
+        İlk token sunucu tüm yanıtı bitirmeden gelir; UI ilerlemeli
+        gösterebilir. Hata durumunda exception yukarı fırlar.
+        """
+        selected_model = model or self.default_model
+
+        with self._post_generate(selected_model, prompt, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = orjson.loads(line)
+                text = chunk.get("response")
+                if text:
+                    yield text
+                if chunk.get("done"):
+                    break
 
     def generate(self, prompt: str, model: Optional[str] = None) -> LLMAnalysis:
         """
@@ -24,25 +61,15 @@ class LLMService:
         """
         selected_model = model or self.default_model
 
-        url = f"{self.base_url}/api/generate"
-
         try:
-            t0 = time.time()
-
-            response = requests.post(
-                url,
-                json={
-                    "model": selected_model,
-                    "prompt": prompt,
-                    "stream": False,
-                },
-                timeout=(10, 300),  # connect, read
-            )
+            t0 = time.perf_counter()
+
+            response = self._post_generate(selected_model, prompt, stream=False)
 
-            latency = time.time() - t0
+            latency = time.perf_counter() - t0
 
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
 
             answer_text = data.get("response", "")
 
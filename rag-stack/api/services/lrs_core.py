@@ -12,17 +12,272 @@ LRSQueryService çekirdeği:
 
 from __future__ import annotations
 
-from dataclasses import asdict
+import threading
+import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional
-
-from config import lrs_statements
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pymongo.errors import OperationFailure
+
+from config import (
+    lrs_statements,
+    LRS_ATLAS_SEARCH_INDEX,
+    LRS_OPDATE_FIELD_ENABLED,
+    LRS_FAULT_FIELD_ENABLED,
+    LRS_VEHICLE_FIELDS_ENABLED,
+    LRS_VEHICLE_HLL_ENABLED,
+)
 from models import QueryPlan
 
-from services.lrs_schema import MAN_SCHEMA, normalize_tr, _build_time_filter
+from services.lrs_materialized import (
+    OPDATE_FIELD,
+    FAULT_FIELD,
+    VEHICLE_TYPE_FIELD,
+    VEHICLE_MODEL_FIELD,
+)
+from services.lrs_schema import (
+    MAN_SCHEMA,
+    normalize_tr,
+    _build_time_filter,
+    _build_opdate_range,
+    _opdate_date_expr,
+)
+from services.lrs_vehicle_hll import estimate_unique_vehicles
 from services.xapi_nlp.nlp_constants import MONTH_KEYWORDS
 
 
+# get_anchor_date / get_date_range sonuçlarının önbellek süresi (saniye).
+# Bu değerler yalnızca yeni ingestion ile değişir; her rölatif dönem sorgusunda
+# tüm koleksiyonu taramaya gerek yok.
+_DATE_CACHE_TTL = 60.0
+
+# run_query aggregate'i: sonuç tek batch'te dönsün (getMore round-trip'i yok),
+# büyük limitlerde batch 1000'de sabitlenir; kaçak sorgular sunucuda kesilir
+_AGGREGATE_MAX_BATCH = 1000
+_AGGREGATE_MAX_TIME_MS = 30_000
+
+# operationDateISO materialize edildiyse tarih filtreleri $getField + $toDate
+# yerine bu index'li alan üzerinden kurulur (bkz. services/lrs_materialized.py)
+_USE_OPDATE_FIELD = LRS_OPDATE_FIELD_ENABLED
+
+# faultCodeStr materialize edildiyse hasFault, $expr yerine partial index'e
+# denk gelen {faultCodeStr: {$type: "string"}} sorgusuyla karşılanır
+_USE_FAULT_FIELD = LRS_FAULT_FIELD_ENABLED
+
+# vehicleTypeStr / vehicleModelStr materialize edildiyse eşitlik filtreleri ve
+# group_by, (alan, operationDateISO) compound index'lerine düz path ile gider
+_USE_VEHICLE_FIELDS = LRS_VEHICLE_FIELDS_ENABLED
+
+# group_by dimension → materialize alan (flag'i açık olanlar)
+_MATERIALIZED_DIMS: Dict[str, str] = {}
+if _USE_VEHICLE_FIELDS:
+    _MATERIALIZED_DIMS["vehicleType"] = VEHICLE_TYPE_FIELD
+    _MATERIALIZED_DIMS["vehicleModel"] = VEHICLE_MODEL_FIELD
+if _USE_FAULT_FIELD:
+    _MATERIALIZED_DIMS["faultCode"] = FAULT_FIELD
+
+# uniqueVehicles kesin $group sayımı yerine HyperLogLog sketch'ten okunur
+# (bkz. services/lrs_vehicle_hll.py); exact=True ile kesin sayım alınabilir
+_USE_VEHICLE_HLL = LRS_VEHICLE_HLL_ENABLED
+
+# operationDateISO yoksa run_query, operationDate'i $match öncesi tek bir
+# $addFields ile bu geçici alana hesaplar; ay / mevsim / null / aralık
+# kontrolleri $getField + $convert zincirini tekrar tekrar çalıştırmaz
+_OPDATE_TMP_FIELD = "__opdate"
+
+# Atlas Search açıksa malzeme adı araması $regex yerine $search ile yapılır
+_USE_ATLAS_SEARCH = bool(LRS_ATLAS_SEARCH_INDEX)
+
+_MATERIAL_NAME_PATHS = [
+    "object.definition.name.tr-TR",
+    "statement.object.definition.name.tr-TR",
+]
+
+# vehicleId_eq: actor adı path'leri. Schema'da "vehicle" dimension
+# mongo_path'i varsa en başa eklenir (MAN_SCHEMA import anında sabit).
+_VID_ACTOR_PATHS: Tuple[str, ...] = ("actor.account.name", "statement.actor.account.name")
+_vehicle_schema_path = MAN_SCHEMA["dimensions"].get("vehicle", {}).get("mongo_path")
+if isinstance(_vehicle_schema_path, str) and _vehicle_schema_path not in _VID_ACTOR_PATHS:
+    _VID_ACTOR_PATHS = (_vehicle_schema_path,) + _VID_ACTOR_PATHS
+
+# vehicleId_eq: vehicleId/plate vs. extension olasılıkları
+_VID_EXT_PATHS: Tuple[str, ...] = (
+    "context.extensions.https://promptever.com/extensions/vehicleId",
+    "context.extensions.https://promptever.com/extensions/vehicleNo",
+    "context.extensions.https://promptever.com/extensions/plate",
+    "context.extensions.https://promptever.com/extensions/licensePlate",
+    "statement.context.extensions.https://promptever.com/extensions/vehicleId",
+    "statement.context.extensions.https://promptever.com/extensions/vehicleNo",
+    "statement.context.extensions.https://promptever.com/extensions/plate",
+    "statement.context.extensions.https://promptever.com/extensions/licensePlate",
+)
+
+
+def _vehicle_id_clauses(vid: str) -> List[Dict[str, Any]]:
+    """
+    vehicleId_eq → $or koşulları. Actor adı "70886" veya "vehicle/70886"
+    olabilir; harf içeren ID'ler (plaka) için yalnızca yazıldığı hali, tamamı
+    büyük ve tamamı küçük harf hali denenir; kayıtta karışık harfli duran
+    ID ("34aBc12") ancak aynen yazılırsa eşleşir. Sabit değerli $in index
+    bound'u üretir ("i" seçenekli regex tüm index'i taramaya zorluyordu).
+    Extension'larda tam eşitlik.
+    """
+    variants = list(dict.fromkeys((vid, vid.upper(), vid.lower())))
+    actor_values = variants + [f"vehicle/{v}" for v in variants]
+    ors: List[Dict[str, Any]] = [{p: {"$in": actor_values}} for p in _VID_ACTOR_PATHS]
+    ors += [{p: vid} for p in _VID_EXT_PATHS]
+    return ors
+
+
+# Arıza kodu extension key'i: IRI / encoding farkları için "faultcode" içeren
+# herhangi bir key (büyük/küçük harf duyarsız)
+_FAULTCODE_KEY_PATTERN = "faultcode"
+
+# Genel istatistiklerde "arıza yok" sayılan ham extension değerleri
+_NO_FAULT_VALUES = [None, "", 0, "0"]
+
+# group_by faultCode satırlarında boş sayılan değerler (strip + lower sonrası)
+_EMPTY_FAULT_STRINGS = frozenset(("", "0", "none", "null"))
+
+# Farklı araç sayısı: root + statement.* actor adları birleşik, "vehicle/"
+# prefix'i atılmış; sunucu tek bir sayı döner (distinct dizileri taşınmaz)
+_UNIQUE_VEHICLES_STAGES: List[Dict[str, Any]] = [
+    {
+        "$project": {
+            "_id": 0,
+            "name": [
+                "$actor.account.name",
+                "$statement.actor.account.name",
+            ],
+        }
+    },
+    {"$unwind": "$name"},
+    {"$match": {"name": {"$type": "string"}}},
+    {"$project": {"name": {"$trim": {"input": "$name"}}}},
+    {"$match": {"name": {"$ne": ""}}},
+    {
+        "$group": {
+            "_id": {
+                # "vehicle/70886" → "70886"
+                "$cond": [
+                    {"$eq": [{"$indexOfCP": ["$name", "vehicle/"]}, 0]},
+                    {"$substrCP": ["$name", 8, {"$strLenCP": "$name"}]},
+                    "$name",
+                ]
+            }
+        }
+    },
+    {"$count": "n"},
+]
+
+# Arıza kodu olan kayıt sayısı: root result.extensions yoksa statement.*;
+# key'inde "faultcode" geçen ve değeri dolu bir extension varsa arızalı
+_FAULTED_STATEMENTS_STAGES: List[Dict[str, Any]] = [
+    {
+        "$project": {
+            "_id": 0,
+            # Root result.extensions yoksa statement.* yapısı
+            "ext": {
+                "$cond": [
+                    {"$eq": [{"$type": "$result.extensions"}, "object"]},
+                    "$result.extensions",
+                    "$statement.result.extensions",
+                ]
+            },
+        }
+    },
+    {"$match": {"ext": {"$type": "object"}}},
+    {
+        "$match": {
+            "$expr": {
+                "$anyElementTrue": [
+                    {
+                        "$map": {
+                            "input": {"$objectToArray": "$ext"},
+                            "as": "e",
+                            "in": {
+                                "$and": [
+                                    {
+                                        "$regexMatch": {
+                                            "input": "$$e.k",
+                                            "regex": _FAULTCODE_KEY_PATTERN,
+                                            "options": "i",
+                                        }
+                                    },
+                                    {"$not": [{"$in": ["$$e.v", _NO_FAULT_VALUES]}]},
+                                ]
+                            },
+                        }
+                    }
+                ]
+            }
+        }
+    },
+    {"$count": "n"},
+]
+
+
+def _plan_to_dict(plan: QueryPlan) -> Dict[str, Any]:
+    """
+    asdict(plan) eşdeğeri. QueryPlan yalnızca tek seviye container ve
+    primitif alanlı TimeRange içerdiği için recursive deep-copy yerine
+    sığ kopyalar yeterli.
+    """
+    d = dict(plan.__dict__)
+    d["group_by"] = list(plan.group_by)
+    d["filters"] = dict(plan.filters)
+    d["metrics"] = list(plan.metrics)
+    if plan.time_range is not None:
+        d["time_range"] = dict(plan.time_range.__dict__)
+    return d
+
+
+def _collect_field_refs(expr: Any, out: set) -> bool:
+    """
+    Aggregate expression'daki "$a.b.c" alan referanslarını out'a toplar.
+
+    URL formatındaki extension key'leri nokta içerdiği için path, ilk
+    ":" veya "/" içeren parçadan önce kesilir (context.extensions gibi).
+    $$ROOT / $$CURRENT görülürse False döner (tüm doküman gerekir).
+    """
+    if isinstance(expr, str):
+        if expr.startswith("$$"):
+            return not expr.startswith(("$$ROOT", "$$CURRENT"))
+        if expr.startswith("$") and len(expr) > 1:
+            parts: List[str] = []
+            for part in expr[1:].split("."):
+                if ":" in part or "/" in part:
+                    break
+                parts.append(part)
+            if parts:
+                out.add(".".join(parts))
+        return True
+    if isinstance(expr, dict):
+        return all(_collect_field_refs(v, out) for v in expr.values())
+    if isinstance(expr, list):
+        return all(_collect_field_refs(v, out) for v in expr)
+    return True
+
+
+def _build_project_stage(group_stage: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    $group'un okuduğu alanlar için $project aşaması.
+
+    $group'a yalnızca dimension / metrik path'leri akar; doküman başına
+    bellek ve allowDiskUse spill'i azalır. Üst path'i zaten seçilmiş alt
+    path'ler atlanır (Mongo path collision hatası verir).
+    """
+    refs: set = set()
+    if not _collect_field_refs(group_stage, refs) or not refs:
+        return None
+
+    project: Dict[str, Any] = {"_id": 0}
+    for path in sorted(refs):
+        if not any(path.startswith(p + ".") for p in project):
+            project[path] = 1
+    return {"$project": project}
+
+
 class LRSCore:
     """
     Temel LRS çekirdeği.
@@ -38,14 +293,77 @@ class LRSCore:
     def __init__(self, collection=None):
         # Varsayılan olarak config.lrs_statements kullanılır
         self.statements = collection or lrs_statements
+        # metod adı → (monotonic zaman damgası, sonuç)
+        self._date_cache: Dict[str, Tuple[float, Any]] = {}
+        self._date_cache_lock = threading.Lock()
+
+    # ---------- Tarih önbelleği ----------
+
+    def _cached(self, key: str, ttl: float, fn: Callable[[], Any]) -> Any:
+        """
+        fn() sonucunu ttl saniye boyunca self._date_cache içinde tutar.
+        None (hata / boş koleksiyon) sonuçları önbelleğe alınmaz.
+        """
+        with self._date_cache_lock:
+            entry = self._date_cache.get(key)
+        if entry is not None and time.monotonic() - entry[0] < ttl:
+            return entry[1]
+
+        value = fn()
+        if value is not None:
+            with self._date_cache_lock:
+                self._date_cache[key] = (time.monotonic(), value)
+        return value
+
+    def reset_date_cache(self) -> None:
+        """Ingestion sonrası çağrılır; anchor / min-max tarihleri yeniden hesaplanır."""
+        with self._date_cache_lock:
+            self._date_cache.clear()
 
     # ---------- Schema-aware QueryPlan desteği ----------
 
-    def _build_mongo_filter(self, plan: QueryPlan) -> Dict[str, Any]:
+    def _build_search_stage(self, plan: QueryPlan) -> Optional[Dict[str, Any]]:
+        """
+        Atlas Search açıksa materialName_contains için $search aşaması.
+
+        $search pipeline'ın ilk aşaması olmak zorunda olduğu için $match'ten
+        ayrı üretilir; Atlas yoksa veya filtre yoksa None döner.
+        """
+        if not _USE_ATLAS_SEARCH:
+            return None
+
+        material_sub = (plan.filters or {}).get("materialName_contains")
+        if not (isinstance(material_sub, str) and material_sub.strip()):
+            return None
+
+        normalized = normalize_tr(material_sub)
+        if not normalized:
+            return None
+
+        return {
+            "$search": {
+                "index": LRS_ATLAS_SEARCH_INDEX,
+                "text": {"query": normalized, "path": _MATERIAL_NAME_PATHS},
+            }
+        }
+
+    def _build_mongo_filter(
+        self,
+        plan: QueryPlan,
+        skip_material: bool = False,
+        opdate_field: Optional[str] = None,
+    ) -> Dict[str, Any]:
         """
         QueryPlan.filters içindeki schema-aware anahtarları
         Mongo filter dict'ine çevirir.
 
+        skip_material=True ise materialName_contains eklenmez (run_query
+        bunu $search aşamasıyla karşıladığında).
+
+        opdate_field: pipeline'da operationDate'i Date olarak önceden hesaplayan
+        bir $addFields varsa o alanın adı (run_query). find() gibi aggregate
+        dışı kullanımlarda None kalır; operationDateISO açıksa yok sayılır.
+
         Desteklenen filtreler (MVP):
         - materialName_contains: object.definition.name.tr-TR regex (normalize + case-insensitive)
         - hasFault            : True → faultCode not null
@@ -57,28 +375,22 @@ class LRSCore:
         - time_range          : zaman filtresi (operationDate üzerinden)
         """
         f: Dict[str, Any] = {}
+        # $expr kontrolleri ve ek $and koşulları toplanıp sonda tek seferde
+        # yazılır (her filtrede önceki $expr'i yeniden sarmak yerine)
+        expr_checks: List[Any] = []
+        and_clauses: List[Dict[str, Any]] = []
 
         filters = plan.filters or {}
 
         # 1) Malzeme adı filtreleri (normalize edilmiş sorgu)
-        material_sub = filters.get("materialName_contains")
+        material_sub = None if skip_material else filters.get("materialName_contains")
         if isinstance(material_sub, str) and material_sub.strip():
             normalized = normalize_tr(material_sub)
             if normalized:
                 # Hem root object, hem de statement.object için fallback
                 f["$or"] = [
-                    {
-                        "object.definition.name.tr-TR": {
-                            "$regex": normalized,
-                            "$options": "i",
-                        }
-                    },
-                    {
-                        "statement.object.definition.name.tr-TR": {
-                            "$regex": normalized,
-                            "$options": "i",
-                        }
-                    },
+                    {path: {"$regex": normalized, "$options": "i"}}
+                    for path in _MATERIAL_NAME_PATHS
                 ]
 
         # 2) Fault var mı?
@@ -87,24 +399,22 @@ class LRSCore:
         has_fault = filters.get("hasFault")
         if has_fault:
             fault_dim = MAN_SCHEMA["dimensions"].get("faultCode")
-            if fault_dim and "mongo_expr" in fault_dim:
+            if _USE_FAULT_FIELD:
+                # Boş / "0" / "None" değerleri materialize ederken null yazıldı;
+                # sorgu partial index'in filtresiyle birebir aynı
+                f[FAULT_FIELD] = {"$type": "string"}
+            elif fault_dim and "mongo_expr" in fault_dim:
                 # ✅ $expr + mongo_expr ile URL key'lerine güvenli erişim
                 fault_expr = fault_dim["mongo_expr"]
-                fault_check = {
-                    "$and": [
-                        {"$ne": [fault_expr, None]},
-                        {"$ne": [fault_expr, ""]},
-                        {"$ne": [fault_expr, "0"]},      # "0" string de boş sayılsın
-                        {"$ne": [fault_expr, "None"]},   # 🆕 "None" string de boş sayılsın
-                        {"$ne": [fault_expr, "none"]},   # 🆕 küçük harfli versiyon
-                        {"$ne": [fault_expr, "NULL"]},   # 🆕 büyük harfli NULL
-                        {"$ne": [fault_expr, "null"]},   # 🆕 küçük harfli null
-                    ]
-                }
-                if "$expr" in f:
-                    f["$expr"] = {"$and": [f["$expr"], fault_check]}
-                else:
-                    f["$expr"] = fault_check
+                expr_checks.extend([
+                    {"$ne": [fault_expr, None]},
+                    {"$ne": [fault_expr, ""]},
+                    {"$ne": [fault_expr, "0"]},      # "0" string de boş sayılsın
+                    {"$ne": [fault_expr, "None"]},   # 🆕 "None" string de boş sayılsın
+                    {"$ne": [fault_expr, "none"]},   # 🆕 küçük harfli versiyon
+                    {"$ne": [fault_expr, "NULL"]},   # 🆕 büyük harfli NULL
+                    {"$ne": [fault_expr, "null"]},   # 🆕 küçük harfli null
+                ])
             else:
                 # Fallback: Eski yöntem (mongo_expr yoksa)
                 fault_path = (
@@ -123,14 +433,11 @@ class LRSCore:
         if isinstance(vt_eq, str) and vt_eq.strip():
             dim_conf = MAN_SCHEMA["dimensions"].get("vehicleType")
             normalized_vt = normalize_tr(vt_eq)
-            if dim_conf and "mongo_expr" in dim_conf:
+            if _USE_VEHICLE_FIELDS:
+                f[VEHICLE_TYPE_FIELD] = normalized_vt
+            elif dim_conf and "mongo_expr" in dim_conf:
                 # ✅ $expr + mongo_expr ile URL key'lerine güvenli erişim
-                vt_expr = dim_conf["mongo_expr"]
-                vt_check = {"$eq": [vt_expr, normalized_vt]}
-                if "$expr" in f:
-                    f["$expr"] = {"$and": [f["$expr"], vt_check]}
-                else:
-                    f["$expr"] = vt_check
+                expr_checks.append({"$eq": [dim_conf["mongo_expr"], normalized_vt]})
             elif dim_conf and "mongo_path" in dim_conf:
                 # Fallback: Eski yöntem (URL içermeyen path'ler için)
                 path = dim_conf["mongo_path"]
@@ -142,14 +449,11 @@ class LRSCore:
         if isinstance(vm_eq, str) and vm_eq.strip():
             dim_conf = MAN_SCHEMA["dimensions"].get("vehicleModel")
             normalized_vm = normalize_tr(vm_eq)
-            if dim_conf and "mongo_expr" in dim_conf:
+            if _USE_VEHICLE_FIELDS:
+                f[VEHICLE_MODEL_FIELD] = normalized_vm
+            elif dim_conf and "mongo_expr" in dim_conf:
                 # ✅ $expr + mongo_expr ile URL key'lerine güvenli erişim
-                vm_expr = dim_conf["mongo_expr"]
-                vm_check = {"$eq": [vm_expr, normalized_vm]}
-                if "$expr" in f:
-                    f["$expr"] = {"$and": [f["$expr"], vm_check]}
-                else:
-                    f["$expr"] = vm_check
+                expr_checks.append({"$eq": [dim_conf["mongo_expr"], normalized_vm]})
             elif dim_conf and "mongo_path" in dim_conf:
                 # Fallback: Eski yöntem (URL içermeyen path'ler için)
                 path = dim_conf["mongo_path"]
@@ -160,82 +464,29 @@ class LRSCore:
         # ═══════════════════════════════════════════════════════════════════════
         vehicle_id = filters.get("vehicleId_eq")
         if isinstance(vehicle_id, str) and vehicle_id.strip():
-            vid = vehicle_id.strip()
-
-            # Ana iki muhtemel actor path
-            paths = [
-                "actor.account.name",
-                "statement.actor.account.name",
-            ]
-
-            # Schema'da "vehicle" dimension mongo_path'i varsa onu da ekle
-            vehicle_dim = MAN_SCHEMA["dimensions"].get("vehicle", {})
-            schema_path = vehicle_dim.get("mongo_path")
-            if isinstance(schema_path, str) and schema_path not in paths:
-                paths.insert(0, schema_path)
-
-            # vehicleId/plate vs. extension olasılıkları
-            ext_paths = [
-                "context.extensions.https://promptever.com/extensions/vehicleId",
-                "context.extensions.https://promptever.com/extensions/vehicleNo",
-                "context.extensions.https://promptever.com/extensions/plate",
-                "context.extensions.https://promptever.com/extensions/licensePlate",
-                "statement.context.extensions.https://promptever.com/extensions/vehicleId",
-                "statement.context.extensions.https://promptever.com/extensions/vehicleNo",
-                "statement.context.extensions.https://promptever.com/extensions/plate",
-                "statement.context.extensions.https://promptever.com/extensions/licensePlate",
-            ]
-
-            # Regex: "70886" veya ".../70886" ile biteni yakala
-            regex = {"$regex": f"(^|/)({vid})$", "$options": "i"}
-            ors = [{p: regex} for p in paths] + [{p: vid} for p in ext_paths]
-            vehicle_filter = {"$or": ors}
+            ors = _vehicle_id_clauses(vehicle_id.strip())
 
             # Mevcut $or (malzeme adı vs.) varsa AND ile bağla
             if "$or" in f:
-                existing_or = f.pop("$or")
-                f["$and"] = [
-                    {"$or": existing_or},
-                    vehicle_filter,
-                ]
+                and_clauses.append({"$or": ors})
             else:
-                if f:
-                    f = {"$and": [f, vehicle_filter]}
-                else:
-                    f.update(vehicle_filter)
+                f["$or"] = ors
 
         # ═══════════════════════════════════════════════════════════════════════
         # operationDate'i root veya statement.* üzerinden oku (dual-source)
         # ═══════════════════════════════════════════════════════════════════════
-        operation_date_raw = {
-            "$ifNull": [
-                {
-                    "$getField": {
-                        "field": "https://promptever.com/extensions/operationDate",
-                        "input": "$context.extensions",
-                    }
-                },
-                {
-                    "$getField": {
-                        "field": "https://promptever.com/extensions/operationDate",
-                        "input": "$statement.context.extensions",
-                    }
-                },
-            ]
-        }
-
-        operation_date_expr = {
-            "$cond": {
-                "if": {
-                    "$or": [
-                        {"$eq": [operation_date_raw, None]},
-                        {"$eq": [operation_date_raw, ""]},
-                    ]
-                },
-                "then": None,
-                "else": {"$toDate": operation_date_raw},
-            }
-        }
+        # Tarih alanı verildiyse (operationDateISO veya run_query'nin geçici
+        # __opdate'i) null kontrolü ve zaman aralığı düz sorgu olarak burada
+        # toplanır; ay/mevsim $expr'i de alanı doğrudan okur.
+        opdate_cond: Dict[str, Any] = {}
+        # ay / mevsim / tarih grouping operationDate'i null olmayan kayıt ister
+        need_opdate = False
+        if _USE_OPDATE_FIELD:
+            opdate_field = OPDATE_FIELD
+        if opdate_field:
+            operation_date_expr: Any = f"${opdate_field}"
+        else:
+            operation_date_expr = self._operation_date_expr()
 
         # 6) Mevsim filtresi (season_eq: winter/spring/summer/autumn)
         season_eq = filters.get("season_eq")
@@ -255,17 +506,8 @@ class LRSCore:
                 months = None
 
             if months:
-                season_expr = {
-                    "$and": [
-                        {"$ne": [operation_date_expr, None]},
-                        {"$in": [{"$month": operation_date_expr}, months]},
-                    ]
-                }
-
-                if "$expr" in f:
-                    f["$expr"] = {"$and": [f["$expr"], season_expr]}
-                else:
-                    f["$expr"] = season_expr
+                need_opdate = True
+                expr_checks.append({"$in": [{"$month": operation_date_expr}, months]})
 
         # 🆕 6b) Ay filtresi (month_eq: 1-12 veya "eylul" gibi)
         month_eq = filters.get("month_eq")
@@ -274,43 +516,91 @@ class LRSCore:
         if isinstance(month_eq, int) and 1 <= month_eq <= 12:
             month_num = month_eq
         elif isinstance(month_eq, str) and month_eq.strip():
-            m = normalize_tr(month_eq).strip()
-            month_num = MONTH_KEYWORDS.get(m)
+            s = month_eq.strip()
+            if s.isdigit():
+                # "3" gibi sayısal string'ler normalize_tr'ye gerek duymaz
+                n = int(s)
+                month_num = n if 1 <= n <= 12 else None
+            else:
+                month_num = MONTH_KEYWORDS.get(normalize_tr(s).strip())
 
         if month_num:
-            month_expr = {
-                "$and": [
-                    {"$ne": [operation_date_expr, None]},
-                    {"$eq": [{"$month": operation_date_expr}, month_num]},
-                ]
-            }
-
-            if "$expr" in f:
-                f["$expr"] = {"$and": [f["$expr"], month_expr]}
-            else:
-                f["$expr"] = month_expr
+            need_opdate = True
+            expr_checks.append({"$eq": [{"$month": operation_date_expr}, month_num]})
 
         # ═══════════════════════════════════════════════════════════════════════
         # 🆕 Tarih bazlı grouping varsa operationDate null kayıtları ele
         # (time_range olsa da olmasa da; year/month/season group key bozulmasın)
         # ═══════════════════════════════════════════════════════════════════════
         if any(dim in ("year", "month", "season") for dim in (plan.group_by or [])):
-            od_exists_expr = {"$ne": [operation_date_expr, None]}
-            if "$expr" in f:
-                f["$expr"] = {"$and": [f["$expr"], od_exists_expr]}
+            need_opdate = True
+
+        if need_opdate:
+            if opdate_field:
+                opdate_cond["$ne"] = None
             else:
-                f["$expr"] = od_exists_expr
+                expr_checks.append({"$ne": [operation_date_expr, None]})
 
         # 7) Zaman filtresi
-        time_filter = _build_time_filter(plan.time_range)
-        if time_filter:
-            if f:
-                f = {"$and": [f, time_filter]}
-            else:
-                f = time_filter
+        # operationDateISO açıksa düz range; parse edilemeyen string sınırlar
+        # veya timestamp alanı için $expr tabanlı _build_time_filter'a düşülür.
+        opdate_range = _build_opdate_range(plan.time_range) if opdate_field else {}
+        if opdate_range:
+            opdate_cond.update(opdate_range)
+            time_filter = {}
+        else:
+            time_filter = _build_time_filter(plan.time_range)
+
+        if opdate_cond:
+            f[opdate_field] = opdate_cond
+
+        # _build_time_filter tek bir $expr/$and döner; kontrolleri düz listeye aç
+        time_expr = time_filter.get("$expr")
+        if isinstance(time_expr, dict) and list(time_expr) == ["$and"]:
+            expr_checks.extend(time_expr["$and"])
+        elif time_filter:
+            and_clauses.append(time_filter)
+
+        if expr_checks:
+            f["$expr"] = expr_checks[0] if len(expr_checks) == 1 else {"$and": expr_checks}
+        if and_clauses:
+            f["$and"] = and_clauses
 
         return f
 
+    @staticmethod
+    def _operation_date_expr() -> Dict[str, Any]:
+        """operationDate extension'ı → Date (boş / null ise None)."""
+        operation_date_raw = {
+            "$ifNull": [
+                {
+                    "$getField": {
+                        "field": "https://promptever.com/extensions/operationDate",
+                        "input": "$context.extensions",
+                    }
+                },
+                {
+                    "$getField": {
+                        "field": "https://promptever.com/extensions/operationDate",
+                        "input": "$statement.context.extensions",
+                    }
+                },
+            ]
+        }
+
+        return {
+            "$cond": {
+                "if": {
+                    "$or": [
+                        {"$eq": [operation_date_raw, None]},
+                        {"$eq": [operation_date_raw, ""]},
+                    ]
+                },
+                "then": None,
+                "else": {"$toDate": operation_date_raw},
+            }
+        }
+
     def _build_group_stage(self, plan: QueryPlan) -> Dict[str, Any]:
         """
         QueryPlan.group_by ve QueryPlan.metrics üzerinden $group aşamasını kurar.
@@ -323,6 +613,12 @@ class LRSCore:
             if not dim_conf:
                 continue
 
+            # Materialize edilmiş alan varsa düz path (compound index'le uyumlu)
+            materialized = _MATERIALIZED_DIMS.get(dim)
+            if materialized:
+                group_id[dim] = f"${materialized}"
+                continue
+
             # Önce mongo_expr varsa onu kullan (ör: verbType)
             mongo_expr = dim_conf.get("mongo_expr")
             if mongo_expr is not None:
@@ -338,10 +634,14 @@ class LRSCore:
             # Hiç dimension yoksa tek bir grupla global aggregate
             group_id = None  # Mongo'da "_id": None
 
-        group_stage: Dict[str, Any] = {"_id": group_id}
+        # count her zaman tam bir kez üretilir: run_query $sort'u ve satırlar
+        # buna dayanır (plan.metrics içinde olsun ya da olmasın)
+        group_stage: Dict[str, Any] = {"_id": group_id, "count": {"$sum": 1}}
 
         # Metrikler
         for metric in plan.metrics:
+            if metric == "count":
+                continue
             metric_conf = MAN_SCHEMA["metrics"].get(metric)
             if not metric_conf:
                 continue
@@ -370,9 +670,6 @@ class LRSCore:
                 group_stage[metric] = {"$sum": f"${mpath}"}
             elif mtype == "avg":
                 group_stage[metric] = {"$avg": f"${mpath}"}
-        # Güvenlik için, count metrik yoksa yine de ekleyelim
-        if "count" not in group_stage:
-            group_stage["count"] = {"$sum": 1}
 
         return group_stage
 
@@ -380,8 +677,7 @@ class LRSCore:
         if v is None:
             return True
         if isinstance(v, str):
-            s = v.strip().lower()
-            return s in ("", "0", "none", "null")
+            return v.strip().lower() in _EMPTY_FAULT_STRINGS
         return False
 
     def run_query(
@@ -408,57 +704,88 @@ class LRSCore:
             ],
           }
         """
-        mongo_filter = self._build_mongo_filter(plan)
+        # Filtresiz, gruplamasız tek "count": collection metadata'sından O(1)
+        if (
+            not (plan.filters or plan.group_by or plan.time_range)
+            and list(plan.metrics) == ["count"]
+        ):
+            total = self.statements.estimated_document_count()
+            return {
+                "plan": _plan_to_dict(plan),
+                "pipeline": [],
+                # Boş koleksiyonda aggregate de satır döndürmez
+                "rows": [{"count": total}] if total else [],
+            }
+
+        search_stage = self._build_search_stage(plan)
+        opdate_field = None if _USE_OPDATE_FIELD else _OPDATE_TMP_FIELD
+        mongo_filter = self._build_mongo_filter(
+            plan,
+            skip_material=search_stage is not None,
+            opdate_field=opdate_field,
+        )
         group_stage = self._build_group_stage(plan)
 
+        project_stage = _build_project_stage(group_stage)
+
         pipeline: List[Dict[str, Any]] = [
             {"$match": mongo_filter},
             {"$group": group_stage},
             {"$sort": {"count": -1}},
             {"$limit": limit},
         ]
+        if project_stage is not None:
+            pipeline.insert(1, project_stage)
+        # Tarih kontrolü içeren her filtre geçici alana düz koşul yazar
+        if opdate_field and opdate_field in mongo_filter:
+            pipeline.insert(0, {"$addFields": {opdate_field: _opdate_date_expr()}})
+        if search_stage is not None:
+            pipeline.insert(0, search_stage)
+
+        cursor = self.statements.aggregate(
+            pipeline,
+            allowDiskUse=True,
+            batchSize=max(1, min(limit, _AGGREGATE_MAX_BATCH)),
+            maxTimeMS=_AGGREGATE_MAX_TIME_MS,
+        )
 
-        cursor = self.statements.aggregate(pipeline)
+        # Satır döngüsünde tekrar hesaplanmasın
+        dims = tuple(plan.group_by or ())
+        metrics = tuple(m for m in plan.metrics if m != "count") + ("count",)
+        has_fc_filter = "faultCode" in dims
+        is_empty_fault_code = self._is_empty_fault_code
 
         rows: List[Dict[str, Any]] = []
         for doc in cursor:
-            row: Dict[str, Any] = {}
-            _id = doc.get("_id", {}) or {}
+            _id = doc.get("_id") or {}
 
             # group_by dimension'larını satıra aç
             if isinstance(_id, dict):
-                for dim in plan.group_by:
-                    val = _id.get(dim)
-                    # 🆕 Vehicle değerlerinden "vehicle/" prefix'ini kaldır
-                    if dim == "vehicle" and isinstance(val, str) and val.startswith("vehicle/"):
-                        val = val.split("/", 1)[1]
-                    row[dim] = val
+                row: Dict[str, Any] = {dim: _id.get(dim) for dim in dims}
+                # 🆕 Vehicle değerlerinden "vehicle/" prefix'ini kaldır
+                vehicle = row.get("vehicle")
+                if isinstance(vehicle, str) and vehicle.startswith("vehicle/"):
+                    row["vehicle"] = vehicle.split("/", 1)[1]
             else:
                 # _id None veya primitif olabilir; pek kullanmayacağız ama dursun
-                row["_id"] = _id
+                row = {"_id": _id}
 
             # ✅ faultCode group_by varsa, boş/None olan satırları hiç ekleme
-            if plan.group_by and "faultCode" in plan.group_by:
-                if self._is_empty_fault_code(row.get("faultCode")):
-                    continue
+            if has_fc_filter and is_empty_fault_code(row.get("faultCode")):
+                continue
 
-            # metrik alanlarını ekle
-            for metric in plan.metrics:
-                if metric in doc:
-                    row[metric] = doc[metric]
-            # count her durumda olsun
-            if "count" in doc:
-                row["count"] = doc["count"]
+            # metrik alanlarını ekle (count her durumda olsun)
+            row.update({m: doc[m] for m in metrics if m in doc})
 
             rows.append(row)
 
         return {
-            "plan": asdict(plan),
+            "plan": _plan_to_dict(plan),
             "pipeline": pipeline,
             "rows": rows,
         }
 
-    def get_general_statistics(self) -> Dict[str, Any]:
+    def get_general_statistics(self, exact: bool = False) -> Dict[str, Any]:
         """
         LRS genel istatistikleri:
 
@@ -469,75 +796,44 @@ class LRSCore:
 
         NOT:
         FaultCode'u Mongo'da doğrudan path ile filtrelemek yerine
-        dokümanları okuyup result.extensions içindeki key'lere bakıyoruz.
-        Çünkü extension key'lerinde IRI / encoding farkları olabilir.
+        result.extensions içindeki key'lere bakıyoruz (key'de "faultcode"
+        geçen ve değeri dolu olan). Çünkü extension key'lerinde IRI /
+        encoding farkları olabilir.
+
+        Üç sayı tek bir $facet aggregate'i ile sunucu tarafında hesaplanır;
+        dokümanlar Python'a taşınmaz. HLL açıksa (ve exact=False) uniqueVehicles
+        sketch'ten okunur ve araç facet'i hiç çalışmaz. Araç facet'i sunucuda
+        hata verirse (ör. $group bellek sınırı) toplam / arıza sayıları onsuz
+        yeniden hesaplanır ve uniqueVehicles 0 döner.
         """
+        approx_vehicles = estimate_unique_vehicles() if _USE_VEHICLE_HLL and not exact else None
 
-        # 1) Toplam statement sayısı
-        total_statements = int(self.statements.count_documents({}))
+        facet: Dict[str, Any] = {
+            "total": [{"$count": "n"}],
+            "faults": _FAULTED_STATEMENTS_STAGES,
+        }
+        if approx_vehicles is None:
+            facet["vehicles"] = _UNIQUE_VEHICLES_STAGES
 
-        # 2) Farklı araç sayısı (actor.account.name)
         try:
-            # Hem root, hem statement.* olması ihtimaline karşı iki taraftan deneyelim
-            names_root = self.statements.distinct("actor.account.name")
-            names_nested = self.statements.distinct("statement.actor.account.name")
-            all_names = set()
-            for name in list(names_root) + list(names_nested):
-                if not isinstance(name, str):
-                    continue
-                s = name.strip()
-                if not s:
-                    continue
-                if s.startswith("vehicle/"):
-                    s = s.split("/", 1)[1]
-                all_names.add(s)
-            unique_vehicles = len(all_names)
-        except Exception:
-            unique_vehicles = 0
-
-        # 3) Arıza kodu olan kayıt sayısı
-        statements_with_faults = 0
-
-        cursor = self.statements.find(
-            {},
-            {
-                "result.extensions": 1,
-                "statement.result.extensions": 1,
-            },
-        )
-
-        for doc in cursor:
-            # Hem root hem statement.* yapısını ele al
-            ext = None
-
-            res = doc.get("result") or {}
-            if isinstance(res, dict):
-                ext = res.get("extensions")
-
-            if not isinstance(ext, dict):
-                stmt = doc.get("statement") or {}
-                if isinstance(stmt, dict):
-                    res2 = stmt.get("result") or {}
-                    if isinstance(res2, dict):
-                        ext = res2.get("extensions")
-
-            if not isinstance(ext, dict):
-                continue
-
-            has_fault = False
-            for k, v in ext.items():
-                # Key içinde "faultCode" geçiyorsa ve değer doluysa arızalı say
-                if not isinstance(k, str):
-                    continue
-                if "faultcode" in k.lower():
-                    if v not in (None, "", 0, "0"):
-                        has_fault = True
-                        break
-
-            if has_fault:
-                statements_with_faults += 1
-
-        # 4) Arıza oranı (%)
+            facets = next(self.statements.aggregate([{"$facet": facet}], allowDiskUse=True), {})
+        except OperationFailure as e:
+            if "vehicles" not in facet:
+                raise
+            print(f"[LRSCore] uniqueVehicles hesaplanamadı, 0 dönülüyor: {e}")
+            del facet["vehicles"]
+            approx_vehicles = 0
+            facets = next(self.statements.aggregate([{"$facet": facet}], allowDiskUse=True), {})
+
+        def _facet_count(name: str) -> int:
+            docs = facets.get(name) or []
+            return int(docs[0]["n"]) if docs else 0
+
+        total_statements = _facet_count("total")
+        unique_vehicles = approx_vehicles if approx_vehicles is not None else _facet_count("vehicles")
+        statements_with_faults = _facet_count("faults")
+
+        # Arıza oranı (%)
         if total_statements > 0:
             fault_ratio = (statements_with_faults / total_statements) * 100.0
         else:
@@ -560,8 +856,26 @@ class LRSCore:
         ⚠️ NOT: URL formatındaki extension key'leri (https://...) içinde nokta var.
         MongoDB dot notation bu noktaları yanlış parse eder.
         Bu yüzden $getField operatörü kullanılmalı.
+
+        Sonuç _DATE_CACHE_TTL saniye önbellekte tutulur (bkz. reset_date_cache).
         """
+        return self._cached("anchor_date", _DATE_CACHE_TTL, self._compute_anchor_date)
+
+    def _opdate_edge(self, direction: int) -> Optional[datetime]:
+        """operationDateISO index'i üzerinden min (1) / max (-1) tarih."""
+        doc = self.statements.find_one(
+            {OPDATE_FIELD: {"$ne": None}},
+            {OPDATE_FIELD: 1, "_id": 0},
+            sort=[(OPDATE_FIELD, direction)],
+        )
+        return doc.get(OPDATE_FIELD) if doc else None
+
+    def _compute_anchor_date(self) -> Optional[datetime]:
         try:
+            if _USE_OPDATE_FIELD:
+                # {operationDateISO: 1} index'inin sonundan tek doküman
+                return self._opdate_edge(-1)
+
             # $getField ile URL key'ine güvenli erişim
             op_key = "https://promptever.com/extensions/operationDate"
             
@@ -593,8 +907,19 @@ class LRSCore:
         LRS min/max = operationDate min/max
         
         ⚠️ NOT: URL formatındaki extension key'leri için $getField kullanılıyor.
+
+        Sonuç _DATE_CACHE_TTL saniye önbellekte tutulur (bkz. reset_date_cache).
         """
+        return self._cached("date_range", _DATE_CACHE_TTL, self._compute_date_range)
+
+    def _compute_date_range(self) -> Optional[Dict[str, datetime]]:
         try:
+            if _USE_OPDATE_FIELD:
+                max_date = self._opdate_edge(-1)
+                if max_date is None:
+                    return None
+                return {"min_date": self._opdate_edge(1), "max_date": max_date}
+
             op_key = "https://promptever.com/extensions/operationDate"
             
             pipeline = [
@@ -623,4 +948,4 @@ class LRSCore:
 
         except Exception as e:
             print(f"[LRSCore] get_date_range hatası: {e}")
-            return None
\ No newline at end of file
+            return None
\ No newline at end of file
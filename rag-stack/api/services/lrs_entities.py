@@ -0,0 +1,190 @@
+"""
+services/lrs_entities.py
+========================
+
+"En çok gelen..." sorularında dokümandan entity ID çıkarımı ve servis
+filtresi kontrolü.
+
+Yalnızca lrs_schema'ya bağlıdır, config'i import etmez: paralel sayımın
+worker process'leri (services.lrs_parallel) bu modülü embedding modeli /
+Qdrant istemcisi yüklenmeden kullanır.
+"""
+
+from __future__ import annotations
+
+import re
+import sys
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from services.lrs_schema import (
+    _get_context,
+    _walk_path,
+    _extract_vehicle_id_from_actor,
+)
+from services.xapi_nlp.nlp_utils import normalize_tr
+
+# Extension IRI'leri (intern: dict lookup'larında hazır hash + pointer eşitliği)
+EXT_VEHICLE_TYPE = sys.intern("https://promptever.com/extensions/vehicleType")
+EXT_MODEL_NO = sys.intern("https://promptever.com/extensions/modelNo")
+
+_PATH_MATERIAL_NAME = ("object", "definition", "name", "tr-TR")
+_PATH_STMT_MATERIAL_NAME = ("statement",) + _PATH_MATERIAL_NAME
+
+
+def _service_regex(service_filter: str) -> str:
+    """Servis kodunu service-location grouping ID'sinin son segmentinde arayan desen."""
+    return "/activities/service-location/[^/]*" + re.escape(service_filter)
+
+
+@lru_cache(maxsize=256)
+def _service_pattern(service_filter: str) -> "re.Pattern[str]":
+    """_service_regex'in derlenmiş hali (servis kodu başına bir kez)."""
+    return re.compile(_service_regex(service_filter))
+
+
+def _matches_service_filter(ctx: Dict[str, Any], service_filter: str) -> bool:
+    """
+    contextActivities.grouping içindeki service-location ID'lerinden birinin
+    son segmentinde servis kodu geçiyor mu (ctx: _get_context(doc)).
+    """
+    ca = ctx.get("contextActivities") or {}
+    grouping = ca.get("grouping") or []
+    if not isinstance(grouping, list):
+        return False
+
+    search = _service_pattern(service_filter).search
+    return any(
+        isinstance(g, dict) and isinstance(g.get("id"), str) and search(g["id"]) is not None
+        for g in grouping
+    )
+
+
+# ---------- "En çok gelen..." entity ID çıkarıcıları (doc, ctx) → [str] ----------
+
+def _extract_vehicle_ids(doc: Dict[str, Any], ctx: Dict[str, Any]) -> List[str]:
+    """Araç: actor.account.name (vehicle/XYZ → XYZ)."""
+    vid = _extract_vehicle_id_from_actor(doc)
+    return [str(vid)] if vid else []
+
+
+def _extract_customer_ids(doc: Dict[str, Any], ctx: Dict[str, Any]) -> List[str]:
+    """Müşteri: contextActivities.grouping → .../activities/customer/XYZ → XYZ."""
+    ctx_acts = ctx.get("contextActivities") or {}
+    grouping = ctx_acts.get("grouping") or []
+    if isinstance(grouping, dict):
+        grouping = [grouping]
+
+    ids: List[str] = []
+    for g in grouping:
+        if not isinstance(g, dict):
+            continue
+        gid = g.get("id")
+        if not isinstance(gid, str):
+            continue
+        if "/activities/customer/" in gid:
+            cid = gid.rsplit("/", 1)[-1]
+            if cid:
+                ids.append(cid)
+    return ids
+
+
+def _extract_vehicle_type_ids(doc: Dict[str, Any], ctx: Dict[str, Any]) -> List[str]:
+    """Araç tipi: context.extensions.vehicleType."""
+    exts = ctx.get("extensions") or {}
+    vt = None
+
+    if isinstance(exts, dict):
+        # Önce bizim MAN extension IRI'sini dene
+        vt = exts.get(EXT_VEHICLE_TYPE)
+
+        # Olmazsa, key içinde "vehicletype" geçen herhangi bir extension'a düş
+        if vt is None:
+            for k, v in exts.items():
+                if isinstance(k, str) and "vehicletype" in k.lower():
+                    vt = v
+                    break
+
+    return [str(vt)] if vt not in (None, "", 0, "0") else []
+
+
+def _extract_material_ids(doc: Dict[str, Any], ctx: Dict[str, Any]) -> List[str]:
+    """Malzeme: object.definition.name.tr-TR (yoksa statement.* altı)."""
+    name = _walk_path(doc, _PATH_MATERIAL_NAME)
+    if not isinstance(name, str) or not name.strip():
+        # LRS bazı durumlarda statement.* altında tutuyor olabilir
+        name = _walk_path(doc, _PATH_STMT_MATERIAL_NAME)
+
+    if isinstance(name, str) and name.strip():
+        return [name.strip()]
+    return []
+
+
+def _extract_vehicle_model_ids(doc: Dict[str, Any], ctx: Dict[str, Any]) -> List[str]:
+    """Araç modeli: context.extensions.modelNo."""
+    exts = ctx.get("extensions") or {}
+    model_no = exts.get(EXT_MODEL_NO)
+
+    if isinstance(model_no, (str, int, float)):
+        model_str = str(model_no).strip()
+        if model_str:
+            return [model_str]
+    return []
+
+
+# entity_type → çıkarıcı
+_EXTRACTORS: Dict[str, Callable[[Dict[str, Any], Dict[str, Any]], List[str]]] = {
+    "vehicle": _extract_vehicle_ids,
+    "customer": _extract_customer_ids,
+    "vehicleType": _extract_vehicle_type_ids,
+    "material": _extract_material_ids,
+    "vehicleModel": _extract_vehicle_model_ids,
+}
+
+
+def _iter_entity_ids(
+    cursor: Iterable[Dict[str, Any]],
+    entity_type: str,
+    service_filter: Optional[str] = None,
+    model_filter_norm: Optional[str] = None,
+    period_check: Optional[Callable[[Dict[str, Any], Dict[str, Any]], bool]] = None,
+) -> Iterator[str]:
+    """
+    Servis / dönem / model filtrelerinden geçen dokümanların entity ID'lerini
+    tek tek verir. period_check(doc, ctx) verilmezse dönem kontrolü yapılmaz
+    (dönem sorguda çözülmüş olmalı).
+    """
+    extractor = _EXTRACTORS.get(entity_type)
+    if extractor is None:
+        return
+
+    # Döngüde her doküman için global lookup yapılmasın
+    get_context = _get_context
+    norm = normalize_tr
+    matches_service = _matches_service_filter
+
+    for doc in cursor:
+        # context bir kez çözülür; filtreler ve entity çıkarımı paylaşır
+        ctx = get_context(doc)
+
+        # Servis filtresi
+        if service_filter and not matches_service(ctx, service_filter):
+            continue
+
+        # Dönem filtresi (sorguda çözülmediyse)
+        if period_check is not None and not period_check(doc, ctx):
+            continue
+
+        # Model filtresi (normalize edilmiş karşılaştırma)
+        if model_filter_norm:
+            exts = ctx.get("extensions") or {}
+            doc_model = exts.get(EXT_MODEL_NO)
+
+            if not doc_model:
+                continue
+
+            if model_filter_norm not in norm(str(doc_model)):
+                continue
+
+        # Entity ID'leri
+        yield from extractor(doc, ctx)
@@ -8,21 +8,286 @@ insan-dili açıklama cümleleri için mixin.
 
 from __future__ import annotations
 
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+import re
+import sys
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
+import ciso8601
 from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
 
+from config import LRS_OPDATE_FIELD_ENABLED
 from models import TopEntitiesQuestion
+from services.lrs_core import _DATE_CACHE_TTL
+from services.lrs_entities import (
+    EXT_MODEL_NO,
+    EXT_VEHICLE_TYPE,
+    _EXTRACTORS,
+    _matches_service_filter,
+    _service_regex,
+)
+from services.lrs_materialized import OPDATE_FIELD
 from services.lrs_schema import (
     _get_context,
-    _get_nested,
+    _walk_path,
     _extract_vehicle_id_from_actor,
     _extract_service_code_from_context,
     _extract_customer_id_from_context,
     _get_attr,
+    _ext_expr,
 )
 
+# Materialize operationDateISO alanı açıksa en son iş tarihi index'ten okunur
+_USE_OPDATE_FIELD = bool(LRS_OPDATE_FIELD_ENABLED)
+
+
+def _parse_iso(value: Any) -> Optional[datetime]:
+    """ISO-8601 string / datetime → datetime (ciso8601, sonda "Z" dahil); olmazsa None."""
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        try:
+            return ciso8601.parse_datetime(value)
+        except ValueError:
+            return None
+    return None
+
+
+# Extension IRI'leri (intern: dict lookup'larında hazır hash + pointer eşitliği)
+EXT_OP_DATE = sys.intern("https://promptever.com/extensions/operationDate")
+EXT_REC_DATE = sys.intern("https://promptever.com/extensions/recordDate")
+EXT_MANUFACTURER = sys.intern("https://promptever.com/extensions/manufacturer")
+EXT_ODOMETER = sys.intern("https://promptever.com/extensions/odometerReading")
+EXT_MATERIAL_COST = sys.intern("https://promptever.com/extensions/materialCost")
+EXT_MATERIAL_QTY = sys.intern("https://promptever.com/extensions/materialQuantity")
+EXT_DISCOUNT = sys.intern("https://promptever.com/extensions/discountAmount")
+
+# Sık okunan alan yolları (önceden bölünmüş; bkz. _walk_path)
+_PATH_STMT_TIMESTAMP = ("statement", "timestamp")
+_PATH_STMT_STORED = ("statement", "stored")
+_PATH_RESULT_EXT = ("result", "extensions")
+
+# render_statement_human: extension IRI → alan adı (tek geçişte toplanır)
+_EXT_MAP: Dict[str, str] = {
+    EXT_VEHICLE_TYPE: "vehicle_type",
+    EXT_MODEL_NO: "model_no",
+    EXT_MANUFACTURER: "manufacturer",
+}
+_RES_EXT_MAP: Dict[str, str] = {
+    EXT_ODOMETER: "km",
+    EXT_MATERIAL_COST: "cost",
+    EXT_MATERIAL_QTY: "qty",
+    EXT_DISCOUNT: "discount",
+}
+
+
+def _pick_fields(exts: Dict[str, Any], key_map: Dict[str, str]) -> Dict[str, Any]:
+    """extensions dict'inden key_map'teki IRI'leri tek geçişte alan adlarına toplar."""
+    fields: Dict[str, Any] = {}
+    for k, v in exts.items():
+        name = key_map.get(k)
+        if name:
+            fields[name] = v
+    return fields
+
+
+# Mevsim → aylar; ilk ay (kışın Aralık'ı bir önceki yıla ait → 0)
+_SEASON_MONTHS: Dict[str, frozenset] = {
+    "winter": frozenset({12, 1, 2}),
+    "spring": frozenset({3, 4, 5}),
+    "summer": frozenset({6, 7, 8}),
+    "autumn": frozenset({9, 10, 11}),
+    "fall": frozenset({9, 10, 11}),
+}
+_SEASON_FIRST_MONTH: Dict[str, int] = {
+    "winter": 0,
+    "spring": 3,
+    "summer": 6,
+    "autumn": 9,
+    "fall": 9,
+}
+
+
+def _accept_any(dt: Optional[datetime]) -> bool:
+    """Dönem yok → her kayıt geçer."""
+    return True
+
+
+def _has_date(dt: Optional[datetime]) -> bool:
+    """Dönem çözülemedi → yalnızca iş tarihi olan kayıtlar geçer."""
+    return dt is not None
+
+
+def _to_int(value: Any) -> Optional[int]:
+    """Dönem alanı → int; boş / çevrilemezse None."""
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _last_n_predicate(n: Any, days: int, anchor: Optional[datetime]):
+    """Son N ay / yıl: anchor (LRS'teki en son iş tarihi) - N*days sonrası."""
+    n = _to_int(n)
+    # Dönemi anlayamazsak / LRS'te hiç tarih yoksa filtre uygulamayalım
+    if not n or n <= 0 or not anchor:
+        return _has_date
+
+    threshold = anchor - timedelta(days=n * days)  # kabaca
+    return lambda dt: dt is not None and dt >= threshold
+
+
+def _last_n_months_predicate(*, months, anchor, **_):
+    return _last_n_predicate(months, 30, anchor)
+
+
+def _last_n_years_predicate(*, years, anchor, **_):
+    return _last_n_predicate(years, 365, anchor)
+
+
+def _year_predicate(*, year, **_):
+    p_year = _to_int(year) if year else None
+    if p_year is None:
+        return _has_date
+    return lambda dt: dt is not None and dt.year == p_year
+
+
+def _month_predicate(*, month, year, **_):
+    """Belirli ay (opsiyonel year ile)."""
+    p_month = _to_int(month) if month else None
+    if p_month is None:
+        return _has_date
+
+    p_year = _to_int(year)
+    if p_year is None:
+        return lambda dt: dt is not None and dt.month == p_month
+    return lambda dt: dt is not None and dt.month == p_month and dt.year == p_year
+
+
+def _season_predicate(*, season, year, **_):
+    season_months = _SEASON_MONTHS.get(season)
+    if season_months is None:
+        # tanımsız mevsim → filtre yok
+        return _has_date
+
+    # Yıl belirtilmemişse: tüm yıllarda bu mevsim kabul
+    p_year = _to_int(year)
+    if p_year is None:
+        return lambda dt: dt is not None and dt.month in season_months
+
+    # Kış için yıl kayması (Aralık bir önceki yıl)
+    if season == "winter":
+        return lambda dt: (
+            dt is not None
+            and dt.month in season_months
+            and dt.year == (p_year - 1 if dt.month == 12 else p_year)
+        )
+    return lambda dt: dt is not None and dt.month in season_months and dt.year == p_year
+
+
+# period.kind → predicate üretici (tanımsız kind → _has_date)
+_KIND_HANDLERS: Dict[str, Callable[..., Callable[[Optional[datetime]], bool]]] = {
+    "last_n_months": _last_n_months_predicate,
+    "last_n_years": _last_n_years_predicate,
+    "year": _year_predicate,
+    "month": _month_predicate,
+    "season": _season_predicate,
+}
+
+
+@lru_cache(maxsize=128)
+def _period_predicate(
+    kind: Optional[str],
+    months: Any,
+    years: Any,
+    year: Any,
+    month: Any,
+    season: str,
+    anchor: Optional[datetime],
+) -> Callable[[Optional[datetime]], bool]:
+    """
+    Dönem parametreleri → iş tarihi predicate'i (LRSExamplesMixin._doc_matches_period
+    kuralları). Tarihi olmayan kayıt dönemli soruda her zaman elenir.
+    """
+    handler = _KIND_HANDLERS.get(kind)
+    if handler is None:
+        # Dönemi çözemiyorsak filtre uygulamayalım
+        return _has_date
+    return handler(months=months, years=years, year=year, month=month, season=season, anchor=anchor)
+
+
+def _get_business_datetime(
+    doc: Dict[str, Any],
+    ctx: Optional[Dict[str, Any]] = None,
+    _get_context=_get_context,
+    _parse_iso=_parse_iso,
+    _op_key: str = EXT_OP_DATE,
+    _rec_key: str = EXT_REC_DATE,
+) -> Optional[datetime]:
+    """
+    Dokümanın iş tarihi: operationDate, yoksa recordDate (context / statement.context).
+
+    Sıcak döngülerde çağrıldığı için yardımcılar ve IRI'ler default argüman
+    olarak local'e bağlanır. ctx verilirse (_get_context(doc)) tekrar çözülmez.
+    """
+    if ctx is None:
+        ctx = _get_context(doc)
+    exts = ctx.get("extensions") or {}
+    if not isinstance(exts, dict):
+        return None
+
+    return _parse_iso(exts.get(_op_key)) or _parse_iso(exts.get(_rec_key))
+
+
+def _as_utc(dt: Optional[datetime]) -> Optional[datetime]:
+    """pymongo naive UTC döner; ISO ("...Z") parse edilen tarihlerle karşılaştırılabilsin."""
+    if isinstance(dt, datetime) and dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+# _build_entity_id_match'in _extract_entity_ids ile birebir aynı sonucu verdiği tipler
+_EXACT_ENTITY_MATCH = frozenset({"customer", "vehicleModel"})
+
+
+def _business_date_expr() -> Dict[str, Any]:
+    """
+    operationDate, yoksa recordDate (Date) — Mongo aggregation ifadesi.
+
+    IRI key'lerinde nokta olduğu için dot-path yerine $getField kullanılır;
+    bozuk/eksik değerler null olur (Python tarafındaki _parse_iso ile aynı).
+    """
+    def _to_date(ext_key: str) -> Dict[str, Any]:
+        return {
+            "$convert": {
+                "input": _ext_expr(ext_key),
+                "to": "date",
+                "onError": None,
+                "onNull": None,
+            }
+        }
+
+    return {
+        "$ifNull": [
+            _to_date(EXT_OP_DATE),
+            _to_date(EXT_REC_DATE),
+        ]
+    }
+
+
+def _date_range_cond(lo: datetime, hi: datetime) -> Dict[str, Any]:
+    """$$bd ∈ [lo, hi) koşulu."""
+    return {"$and": [{"$gte": ["$$bd", lo]}, {"$lt": ["$$bd", hi]}]}
+
+
+def _month_start(year: int, month: int) -> datetime:
+    """year/month ayının ilk günü (UTC); month 13 → sonraki yılın Ocak'ı."""
+    year += (month - 1) // 12
+    month = (month - 1) % 12 + 1
+    return datetime(year, month, 1, tzinfo=timezone.utc)
+
 
 class LRSExamplesMixin:
     """
@@ -30,6 +295,7 @@ class LRSExamplesMixin:
 
     - self.statements           : Mongo koleksiyonu (LRSCore'dan)
     - self._build_mongo_filter  : QueryPlan → Mongo filter (LRSCore'dan)
+    - self._cached              : TTL'li tarih önbelleği (LRSCore'dan)
 
     Bu mixin:
     - Örnek statement çekme
@@ -37,8 +303,51 @@ class LRSExamplesMixin:
     - İnsan-dili açıklama cümleleri
     - "top entities" için örnek kayıtlar
     gibi işleri üstlenir.
+
+    get_example_statements filtre + timestamp (-1) sıralamasını index'ten
+    okuyabilsin diye gereken index'ler ensure_example_indexes ile kurulur
+    (tek seferlik: python -m services.lrs_service):
+    - timestamp (-1)                                  : filtresiz örnekler
+    - actor.account.name + timestamp (-1)             : vehicleId_eq
+    - object.definition.name.tr-TR + timestamp (-1)   : malzeme filtreleri
+    - contextActivities.grouping.id + timestamp (-1)  : servis / müşteri filtreleri (multikey)
     """
 
+    # Örnek statement'larda UI / render_statement_human'ın kullandığı alanlar
+    # (root + statement.* yerleşimi); LRS metadata alanları taşınmaz
+    _EXAMPLE_PROJECTION: Dict[str, int] = {
+        "_id": 1,
+        "id": 1,
+        "actor": 1,
+        "verb": 1,
+        "object": 1,
+        "context": 1,
+        "result": 1,
+        "timestamp": 1,
+        "stored": 1,
+        "statement": 1,
+    }
+
+    # "top entities" örneklerinde entity / render için gereken alanlar
+    _TOP_ENTITY_PROJECTION: Dict[str, int] = {
+        "actor": 1,
+        "context": 1,
+        "statement.actor": 1,
+        "statement.context": 1,
+        "result": 1,
+        "statement.result": 1,
+        "object": 1,
+        "verb": 1,
+        "timestamp": 1,
+        "stored": 1,
+    }
+
+    # (en yeni _id, en son iş tarihi); bkz. _compute_latest_business_date
+    _latest_business_snapshot: Optional[Tuple[Any, Optional[datetime]]] = None
+
+    # Cursor'larda round-trip / bellek dengesi
+    _CURSOR_BATCH_SIZE = 500
+
     # ---------- Örnek xAPI Statement Çekme ----------
 
     def get_example_statements(
@@ -53,9 +362,10 @@ class LRSExamplesMixin:
         mongo_filter = self._build_mongo_filter(plan)
 
         cursor = (
-            self.statements.find(mongo_filter)
+            self.statements.find(mongo_filter, self._EXAMPLE_PROJECTION)
             .sort("timestamp", -1)
             .limit(limit)
+            .batch_size(self._CURSOR_BATCH_SIZE)
         )
 
         examples: List[Dict[str, Any]] = []
@@ -67,6 +377,25 @@ class LRSExamplesMixin:
 
         return examples
 
+    def ensure_example_indexes(self) -> List[str]:
+        """Örnek statement sorgularının index'lerini oluşturur (varsa no-op)."""
+        ts_desc = ("timestamp", DESCENDING)
+        return [
+            self.statements.create_index([ts_desc], name="timestamp_-1"),
+            self.statements.create_index(
+                [("actor.account.name", ASCENDING), ts_desc],
+                name="actor.account.name_1_timestamp_-1",
+            ),
+            self.statements.create_index(
+                [("object.definition.name.tr-TR", ASCENDING), ts_desc],
+                name="object.definition.name.tr-TR_1_timestamp_-1",
+            ),
+            self.statements.create_index(
+                [("context.contextActivities.grouping.id", ASCENDING), ts_desc],
+                name="context.contextActivities.grouping.id_1_timestamp_-1",
+            ),
+        ]
+
     # ---------- İş günü anchor tarihi ----------
 
     def _compute_latest_business_date(self) -> Optional[datetime]:
@@ -79,49 +408,64 @@ class LRSExamplesMixin:
           * https://promptever.com/extensions/recordDate
           alanlarına bakar.
         - Bulamazsa None döner.
+        - Maksimum sunucuda tek bir $group ile hesaplanır; Python'a tek doküman gelir.
+          operationDateISO materialize edilmişse (LRS_OPDATE_FIELD) onun en
+          büyüğü index'ten tek doküman olarak okunur; $group yalnızca bu alanı
+          olmayan (recordDate'e düşen) kayıtlarda çalışır.
+        - Sonuç en yeni _id ile birlikte saklanır; o andan beri yeni kayıt
+          eklenmediyse $group tekrar çalıştırılmaz (tek _id index okuması).
         """
-        latest: Optional[datetime] = None
-
-        def _parse_iso(value: Any) -> Optional[datetime]:
-            if isinstance(value, datetime):
-                return value
-            if isinstance(value, str):
-                try:
-                    return datetime.fromisoformat(value.replace("Z", "+00:00"))
-                except Exception:
-                    return None
-            return None
-
-        # Sadece context alanlarını projekte edelim; diğer alanlara ihtiyacımız yok
-        cursor = self.statements.find(
-            {},
-            {
-                "context": 1,
-                "statement.context": 1,
-            },
-        )
-
-        for doc in cursor:
-            ctx = _get_context(doc)
-            exts = ctx.get("extensions") or {}
+        head = self.statements.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+        head_id = head.get("_id") if head else None
+
+        snapshot = self._latest_business_snapshot
+        if snapshot is not None and snapshot[0] == head_id:
+            return snapshot[1]
+
+        if _USE_OPDATE_FIELD:
+            top = self.statements.find_one(
+                {OPDATE_FIELD: {"$type": "date"}},
+                {OPDATE_FIELD: 1},
+                sort=[(OPDATE_FIELD, -1)],
+            )
+            candidates = [
+                top.get(OPDATE_FIELD) if top else None,
+                self._max_business_date({OPDATE_FIELD: None}),
+            ]
+            latest = max((_as_utc(c) for c in candidates if isinstance(c, datetime)), default=None)
+        else:
+            latest = _as_utc(self._max_business_date())
+
+        self._latest_business_snapshot = (head_id, latest)
+        return latest
 
-            op_raw = None
-            rec_raw = None
-            if isinstance(exts, dict):
-                op_raw = exts.get("https://promptever.com/extensions/operationDate")
-                rec_raw = exts.get("https://promptever.com/extensions/recordDate")
+    def _max_business_date(self, match: Optional[Dict[str, Any]] = None) -> Optional[datetime]:
+        """(match'e uyan) kayıtlar arasında en büyük iş tarihi — tek $group."""
+        pipeline: List[Dict[str, Any]] = [{"$match": match}] if match else []
+        pipeline.append({"$group": {"_id": None, "latest": {"$max": _business_date_expr()}}})
+        res = next(self.statements.aggregate(pipeline), None)
+        return res.get("latest") if res else None
 
-            dt = _parse_iso(op_raw) or _parse_iso(rec_raw)
-            if dt and (latest is None or dt > latest):
-                latest = dt
+    def _get_latest_business_date(self) -> Optional[datetime]:
+        """
+        Dönem filtreleri için anchor tarih.
 
-        # Sonucu cache'leyelim (aynı process içinde tekrar tekrar hesaplamayalım)
-        self._latest_business_date = latest
-        return latest
+        Sonuç _DATE_CACHE_TTL saniye önbellekte tutulur (bkz. reset_date_cache);
+        süre dolunca _compute_latest_business_date yalnızca koleksiyon
+        değiştiyse yeniden hesaplar.
+        """
+        return self._cached(
+            "latest_business_date", _DATE_CACHE_TTL, self._compute_latest_business_date
+        )
 
     # ---------- Dönem filtresi ----------
 
-    def _doc_matches_period(self, doc: Dict[str, Any], period) -> bool:
+    def _doc_matches_period(
+        self,
+        doc: Dict[str, Any],
+        period,
+        _ctx: Optional[Dict[str, Any]] = None,
+    ) -> bool:
         """
         Dönem filtresi:
 
@@ -137,169 +481,247 @@ class LRSExamplesMixin:
 
         Yalnızca operationDate ve recordDate'e bakar.
         timestamp / stored gibi LRS sistem tarihlerini KULLANMAZ.
+
+        _ctx: aynı doküman için önceden hesaplanmış _get_context(doc) (opsiyonel).
         """
         if not period:
             return True
 
-        def _parse_iso(value: Any) -> Optional[datetime]:
-            if isinstance(value, datetime):
-                return value
-            if isinstance(value, str):
-                try:
-                    return datetime.fromisoformat(value.replace("Z", "+00:00"))
-                except Exception:
-                    return None
-            return None
+        return self._compile_period_predicate(period)(_get_business_datetime(doc, _ctx))
+
+    def _compile_period_predicate(self, period) -> Callable[[Optional[datetime]], bool]:
+        """
+        Dönemi bir kez çözüp iş tarihini (dt) test eden predicate döner.
+
+        Döngü içinde her doküman için attribute okuma / int parse / eşik
+        hesaplamak yerine çağıran taraf predicate'i bir kez derleyip dt ile
+        çağırır. Aynı dönem parametreleri için predicate lru_cache'ten gelir.
+        """
+        if not period:
+            return _accept_any
 
-        def _get_business_datetime(doc: Dict[str, Any]) -> Optional[datetime]:
-            ctx = _get_context(doc)
-            exts = ctx.get("extensions") or {}
-            if not isinstance(exts, dict):
-                return None
+        kind = _get_attr(period, "kind", None)
 
-            op_raw = exts.get("https://promptever.com/extensions/operationDate")
-            rec_raw = exts.get("https://promptever.com/extensions/recordDate")
+        anchor = None
+        if kind in ("last_n_months", "last_n_years"):
+            # Anchor tarihi: LRS'teki EN SON operationDate/recordDate
+            anchor = self._get_latest_business_date()
+
+        return _period_predicate(
+            kind,
+            _get_attr(period, "months", None),
+            _get_attr(period, "years", None),
+            _get_attr(period, "year", None),
+            _get_attr(period, "month", None),
+            (_get_attr(period, "season", "") or "").lower(),
+            anchor,
+        )
 
-            return _parse_iso(op_raw) or _parse_iso(rec_raw)
+    def _build_period_mongo_filter(
+        self,
+        period,
+        date_expr: Any = None,
+    ) -> Dict[str, Any]:
+        """
+        _doc_matches_period'un Mongo karşılığı: dönem filtresini sunucu
+        tarafında çalışacak bir $expr'e çevirir (boş dict = filtre yok).
 
-        dt = _get_business_datetime(doc)
-        if not dt:
-            # Gerçek operasyon/record tarihi yoksa dönemli soruda dışarı atalım
-            return False
+        İş tarihi (operationDate / recordDate) yoksa kayıt elenir; dönem
+        çözülemezse yalnızca bu koşul kalır — Python tarafıyla aynı davranış.
 
+        date_expr: iş tarihi pipeline'da önceden hesaplandıysa o alan ("$_bd");
+        verilmezse _business_date_expr() kullanılır.
+        """
+        if not period:
+            return {}
+
+        cond: Optional[Dict[str, Any]] = None
         kind = _get_attr(period, "kind", None)
+        bounds = self._period_date_bounds(period)
+
+        if bounds is not None:
+            lo, hi = bounds
+            cond = {"$gte": ["$$bd", lo]} if hi is None else _date_range_cond(lo, hi)
 
-        # ------------------------------------------------------------------
-        # ÖZEL: son N ay
-        # ------------------------------------------------------------------
-        if kind == "last_n_months":
-            months = _get_attr(period, "months", None)
+        elif kind == "month":
+            # Yıl verilmemiş: her yılın o ayı
             try:
-                months = int(months)
+                p_month = int(_get_attr(period, "month", None) or 0)
             except (TypeError, ValueError):
-                months = None
+                p_month = 0
+
+            if 1 <= p_month <= 12:
+                cond = {"$eq": [{"$month": "$$bd"}, p_month]}
+
+        elif kind == "season":
+            # Yıl verilmemiş: her yılın o mevsimi
+            months = _SEASON_MONTHS.get((_get_attr(period, "season", "") or "").lower())
+            if months is not None:
+                cond = {"$in": [{"$month": "$$bd"}, sorted(months)]}
+
+        checks: List[Dict[str, Any]] = [{"$ne": ["$$bd", None]}]
+        if cond is not None:
+            checks.append(cond)
+
+        return {
+            "$expr": {
+                "$let": {
+                    "vars": {"bd": date_expr if date_expr is not None else _business_date_expr()},
+                    "in": {"$and": checks},
+                }
+            }
+        }
+
+    def _period_date_bounds(self, period) -> Optional[Tuple[datetime, Optional[datetime]]]:
+        """
+        Dönem tek bir tarih aralığına karşılık geliyorsa [lo, hi) sınırları
+        (hi None → yalnızca alt sınır; son N ay / yıl). Yılsız ay / mevsim gibi
+        aralık olmayan ya da çözülemeyen dönemlerde None.
+        """
+        if not period:
+            return None
 
-            if not months or months <= 0:
-                # Dönemi anlayamazsak filtre uygulamayalım
-                return True
+        kind = _get_attr(period, "kind", None)
 
-            # Anchor tarihi: LRS'teki EN SON operationDate/recordDate
-            anchor = getattr(self, "_latest_business_date", None)
-            if anchor is None:
-                anchor = self._compute_latest_business_date()
-
-            if not anchor:
-                # LRS'te hiç tarih yakalayamazsak, filtreyi devre dışı bırak
-                return True
-
-            threshold = anchor - timedelta(days=months * 30)  # kabaca
-            return dt >= threshold
-
-        # ------------------------------------------------------------------
-        # ÖZEL: son N yıl
-        # ------------------------------------------------------------------
-        if kind == "last_n_years":
-            years = _get_attr(period, "years", None)
+        if kind in ("last_n_months", "last_n_years"):
+            attr, days = ("months", 30) if kind == "last_n_months" else ("years", 365)
             try:
-                years = int(years)
+                n = int(_get_attr(period, attr, None))
             except (TypeError, ValueError):
-                years = None
-
-            if not years or years <= 0:
-                return True
+                n = None
 
-            anchor = getattr(self, "_latest_business_date", None)
-            if anchor is None:
-                anchor = self._compute_latest_business_date()
-
-            if not anchor:
-                return True
+            if n and n > 0:
+                anchor = self._get_latest_business_date()
+                if anchor:
+                    return anchor - timedelta(days=n * days), None  # kabaca
+            return None
 
-            threshold = anchor - timedelta(days=years * 365)  # kabaca
-            return dt >= threshold
+        if kind not in ("year", "month", "season"):
+            return None
 
-        # ------------------------------------------------------------------
-        # Mevsim / ay / yıl mantığı
-        # ------------------------------------------------------------------
-        year = dt.year
-        month = dt.month
+        try:
+            p_year = _get_attr(period, "year", None)
+            p_year = int(p_year) if p_year else None
+        except (TypeError, ValueError):
+            p_year = None
+        if p_year is None:
+            return None
 
-        # YEAR
         if kind == "year":
-            p_year = _get_attr(period, "year", None)
-            if not p_year:
-                # Yıl verilmemişse aslında filtre yok
-                return True
-            try:
-                p_year = int(p_year)
-            except (TypeError, ValueError):
-                return True
-            return year == p_year
+            return _month_start(p_year, 1), _month_start(p_year + 1, 1)
 
-        # MONTH (opsiyonel year ile)
         if kind == "month":
-            p_month = _get_attr(period, "month", None)
-            if not p_month:
-                return True
             try:
-                p_month = int(p_month)
+                p_month = int(_get_attr(period, "month", None) or 0)
             except (TypeError, ValueError):
-                return True
+                p_month = 0
+            if 1 <= p_month <= 12:
+                return _month_start(p_year, p_month), _month_start(p_year, p_month + 1)
+            return None
 
-            if month != p_month:
-                return False
+        season = (_get_attr(period, "season", "") or "").lower()
+        if season not in _SEASON_MONTHS:
+            return None
+        first = _SEASON_FIRST_MONTH[season]
+        return _month_start(p_year, first), _month_start(p_year, first + 3)
 
-            p_year = _get_attr(period, "year", None)
-            if p_year is None:
-                return True
-            try:
-                p_year = int(p_year)
-            except (TypeError, ValueError):
-                return True
-            return year == p_year
+    def _build_period_index_filter(self, period) -> Dict[str, Any]:
+        """
+        Dönem filtresinin index'li ön elemesi (boş dict = yok): materialize
+        edilmiş operationDateISO aralıkta olan ya da hiç olmayan kayıtlar
+        (iş tarihi recordDate'ten gelebilir). Kesin dönem kontrolü
+        _build_period_mongo_filter / _doc_matches_period ile yapılmaya devam eder.
+        """
+        if not _USE_OPDATE_FIELD:
+            return {}
 
-        # SEASON
-        if kind == "season":
-            season = (_get_attr(period, "season", "") or "").lower()
-            p_year = _get_attr(period, "year", None)
-            try:
-                p_year = int(p_year) if p_year is not None else None
-            except (TypeError, ValueError):
-                p_year = None
-
-            if season == "winter":
-                season_months = {12, 1, 2}
-            elif season == "spring":
-                season_months = {3, 4, 5}
-            elif season == "summer":
-                season_months = {6, 7, 8}
-            elif season in ("autumn", "fall"):
-                season_months = {9, 10, 11}
-            else:
-                # tanımsız mevsim → filtre yok
-                return True
-
-            if month not in season_months:
-                return False
-
-            # Yıl belirtilmemişse: tüm yıllarda bu mevsim kabul
-            if p_year is None:
-                return True
-
-            # Kış için yıl kayması (Aralık bir önceki yıl)
-            if season == "winter":
-                if month == 12:
-                    return year == (p_year - 1)
-                else:
-                    return year == p_year
-
-            # Diğer mevsimler: normal aynı yıl
-            return year == p_year
-
-        # ------------------------------------------------------------------
-        # Dönemi çözemiyorsak filtre uygulamayalım
-        # ------------------------------------------------------------------
-        return True
+        bounds = self._period_date_bounds(period)
+        if bounds is None:
+            return {}
+
+        lo, hi = bounds
+        date_range: Dict[str, Any] = {"$gte": lo}
+        if hi is not None:
+            date_range["$lt"] = hi
+        return {"$or": [{OPDATE_FIELD: date_range}, {OPDATE_FIELD: None}]}
+
+    @staticmethod
+    def _build_service_mongo_filter(service_filter: Optional[str]) -> Dict[str, Any]:
+        """
+        _doc_matches_service_filter'ın Mongo karşılığı: service-location
+        grouping ID'sinde servis kodunu arayan $regex (boş dict = filtre yok).
+        """
+        if not service_filter:
+            return {}
+
+        pattern = {"$regex": _service_regex(service_filter)}
+        return {
+            "$or": [
+                {"context.contextActivities.grouping.id": pattern},
+                {"statement.context.contextActivities.grouping.id": pattern},
+            ]
+        }
+
+    @staticmethod
+    def _build_entity_id_match(entity_type: str, target_ids) -> Dict[str, Any]:
+        """
+        _extract_entity_ids'in Mongo karşılığı: entity_type alanında target_ids'ten
+        birini taşıyan kayıtlar (boş dict = filtre yok).
+
+        Sunucu tarafında ön eleme yapar; Python'daki fallback'leri (araç adı yoksa
+        plaka extension'ları, vehicleType benzeri key'ler) kaçırmamak için alanı
+        hiç olmayan kayıtları da geçirir. Kesin eşleşme döngüde doğrulanır.
+        """
+        ids = sorted(target_ids)
+        if not ids:
+            return {}
+
+        def _both(path: str, cond: Dict[str, Any]) -> List[Dict[str, Any]]:
+            # root + statement.* yerleşimi
+            return [{path: cond}, {"statement." + path: cond}]
+
+        def _ext_in(ext_key: str) -> Dict[str, Any]:
+            # IRI key'lerinde nokta var → $getField; değer string'e çevrilip karşılaştırılır
+            value = _ext_expr(ext_key)
+            as_str = {"$convert": {"input": value, "to": "string", "onError": None, "onNull": None}}
+            return {"$in": [{"$trim": {"input": {"$ifNull": [as_str, ""]}}}, ids]}
+
+        if entity_type == "vehicle":
+            names = ids + ["vehicle/" + i for i in ids]
+            no_name = {"$not": {"$type": "string"}}
+            return {
+                "$or": _both("actor.account.name", {"$in": names})
+                + [{"actor.account.name": no_name, "statement.actor.account.name": no_name}]
+            }
+
+        if entity_type == "customer":
+            # .../activities/customer/XYZ → son segment XYZ
+            pattern = {
+                "$regex": "/activities/customer/(?:.*/)?(?:"
+                + "|".join(re.escape(i) for i in ids)
+                + ")$"
+            }
+            return {"$or": _both("context.contextActivities.grouping.id", pattern)}
+
+        if entity_type == "material":
+            return {"$or": _both("object.definition.name.tr-TR", {"$in": ids})}
+
+        if entity_type == "vehicleModel":
+            return {"$expr": _ext_in(EXT_MODEL_NO)}
+
+        if entity_type == "vehicleType":
+            vt_key = EXT_VEHICLE_TYPE
+            return {
+                "$expr": {
+                    "$or": [
+                        _ext_in(vt_key),
+                        # IRI yoksa Python'daki "vehicletype" key fallback'i devreye girer
+                        {"$eq": [{"$ifNull": [_ext_expr(vt_key), None]}, None]},
+                    ]
+                }
+            }
+
+        return {}
 
     # ---------- "En çok gelen..." tipi sorular için örnekler ----------
 
@@ -317,46 +739,56 @@ class LRSExamplesMixin:
             return []
 
         # Top listeden entity id'lerini topla (biraz sınır koyarak)
-        target_ids: set[str] = set()
-        for r in rows:
-            eid = r.get("entity")
-            if isinstance(eid, (str, int)):
-                target_ids.add(str(eid))
-            if len(target_ids) >= limit * 3:
-                break
+        target_ids = frozenset(
+            str(r["entity"])
+            for r in rows[: limit * 3]
+            if isinstance(r.get("entity"), (str, int))
+        )
 
         if not target_ids:
             return []
 
         examples: List[Dict[str, Any]] = []
 
-        cursor = (
-            self.statements.find(
-                {},
-                {
-                    "actor": 1,
-                    "context": 1,
-                    "statement.actor": 1,
-                    "statement.context": 1,
-                    "result": 1,
-                    "statement.result": 1,
-                    "object": 1,
-                    "verb": 1,
-                    "timestamp": 1,
-                    "stored": 1,
-                },
+        # Servis + entity filtresi sunucuda; Python'a yalnızca eşleşenler gelir
+        clauses = [
+            c
+            for c in (
+                self._build_service_mongo_filter(question.service_filter),
+                self._build_entity_id_match(question.entity_type, target_ids),
             )
-            .sort("timestamp", -1)
+            if c
+        ]
+
+        pipeline: List[Dict[str, Any]] = []
+        if clauses:
+            pipeline.append({"$match": clauses[0] if len(clauses) == 1 else {"$and": clauses}})
+
+        # İş tarihi (Date) bir kez hesaplanır: dönem filtresi + en yeni iş tarihine göre sıralama
+        pipeline.append({"$addFields": {"_bd": _business_date_expr()}})
+        period_filter = self._build_period_mongo_filter(question.period, date_expr="$_bd")
+        if period_filter:
+            pipeline.append({"$match": period_filter})
+
+        pipeline.append({"$sort": {"_bd": -1, "timestamp": -1}})
+        # Sunucu eşleşmesi kesin olan entity tiplerinde tam limit kadar doküman
+        # yeterli. Fallback'li tiplerde (vehicle, vehicleType, material) aday
+        # sayısı sınırlanmaz: Python doğrulaması kaç adayı eleyeceği bilinemez,
+        # döngü limit kadar örnek bulunca cursor'ı bırakır.
+        if question.entity_type in _EXACT_ENTITY_MATCH:
+            pipeline.append({"$limit": limit})
+        pipeline.append({"$project": self._TOP_ENTITY_PROJECTION})
+
+        cursor = self.statements.aggregate(
+            pipeline,
+            allowDiskUse=True,
+            batchSize=self._CURSOR_BATCH_SIZE,
         )
 
         for doc in cursor:
-            if not self._doc_matches_service_filter(doc, question.service_filter):
-                continue
-            if not self._doc_matches_period(doc, question.period):
-                continue
-
-            ids_in_doc = self._extract_entity_ids(doc, question.entity_type)
-            if any(str(eid) in target_ids for eid in ids_in_doc):
+            # _extract_entity_ids zaten str döner
+            ids_in_doc = self._extract_entity_ids(doc, question.entity_type, _get_context(doc))
+            if not target_ids.isdisjoint(ids_in_doc):
                 if isinstance(doc.get("_id"), ObjectId):
                     doc["_id"] = str(doc["_id"])
                 examples.append(doc)
@@ -371,33 +803,28 @@ class LRSExamplesMixin:
         """
         xAPI statement'ı daha kapsayıcı ve bağlamsal bir Türkçe cümle hâline getirir.
         """
+        ctx = _get_context(stmt)
+        exts = ctx.get("extensions") or {}
+
         # ------------------------------
         # Tarih (önce operationDate, sonra recordDate)
         # ------------------------------
+        # Not: IRI key'leri nokta içerdiği için dotted path ile okunamaz
         raw_ts = (
-            _get_nested(
-                stmt,
-                "context.extensions.https://promptever.com/extensions/operationDate",
-            )
-            or _get_nested(
-                stmt,
-                "context.extensions.https://promptever.com/extensions/recordDate",
-            )
+            exts.get(EXT_OP_DATE)
+            or exts.get(EXT_REC_DATE)
             or stmt.get("timestamp")
-            or _get_nested(stmt, "statement.timestamp")
+            or _walk_path(stmt, _PATH_STMT_TIMESTAMP)
             or stmt.get("stored")
-            or _get_nested(stmt, "statement.stored")
+            or _walk_path(stmt, _PATH_STMT_STORED)
         )
 
         date_str = None
-        if isinstance(raw_ts, datetime):
-            date_str = raw_ts.date().isoformat()
+        ts = _parse_iso(raw_ts)
+        if ts is not None:
+            date_str = ts.date().isoformat()
         elif isinstance(raw_ts, str):
-            try:
-                dt = datetime.fromisoformat(raw_ts.replace("Z", "+00:00"))
-                date_str = dt.date().isoformat()
-            except Exception:
-                date_str = raw_ts
+            date_str = raw_ts
 
         date_part = f"{date_str} tarihinde" if date_str else "Belirsiz tarihte"
 
@@ -418,15 +845,15 @@ class LRSExamplesMixin:
         # ------------------------------
         # Araç detayları (context.extensions + km)
         # ------------------------------
-        ctx = _get_context(stmt)
-        exts = ctx.get("extensions") or {}
-
-        vehicle_type = exts.get("https://promptever.com/extensions/vehicleType")
-        model_no = exts.get("https://promptever.com/extensions/modelNo")
-        manufacturer = exts.get("https://promptever.com/extensions/manufacturer")
+        fields = _pick_fields(exts, _EXT_MAP)
+        fields.update(
+            _pick_fields(_walk_path(stmt, _PATH_RESULT_EXT, {}) or {}, _RES_EXT_MAP)
+        )
 
-        result_ext = _get_nested(stmt, "result.extensions", {}) or {}
-        km = result_ext.get("https://promptever.com/extensions/odometerReading")
+        vehicle_type = fields.get("vehicle_type")
+        model_no = fields.get("model_no")
+        manufacturer = fields.get("manufacturer")
+        km = fields.get("km")
 
         vehicle_details = []
         if manufacturer:
@@ -438,10 +865,6 @@ class LRSExamplesMixin:
         if km is not None:
             vehicle_details.append(f"km: {km}")
 
-        vehicle_details_str = (
-            " (" + ", ".join(vehicle_details) + ")" if vehicle_details else ""
-        )
-
         # ------------------------------
         # Verb
         # ------------------------------
@@ -455,15 +878,12 @@ class LRSExamplesMixin:
         # ------------------------------
         obj = stmt.get("object") or {}
         definition = obj.get("definition") or {}
-        mat_name = (
-            definition.get("name", {}).get("tr-TR")
-            or definition.get("name", {}).get("en-US")
-            or "malzeme"
-        )
+        name = definition.get("name") or {}
+        mat_name = name.get("tr-TR") or name.get("en-US") or "malzeme"
 
-        cost = result_ext.get("https://promptever.com/extensions/materialCost")
-        qty = result_ext.get("https://promptever.com/extensions/materialQuantity")
-        discount = result_ext.get("https://promptever.com/extensions/discountAmount")
+        cost = fields.get("cost")
+        qty = fields.get("qty")
+        discount = fields.get("discount")
 
         mat_details = []
         mat_details.append(f"malzeme: {mat_name}")
@@ -474,18 +894,15 @@ class LRSExamplesMixin:
         if discount is not None:
             mat_details.append(f"indirimli tutar: {discount} TL")
 
-        mat_details_str = ", ".join(mat_details)
-
         # ------------------------------
-        # Son cümle
+        # Son cümle (parçalar tek "".join ile birleştirilir)
         # ------------------------------
-        sentence = (
-            f"{date_part} {service_part}, "
-            f"{customer_part} {vehicle_part}{vehicle_details_str} için "
-            f"{verb_part} ({mat_details_str}) işlemi yapıldı."
-        )
+        parts = [date_part, " ", service_part, ", ", customer_part, " ", vehicle_part]
+        if vehicle_details:
+            parts += [" (", ", ".join(vehicle_details), ")"]
+        parts += [" için ", verb_part, " (", ", ".join(mat_details), ") işlemi yapıldı."]
 
-        return sentence
+        return "".join(parts)
 
     # ---------- "En çok gelen..." tipi sorular için yardımcılar ----------
 
@@ -493,126 +910,43 @@ class LRSExamplesMixin:
         self,
         doc: Dict[str, Any],
         entity_type: str,
+        _ctx: Optional[Dict[str, Any]] = None,
     ) -> List[str]:
         """
+        _ctx: aynı doküman için önceden hesaplanmış _get_context(doc) (opsiyonel).
+
         entity_type:
           - "vehicle"    : actor.account.name (vehicle/XYZ → XYZ)
           - "customer"   : contextActivities.grouping → /activities/customer/...
           - "vehicleType": context.extensions.vehicleType
           - "vehicleModel" : context.extensions.modelNo
           - "material"   : object.definition.name.tr-TR (malzeme adı)
-        """
-        ids: List[str] = []
-
-        # 1) Araç (vehicle)
-        if entity_type == "vehicle":
-            vid = _extract_vehicle_id_from_actor(doc)
-            if vid:
-                ids.append(str(vid))
-            return ids
-
-        # 2) Müşteri (customer)
-        if entity_type == "customer":
-            ctx = _get_context(doc)
-            ctx_acts = ctx.get("contextActivities") or {}
-            grouping = ctx_acts.get("grouping") or []
-            if isinstance(grouping, dict):
-                grouping = [grouping]
-
-            for g in grouping:
-                if not isinstance(g, dict):
-                    continue
-                gid = g.get("id")
-                if not isinstance(gid, str):
-                    continue
-                # .../activities/customer/XYZ → XYZ
-                if "/activities/customer/" in gid:
-                    cid = gid.rsplit("/", 1)[-1]
-                    if cid:
-                        ids.append(cid)
-            return ids
-
-        # 3) Araç tipi (vehicleType)
-        if entity_type == "vehicleType":
-            ctx = _get_context(doc)
-            exts = ctx.get("extensions") or {}
-            vt = None
-
-            if isinstance(exts, dict):
-                # Önce bizim MAN extension IRI'sini dene
-                vt = exts.get(
-                    "https://promptever.com/extensions/vehicleType"
-                )
-
-                # Olmazsa, key içinde "vehicletype" geçen herhangi bir extension'a düş
-                if vt is None:
-                    for k, v in exts.items():
-                        if isinstance(k, str) and "vehicletype" in k.lower():
-                            vt = v
-                            break
-
-            if vt not in (None, "", 0, "0"):
-                ids.append(str(vt))
-            return ids
-
-        # 4) Malzeme (material)
-        if entity_type == "material":
-            # Önce root-level object
-            name = _get_nested(doc, "object.definition.name.tr-TR")
-            if not isinstance(name, str) or not name.strip():
-                # LRS bazı durumlarda statement.* altında tutuyor olabilir
-                name = _get_nested(doc, "statement.object.definition.name.tr-TR")
-
-            if isinstance(name, str) and name.strip():
-                ids.append(name.strip())
-
-            return ids
-        
-        # 5) Araç modeli (vehicleModel)
-        if entity_type == "vehicleModel":
-            ctx = _get_context(doc)
-            exts = ctx.get("extensions") or {}
-
-            model_no = exts.get("https://promptever.com/extensions/modelNo")
-
-            if isinstance(model_no, (str, int, float)):
-                model_str = str(model_no).strip()
-                if model_str:
-                    ids.append(model_str)
-
-            return ids
 
-        # Tanımadığımız entity_type için boş liste
-        return ids
+        Tanımadığımız entity_type için boş liste döner.
+        """
+        extractor = _EXTRACTORS.get(entity_type)
+        if extractor is None:
+            return []
+        return extractor(doc, _ctx if _ctx is not None else _get_context(doc))
 
     def _doc_matches_service_filter(
         self,
         doc: Dict[str, Any],
         service_filter: Optional[str],
+        _ctx: Optional[Dict[str, Any]] = None,
     ) -> bool:
         """
         Eğer service_filter verilmişse, contextActivities.grouping içindeki
-        service-location activity'lerinin ID'lerinde bu kodun geçip geçmediğine bakar.
+        service-location activity'lerinin ID'lerinde (son segmentte) bu kodun
+        geçip geçmediğine bakar.
         Örn:
           - service_filter = "540"
           - id = ".../activities/service-location/R540" veya ".../service-location/540"
+
+        _ctx: aynı doküman için önceden hesaplanmış _get_context(doc) (opsiyonel).
         """
         if not service_filter:
             return True
 
-        ctx = _get_context(doc)
-        ca = ctx.get("contextActivities") or {}
-        grouping = ca.get("grouping") or []
-        if not isinstance(grouping, list):
-            return False
-
-        for g in grouping:
-            if not isinstance(g, dict):
-                continue
-            gid = g.get("id")
-            if not isinstance(gid, str):
-                continue
-            if "/activities/service-location/" in gid and service_filter in gid:
-                return True
-
-        return False
+        ctx = _ctx if _ctx is not None else _get_context(doc)
+        return _matches_service_filter(ctx, service_filter)
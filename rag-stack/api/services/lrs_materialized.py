@@ -0,0 +1,526 @@
+"""
+services/lrs_materialized.py
+============================
+
+URL formatındaki extension key'lerinden türetilen top-level, index'li
+alanların statement'lara yazılması.
+
+Extension key'leri (https://promptever.com/...) nokta içerdiği için dot
+notation ile adreslenemez; filtreler $expr + $getField ile hesaplanıyordu.
+$expr index kullanamaz, her sorgu COLLSCAN'e düşer. Alanlar bir kez
+materialize edilip index'lenince LRSCore filtreleri düz sorgu olarak
+üretebilir:
+
+- operationDateISO → operationDate (Date),   {operationDateISO: 1}
+                     (bkz. config.LRS_OPDATE_FIELD_ENABLED)
+- faultCodeStr     → gerçek arıza kodu (string) veya null,
+                     partial {faultCodeStr: 1, operationDateISO: 1}
+                     ($type: "string") (bkz. config.LRS_FAULT_FIELD_ENABLED)
+- vehicleTypeStr   → vehicleType,  {vehicleTypeStr: 1, operationDateISO: 1}
+- vehicleModelStr  → vehicleModel, {vehicleModelStr: 1, operationDateISO: 1}
+                     (bkz. config.LRS_VEHICLE_FIELDS_ENABLED)
+- verbKind         → verb.id'nin son parçası ("maintained", "repaired", ...),
+                     {verbKind: 1, timestamp: -1},
+                     {verbKind: 1, operationDateISO: 1},
+                     {verbKind: 1, vehicleModelStr: 1}
+                     (bkz. config.LRS_VERB_KIND_FIELD_ENABLED)
+- materialNameNorm → normalize_tr(malzeme adı),  {verbKind: 1, materialNameNorm: 1}
+- vehicleModelNorm → normalize_tr(vehicleModel), {verbKind: 1, vehicleModelNorm: 1}
+                     (bkz. config.LRS_NORM_FIELDS_ENABLED)
+- vehicleIds       → actor adları + vehicleId / vehicleNo extension'ları
+                     ("/" sonrası son segment, küçük harf; dizi),
+                     multikey {vehicleIds: 1, operationDateISO: 1}
+                     (bkz. config.LRS_VEHICLE_ID_FIELD_ENABLED)
+
+Compound index'ler baskın sorgu kalıbına göre (Equality → Range): araç
+tipi / modeli / arıza kodu / verb eşitliği + operationDate aralığı.
+
+- backfill_materialized_fields → mevcut kayıtlar için tek seferlik migration
+- ensure_materialized_indexes  → index'ler
+- start/stop_materialize_maintainer → change stream ile yeni insert'leri işler
+  (uniqueVehicles HLL sketch'i de buradan güncellenir, bkz. lrs_vehicle_hll).
+  Resume token lrs_stats'ta saklanır; kopan stream kaldığı yerden açılır,
+  eksik alanlı kayıtlar başlangıçta ve periyodik backfill ile tamamlanır.
+
+Tek seferlik migration:
+    python -m services.lrs_materialized
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure, PyMongoError
+
+from config import (
+    lrs_statements,
+    LRS_MATERIALIZE_BACKFILL_INTERVAL,
+    LRS_OPDATE_FIELD_ENABLED,
+    LRS_FAULT_FIELD_ENABLED,
+    LRS_VEHICLE_FIELDS_ENABLED,
+    LRS_VERB_KIND_FIELD_ENABLED,
+    LRS_NORM_FIELDS_ENABLED,
+    LRS_VEHICLE_ID_FIELD_ENABLED,
+    LRS_VEHICLE_HLL_ENABLED,
+)
+from services.lrs_schema import MAN_SCHEMA, _opdate_date_expr
+from services.xapi_nlp.nlp_constants import REPLACEMENTS
+
+logger = logging.getLogger(__name__)
+
+# Materialize edilen alanların adları (LRSCore filtreleri de bunları kullanır)
+OPDATE_FIELD = "operationDateISO"
+FAULT_FIELD = "faultCodeStr"
+VEHICLE_TYPE_FIELD = "vehicleTypeStr"
+VEHICLE_MODEL_FIELD = "vehicleModelStr"
+VERB_KIND_FIELD = "verbKind"
+MATERIAL_NAME_NORM_FIELD = "materialNameNorm"
+VEHICLE_MODEL_NORM_FIELD = "vehicleModelNorm"
+VEHICLE_IDS_FIELD = "vehicleIds"
+
+
+def _str_expr(dim: str) -> Dict[str, Any]:
+    """Schema dimension'ının mongo_expr değeri → string (yoksa null)."""
+    return {
+        "$convert": {
+            "input": MAN_SCHEMA["dimensions"][dim]["mongo_expr"],
+            "to": "string",
+            "onError": None,
+            "onNull": None,
+        }
+    }
+
+
+def _norm_expr(value: Any) -> Dict[str, Any]:
+    """
+    normalize_tr karşılığı: Türkçe harf katlama → küçük harf → [a-z0-9 ] dışı
+    karakterler boşluk → boşluklar sıkıştırılıp kırpılır (string değilse null).
+
+    Sıra normalize_tr ile aynıdır; katlama $toLower'dan önce yapılır ("İ" dahil).
+    $toLower yalnızca ASCII'yi küçültür, kalan ASCII dışı harfler zaten boşluğa
+    dönüştüğü için sonuç değişmez.
+    """
+    folded: Any = "$$v"
+    for src, dst in REPLACEMENTS.items():
+        folded = {"$replaceAll": {"input": folded, "find": src, "replacement": dst}}
+
+    # Karakter karakter: izin verilmeyenler boşluğa
+    spaced = {
+        "$reduce": {
+            "input": {"$range": [0, {"$strLenCP": "$$s"}]},
+            "initialValue": "",
+            "in": {
+                "$concat": [
+                    "$$value",
+                    {
+                        "$let": {
+                            "vars": {"c": {"$substrCP": ["$$s", "$$this", 1]}},
+                            "in": {
+                                "$cond": [
+                                    {"$regexMatch": {"input": "$$c", "regex": "^[a-z0-9 ]$"}},
+                                    "$$c",
+                                    " ",
+                                ]
+                            },
+                        }
+                    },
+                ]
+            },
+        }
+    }
+
+    # Boş parçalar atılıp tek boşlukla birleştirilir (\s+ → " " + strip)
+    collapsed = {
+        "$reduce": {
+            "input": {"$filter": {"input": {"$split": ["$$t", " "]}, "cond": {"$ne": ["$$this", ""]}}},
+            "initialValue": "",
+            "in": {
+                "$cond": [
+                    {"$eq": ["$$value", ""]},
+                    "$$this",
+                    {"$concat": ["$$value", " ", "$$this"]},
+                ]
+            },
+        }
+    }
+
+    return {
+        "$let": {
+            "vars": {"v": value},
+            "in": {
+                "$cond": [
+                    {"$eq": [{"$type": "$$v"}, "string"]},
+                    {
+                        "$let": {
+                            "vars": {"s": {"$toLower": folded}},
+                            "in": {"$let": {"vars": {"t": spaced}, "in": collapsed}},
+                        }
+                    },
+                    None,
+                ]
+            },
+        }
+    }
+
+
+def _norm_str_expr(dim: str) -> Dict[str, Any]:
+    """Schema dimension'ının normalize_tr karşılığı (kaynak yoksa null)."""
+    return _norm_expr(_str_expr(dim))
+
+
+# hasFault filtresinin "arıza yok" saydığı değerler
+_EMPTY_FAULT_CODES = ["", "0", "None", "none", "NULL", "null"]
+
+# faultCode → string; boş / "arıza yok" değerleri null yazılır. Böylece
+# partial index yalnızca gerçek arıza kaydı içeren dokümanları tutar.
+_FAULT_STR_EXPR = {
+    "$let": {
+        "vars": {"fc": _str_expr("faultCode")},
+        "in": {
+            "$cond": [
+                {"$in": [{"$ifNull": ["$$fc", ""]}, _EMPTY_FAULT_CODES]},
+                None,
+                "$$fc",
+            ]
+        },
+    }
+}
+
+
+# verb.id (root, yoksa statement.verb.id) → "/verbs/" sonrası son parça
+# (".../verbs/maintained" → "maintained"); eşleşmezse null.
+_VERB_KIND_EXPR = {
+    "$let": {
+        "vars": {
+            "m": {
+                "$regexFind": {
+                    "input": {
+                        "$convert": {
+                            "input": {"$ifNull": ["$verb.id", "$statement.verb.id"]},
+                            "to": "string",
+                            "onError": None,
+                            "onNull": None,
+                        }
+                    },
+                    "regex": "/verbs/([^/]+)$",
+                }
+            }
+        },
+        "in": {"$arrayElemAt": ["$$m.captures", 0]},
+    }
+}
+
+
+# Araç kimliği kaynakları: actor adı ("vehicle/70886" veya "70886") ve
+# context extension'ları (root + statement.context)
+_VEHICLE_ID_EXT_KEYS = (
+    "https://promptever.com/extensions/vehicleId",
+    "https://promptever.com/extensions/vehicleNo",
+)
+_VEHICLE_ID_SOURCES: List[Any] = ["$actor.account.name", "$statement.actor.account.name"] + [
+    {"$getField": {"field": key, "input": src}}
+    for key in _VEHICLE_ID_EXT_KEYS
+    for src in ("$context.extensions", "$statement.context.extensions")
+]
+
+# Her kaynak → string → "/" sonrası son segment → kırpılmış, küçük harf;
+# boşlar atılır, tekrarlar birleşir (eşitlik sorgusu multikey index'ten)
+_VEHICLE_IDS_EXPR = {
+    "$setUnion": [
+        {
+            "$filter": {
+                "input": {
+                    "$map": {
+                        "input": _VEHICLE_ID_SOURCES,
+                        "as": "v",
+                        "in": {
+                            "$let": {
+                                "vars": {
+                                    "s": {
+                                        "$convert": {
+                                            "input": "$$v",
+                                            "to": "string",
+                                            "onError": None,
+                                            "onNull": None,
+                                        }
+                                    }
+                                },
+                                "in": {
+                                    "$cond": [
+                                        {"$eq": [{"$type": "$$s"}, "string"]},
+                                        {
+                                            "$toLower": {
+                                                "$trim": {
+                                                    "input": {
+                                                        "$arrayElemAt": [{"$split": ["$$s", "/"]}, -1]
+                                                    }
+                                                }
+                                            }
+                                        },
+                                        "",
+                                    ]
+                                },
+                            }
+                        },
+                    }
+                },
+                "cond": {"$ne": ["$$this", ""]},
+            }
+        }
+    ]
+}
+
+
+# alan adı → değeri hesaplayan expression
+_MATERIALIZED_FIELDS: Dict[str, Any] = {
+    OPDATE_FIELD: _opdate_date_expr(),
+    FAULT_FIELD: _FAULT_STR_EXPR,
+    VEHICLE_TYPE_FIELD: _str_expr("vehicleType"),
+    VEHICLE_MODEL_FIELD: _str_expr("vehicleModel"),
+    VERB_KIND_FIELD: _VERB_KIND_EXPR,
+    MATERIAL_NAME_NORM_FIELD: _norm_str_expr("materialName"),
+    VEHICLE_MODEL_NORM_FIELD: _norm_str_expr("vehicleModel"),
+    VEHICLE_IDS_FIELD: _VEHICLE_IDS_EXPR,
+}
+
+# Kaynak değer yoksa alan null yazılır; böylece kayıt bir daha backfill'e
+# girmez ve filtrelerde elenir.
+_SET_FIELDS_PIPELINE = [{"$set": _MATERIALIZED_FIELDS}]
+
+# Maintainer yalnızca açık olan işleri yapar
+_MAINTAIN_FIELDS = (
+    LRS_OPDATE_FIELD_ENABLED
+    or LRS_FAULT_FIELD_ENABLED
+    or LRS_VEHICLE_FIELDS_ENABLED
+    or LRS_VERB_KIND_FIELD_ENABLED
+    or LRS_NORM_FIELDS_ENABLED
+    or LRS_VEHICLE_ID_FIELD_ENABLED
+)
+_MAINTAIN_HLL = LRS_VEHICLE_HLL_ENABLED
+
+_maintainer_thread: Optional[threading.Thread] = None
+_maintainer_stop = threading.Event()
+
+# Change stream resume token'ı (statements ile aynı db'deki lrs_stats'ta)
+_STATE_COLLECTION = "lrs_stats"
+_RESUME_TOKEN_ID = "materialize_resume_token"
+# Token her değişiklikte değil, bu kadar değişiklikte / boşta kalınca yazılır;
+# tekrar işlenen insert'ler zararsız ($set pipeline ve HLL $max idempotent)
+_TOKEN_SAVE_EVERY = 100
+
+# Geçici hatalarda yeniden deneme beklemesi (sn, üstel, tavanlı)
+_RETRY_MIN_DELAY = 1.0
+_RETRY_MAX_DELAY = 60.0
+
+# Change stream hata kodları
+_CHANGE_STREAM_NOT_SUPPORTED = 40573  # standalone mongod (replica set değil)
+_CHANGE_STREAM_HISTORY_LOST = 286     # token oplog penceresinin dışında kaldı
+
+
+def backfill_materialized_fields(collection=None) -> int:
+    """Materialize alanlarından biri eksik olan tüm statement'ları günceller."""
+    coll = collection if collection is not None else lrs_statements
+    missing = {"$or": [{name: {"$exists": False}} for name in _MATERIALIZED_FIELDS]}
+    result = coll.update_many(missing, _SET_FIELDS_PIPELINE)
+    return result.modified_count
+
+
+def ensure_materialized_indexes(collection=None) -> List[str]:
+    """Index'leri oluşturur (varsa no-op)."""
+    coll = collection if collection is not None else lrs_statements
+    return [
+        coll.create_index([(OPDATE_FIELD, ASCENDING)], name=f"{OPDATE_FIELD}_1"),
+        # Yalnızca arıza kodu olan kayıtlar: hasFault taraması küçük index'ten;
+        # prefix'i tek başına hasFault sorgusuna da hizmet eder
+        coll.create_index(
+            [(FAULT_FIELD, ASCENDING), (OPDATE_FIELD, ASCENDING)],
+            name=f"{FAULT_FIELD}_1_{OPDATE_FIELD}_1_partial",
+            partialFilterExpression={FAULT_FIELD: {"$type": "string"}},
+        ),
+        coll.create_index(
+            [(VEHICLE_TYPE_FIELD, ASCENDING), (OPDATE_FIELD, ASCENDING)],
+            name=f"{VEHICLE_TYPE_FIELD}_1_{OPDATE_FIELD}_1",
+        ),
+        coll.create_index(
+            [(VEHICLE_MODEL_FIELD, ASCENDING), (OPDATE_FIELD, ASCENDING)],
+            name=f"{VEHICLE_MODEL_FIELD}_1_{OPDATE_FIELD}_1",
+        ),
+        # Bakım/onarım kayıtları: zaman sıralı tarama, dönem aralığı ve
+        # model eşitliği (verbKind $in → her değer için ayrı index aralığı)
+        coll.create_index(
+            [(VERB_KIND_FIELD, ASCENDING), ("timestamp", DESCENDING)],
+            name=f"{VERB_KIND_FIELD}_1_timestamp_-1",
+        ),
+        coll.create_index(
+            [(VERB_KIND_FIELD, ASCENDING), (OPDATE_FIELD, ASCENDING)],
+            name=f"{VERB_KIND_FIELD}_1_{OPDATE_FIELD}_1",
+        ),
+        coll.create_index(
+            [(VERB_KIND_FIELD, ASCENDING), (VEHICLE_MODEL_FIELD, ASCENDING)],
+            name=f"{VERB_KIND_FIELD}_1_{VEHICLE_MODEL_FIELD}_1",
+        ),
+        # Normalize ad / model filtreleri: unanchored regex index key'leri
+        # üzerinde değerlendirilir, yalnızca eşleşen dokümanlar okunur
+        coll.create_index(
+            [(VERB_KIND_FIELD, ASCENDING), (MATERIAL_NAME_NORM_FIELD, ASCENDING)],
+            name=f"{VERB_KIND_FIELD}_1_{MATERIAL_NAME_NORM_FIELD}_1",
+        ),
+        coll.create_index(
+            [(VERB_KIND_FIELD, ASCENDING), (VEHICLE_MODEL_NORM_FIELD, ASCENDING)],
+            name=f"{VERB_KIND_FIELD}_1_{VEHICLE_MODEL_NORM_FIELD}_1",
+        ),
+        # Araç bazlı sorgular verb filtresi kullanmaz: araç eşitliği + dönem aralığı
+        coll.create_index(
+            [(VEHICLE_IDS_FIELD, ASCENDING), (OPDATE_FIELD, ASCENDING)],
+            name=f"{VEHICLE_IDS_FIELD}_1_{OPDATE_FIELD}_1",
+        ),
+    ]
+
+
+def _load_resume_token(collection) -> Optional[Dict[str, Any]]:
+    doc = collection.database[_STATE_COLLECTION].find_one({"_id": _RESUME_TOKEN_ID})
+    return doc.get("token") if doc else None
+
+
+def _save_resume_token(collection, token: Optional[Dict[str, Any]]) -> None:
+    state = collection.database[_STATE_COLLECTION]
+    if token is None:
+        state.delete_one({"_id": _RESUME_TOKEN_ID})
+    else:
+        state.update_one({"_id": _RESUME_TOKEN_ID}, {"$set": {"token": token}}, upsert=True)
+
+
+def _backfill(collection) -> None:
+    """Eksik alanlı kayıtları tamamlar (stream kesintisinde kaçan insert'ler)."""
+    if not _MAINTAIN_FIELDS:
+        return
+    try:
+        n = backfill_materialized_fields(collection)
+    except PyMongoError as e:
+        logger.warning(f"Materialize backfill başarısız: {e}")
+        return
+    if n:
+        logger.info(f"Materialize backfill: {n} kayıt güncellendi")
+
+
+def _watch_inserts(collection, token: Optional[Dict[str, Any]]) -> None:
+    """
+    Change stream'i token'dan (yoksa şimdiden) açar ve stop gelene kadar
+    insert'leri işler. Periyodik backfill de bu döngüden tetiklenir.
+    """
+    from services.lrs_vehicle_hll import add_statement
+
+    pipeline = [{"$match": {"operationType": "insert"}}]
+    with collection.watch(pipeline, max_await_time_ms=1000, start_after=token) as stream:
+        # Stream açıldıktan sonra: açılıştan önceki boşluk backfill'le kapanır
+        _backfill(collection)
+        next_backfill = time.monotonic() + LRS_MATERIALIZE_BACKFILL_INTERVAL
+        unsaved = 0
+        try:
+            while not _maintainer_stop.is_set():
+                change = stream.try_next()
+                if change is None:
+                    if unsaved:
+                        _save_resume_token(collection, stream.resume_token)
+                        unsaved = 0
+                    if LRS_MATERIALIZE_BACKFILL_INTERVAL > 0 and time.monotonic() >= next_backfill:
+                        _backfill(collection)
+                        next_backfill = time.monotonic() + LRS_MATERIALIZE_BACKFILL_INTERVAL
+                    continue
+                if _MAINTAIN_FIELDS:
+                    collection.update_one(
+                        {"_id": change["documentKey"]["_id"]},
+                        _SET_FIELDS_PIPELINE,
+                    )
+                if _MAINTAIN_HLL:
+                    add_statement(change.get("fullDocument") or {})
+                unsaved += 1
+                if unsaved >= _TOKEN_SAVE_EVERY:
+                    _save_resume_token(collection, stream.resume_token)
+                    unsaved = 0
+        finally:
+            if unsaved:
+                _save_resume_token(collection, stream.resume_token)
+
+
+def _backfill_only_loop(collection) -> None:
+    """Change stream yoksa (standalone mongod): yalnızca periyodik backfill."""
+    interval = LRS_MATERIALIZE_BACKFILL_INTERVAL
+    _backfill(collection)
+    while interval > 0 and not _maintainer_stop.wait(interval):
+        _backfill(collection)
+
+
+def _maintain_loop(collection) -> None:
+    """
+    Yeni insert edilen statement'lara materialize alanları yazar, HLL'i günceller.
+
+    Geçici hatalarda (ağ, primary değişimi) bekleyip kayıtlı token'dan devam
+    eder; token oplog dışında kaldıysa baştan açar, kaçanlar backfill'le
+    (HLL rebuild ile) tamamlanır.
+    """
+    from services.lrs_vehicle_hll import rebuild_vehicle_hll
+
+    delay = _RETRY_MIN_DELAY
+    while not _maintainer_stop.is_set():
+        try:
+            _watch_inserts(collection, _load_resume_token(collection))
+            delay = _RETRY_MIN_DELAY
+        except OperationFailure as e:
+            if e.code == _CHANGE_STREAM_NOT_SUPPORTED:
+                logger.warning(
+                    "Change stream desteklenmiyor (replica set gerekli); "
+                    f"yalnızca periyodik backfill çalışacak: {e}"
+                )
+                _backfill_only_loop(collection)
+                return
+            if e.code == _CHANGE_STREAM_HISTORY_LOST:
+                logger.warning(f"Resume token geçersiz, stream baştan açılıyor: {e}")
+                try:
+                    _save_resume_token(collection, None)
+                    if _MAINTAIN_HLL:
+                        rebuild_vehicle_hll(collection)
+                    continue
+                except PyMongoError as e2:
+                    logger.warning(f"Materialize maintainer sıfırlanamadı: {e2}")
+            logger.warning(f"Materialize maintainer hatası, {delay:.0f} sn sonra tekrar: {e}")
+        except PyMongoError as e:
+            logger.warning(f"Materialize maintainer hatası, {delay:.0f} sn sonra tekrar: {e}")
+        except Exception:
+            logger.exception("Materialize maintainer durdu")
+            return
+        if _maintainer_stop.wait(delay):
+            return
+        delay = min(delay * 2, _RETRY_MAX_DELAY)
+
+
+def start_materialize_maintainer(collection=None) -> None:
+    """App startup'ta çağrılır; change stream'i arka plan thread'inde dinler."""
+    global _maintainer_thread
+    if _maintainer_thread is not None or not (_MAINTAIN_FIELDS or _MAINTAIN_HLL):
+        return
+    coll = collection if collection is not None else lrs_statements
+    _maintainer_stop.clear()
+    _maintainer_thread = threading.Thread(
+        target=_maintain_loop, args=(coll,), name="lrs-materialize-maintainer", daemon=True
+    )
+    _maintainer_thread.start()
+
+
+def stop_materialize_maintainer() -> None:
+    """App shutdown'da change stream döngüsünü durdurur."""
+    global _maintainer_thread
+    if _maintainer_thread is None:
+        return
+    _maintainer_stop.set()
+    _maintainer_thread.join(timeout=5)
+    _maintainer_thread = None
+
+
+if __name__ == "__main__":
+    print(f"[lrs_materialized] index: {ensure_materialized_indexes()}")
+    print(f"[lrs_materialized] backfill: {backfill_materialized_fields()} kayıt güncellendi")
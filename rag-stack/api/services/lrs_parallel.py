@@ -0,0 +1,137 @@
+"""
+services/lrs_parallel.py
+========================
+
+top_entities_overall'ın Python sayımını _id hash shard'larına bölüp ayrı
+process'lerde çalıştıran havuz (bkz. config.LRS_PARALLEL_SHARDS).
+
+- Havuz uzun ömürlüdür: ilk sharded sorguda kurulur, sonraki sorgular aynı
+  worker'ları kullanır; app shutdown'da shutdown_shard_pool() ile kapanır.
+- Worker'lar spawn ile başlar (MongoClient fork-safe değil) ve yalnızca bu
+  modülü import eder. Modül config'i / lrs_service'i import etmez; böylece
+  worker'lar embedding modelini ve Qdrant istemcisini yüklemez. Initializer
+  sadece bir MongoClient ve statements koleksiyonunu açar.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional, Tuple
+
+from pymongo import MongoClient
+
+from services.lrs_entities import _iter_entity_ids
+
+# (mongo_uri, db adı, koleksiyon adı)
+Connection = Tuple[str, str, str]
+
+# Worker process'in koleksiyonu (_init_worker açar)
+_worker_statements = None
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_key: Optional[Tuple[int, Connection]] = None
+_pool_lock = threading.Lock()
+
+
+def _init_worker(mongo_uri: str, db_name: str, collection_name: str) -> None:
+    """Worker başlangıcı: process ömrü boyunca kullanılacak Mongo bağlantısı."""
+    global _worker_statements
+    _worker_statements = MongoClient(mongo_uri)[db_name][collection_name]
+
+
+def _shard_filter(shard_i: int, n_shards: int) -> Dict[str, Any]:
+    """
+    _id hash'ine göre çakışmasız shard: hash mod N == i. Negatif hash'lerde
+    $mod negatif kalan verdiği için i - N de aynı shard'a sayılır.
+    """
+    return {
+        "$expr": {
+            "$in": [
+                {"$mod": [{"$toHashedIndexKey": "$_id"}, n_shards]},
+                [shard_i, shard_i - n_shards],
+            ]
+        }
+    }
+
+
+def _count_shard(
+    shard_i: int,
+    n_shards: int,
+    mongo_query: Dict[str, Any],
+    projection: Dict[str, Any],
+    batch_size: int,
+    entity_type: str,
+    service_filter: Optional[str],
+    model_filter_norm: Optional[str],
+) -> Counter:
+    """Worker'da tek shard'ın entity sayımı (dönem mongo_query'de çözülmüş olmalı)."""
+    query = {"$and": [mongo_query, _shard_filter(shard_i, n_shards)]}
+    cursor = _worker_statements.find(query, projection).batch_size(batch_size)
+    return Counter(_iter_entity_ids(cursor, entity_type, service_filter, model_filter_norm))
+
+
+def _get_pool(n_workers: int, connection: Connection) -> ProcessPoolExecutor:
+    """Paylaşılan havuz; worker sayısı / bağlantı değişmişse yeniden kurulur."""
+    global _pool, _pool_key
+    key = (n_workers, connection)
+    with _pool_lock:
+        if _pool is None or _pool_key != key:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = ProcessPoolExecutor(
+                max_workers=n_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=connection,
+            )
+            _pool_key = key
+        return _pool
+
+
+def count_top_entities_sharded(
+    n_shards: int,
+    connection: Connection,
+    mongo_query: Dict[str, Any],
+    projection: Dict[str, Any],
+    batch_size: int,
+    entity_type: str,
+    service_filter: Optional[str] = None,
+    model_filter_norm: Optional[str] = None,
+) -> Counter:
+    """
+    n_shards shard'ı havuzdaki worker'larda sayar, kısmi Counter'ları birleştirir.
+
+    Bir worker ölürse havuz kullanılamaz hale gelir; kapatılır ve bir sonraki
+    çağrı yenisini kurar.
+    """
+    pool = _get_pool(n_shards, connection)
+    counter: Counter = Counter()
+    try:
+        futures = [
+            pool.submit(
+                _count_shard,
+                i, n_shards, mongo_query, projection, batch_size,
+                entity_type, service_filter, model_filter_norm,
+            )
+            for i in range(n_shards)
+        ]
+        for f in futures:
+            counter.update(f.result())
+    except BrokenProcessPool:
+        shutdown_shard_pool(wait=False)
+        raise
+    return counter
+
+
+def shutdown_shard_pool(wait: bool = True) -> None:
+    """Havuzu kapatır (app shutdown); kurulmamışsa no-op."""
+    global _pool, _pool_key
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=wait, cancel_futures=True)
+        _pool = None
+        _pool_key = None
@@ -9,10 +9,20 @@ için mixin.
 
 from __future__ import annotations
 
+import heapq
+import re
 from collections import Counter, defaultdict
 from datetime import datetime, timedelta
+from operator import itemgetter
 from typing import Any, Dict, List, Optional
 
+from bson.raw_bson import RawBSONDocument
+
+try:
+    from dateutil.relativedelta import relativedelta
+except ImportError:  # dateutil yoksa last_n_* eşikleri gün bazlı yaklaşık
+    relativedelta = None
+
 
 def _to_naive(dt: datetime) -> datetime:
     """
@@ -26,6 +36,14 @@ def _to_naive(dt: datetime) -> datetime:
     return dt.replace(tzinfo=None)
 
 
+from config import (
+    LRS_MONGO_URI,
+    LRS_NORM_FIELDS_ENABLED,
+    LRS_PARALLEL_MIN_DOCS,
+    LRS_PARALLEL_SHARDS,
+    LRS_VEHICLE_ID_FIELD_ENABLED,
+    LRS_VERB_KIND_FIELD_ENABLED,
+)
 from models import TopEntitiesQuestion
 
 from services.lrs_schema import (
@@ -33,20 +51,594 @@ from services.lrs_schema import (
     normalize_model,
     _get_context,
     _get_nested,
+    _walk_path,
     _extract_operation_date,
     _extract_service_code_from_context,  # ← BUNU EKLE
+    _opdate_raw_expr,
+)
+from services.lrs_entities import EXT_MODEL_NO, EXT_VEHICLE_TYPE, _iter_entity_ids
+from services.lrs_parallel import count_top_entities_sharded
+from services.lrs_materialized import (
+    MATERIAL_NAME_NORM_FIELD,
+    VEHICLE_IDS_FIELD,
+    VEHICLE_MODEL_NORM_FIELD,
+    VERB_KIND_FIELD,
+)
+
+
+# Malzeme adı yolları (sıcak döngülerde her seferinde split edilmesin)
+_PATH_MAT_NAME = ("object", "definition", "name", "tr-TR")
+_PATH_STMT_MAT_NAME = ("statement",) + _PATH_MAT_NAME
+
+
+def _get_mat_name(doc: Dict[str, Any]) -> Any:
+    """object.definition.name.tr-TR, boşsa statement.object altındaki ad."""
+    return _walk_path(doc, _PATH_MAT_NAME) or _walk_path(doc, _PATH_STMT_MAT_NAME)
+
+
+# ======================================================================
+# Dönem metinleri (answer_top_entities_question)
+# ======================================================================
+
+# last_n_* dönemi → (period alanı / relativedelta argümanı, birim, yaklaşık gün)
+_LAST_N_PERIODS = {
+    "last_n_months": ("months", "ay", 30),
+    "last_n_years": ("years", "yıl", 365),
+}
+
+_SEASON_PERIOD_TEXTS = {
+    "winter": "Kış mevsimi (Aralık-Ocak-Şubat)",
+    "spring": "İlkbahar mevsimi (Mart-Nisan-Mayıs)",
+    "summer": "Yaz mevsimi (Haziran-Temmuz-Ağustos)",
+    "autumn": "Sonbahar mevsimi (Eylül-Ekim-Kasım)",
+    "fall": "Sonbahar mevsimi (Eylül-Ekim-Kasım)",
+}
+
+
+# ======================================================================
+# Raw BSON (RawBSONDocument) okuyucuları
+# ======================================================================
+
+# Alt dokümanlar da RawBSONDocument gelir: Mapping ama dict değil, bu yüzden
+# isinstance(dict) kontrol eden _get_nested / _extract_operation_date
+# kullanılamaz. Alanlara yalnızca okunduklarında (lazy) erişilir.
+
+_EXT_OPERATION_DATE = "https://promptever.com/extensions/operationDate"
+_EXT_MATERIAL_COST = "https://promptever.com/extensions/materialCost"
+_EXT_MATERIAL_QTY = "https://promptever.com/extensions/materialQuantity"
+
+# _extract_operation_date öncelik sırası
+_RAW_OPDATE_PATHS = (
+    ("context", "extensions", _EXT_OPERATION_DATE),
+    ("context", "extensions", "operationDate"),
+    ("statement", "context", "extensions", _EXT_OPERATION_DATE),
+    ("statement", "context", "extensions", "operationDate"),
+    ("timestamp",),
+    ("statement", "timestamp"),
+    ("stored",),
+    ("statement", "stored"),
+)
+_PATH_OBJECT_ID = ("object", "id")
+_PATH_STMT_OBJECT_ID = ("statement",) + _PATH_OBJECT_ID
+_PATH_RESULT_EXTS = ("result", "extensions")
+_PATH_STMT_RESULT_EXTS = ("statement",) + _PATH_RESULT_EXTS
+_PATH_MATERIAL_COST = (_EXT_MATERIAL_COST,)
+_PATH_MATERIAL_QTY = (_EXT_MATERIAL_QTY,)
+
+
+def _raw_get(doc: Any, path: tuple) -> Any:
+    """Önceden bölünmüş yolu raw (veya dict) doküman üzerinde yürür; yoksa None."""
+    current = doc
+    for key in path:
+        try:
+            current = current[key]
+        except (KeyError, TypeError, IndexError):
+            return None
+    return current
+
+
+def _raw_operation_date(doc: Any) -> Optional[datetime]:
+    """_extract_operation_date'in raw doküman karşılığı (aynı öncelik ve parse)."""
+    raw = None
+    for path in _RAW_OPDATE_PATHS:
+        raw = _raw_get(doc, path)
+        if raw:
+            break
+    else:
+        return None
+
+    if isinstance(raw, datetime):
+        return raw
+
+    if isinstance(raw, str):
+        try:
+            return datetime.fromisoformat(raw.replace("Z", "+00:00"))
+        except Exception:
+            return None
+
+    return None
+
+
+# ======================================================================
+# Bakım / onarım verb filtresi
+# ======================================================================
+
+_MAINTENANCE_VERBS = ["maintained", "repaired"]
+
+
+def _maintenance_verb_filter() -> Dict[str, Any]:
+    """
+    Bakım/onarım statement'ları için verb filtresi.
+
+    LRS_VERB_KIND_FIELD açıkken materialize edilmiş verbKind alanında $in
+    (index'li); değilse verb.id / statement.verb.id üzerinde regex $or.
+    Çağıranlar sorguya alan eklediği için her seferinde yeni dict döner.
+    """
+    if LRS_VERB_KIND_FIELD_ENABLED:
+        return {VERB_KIND_FIELD: {"$in": list(_MAINTENANCE_VERBS)}}
+    return {
+        "$or": [
+            {"verb.id": {"$regex": "/verbs/(maintained|repaired)$"}},
+            {"statement.verb.id": {"$regex": "/verbs/(maintained|repaired)$"}},
+        ]
+    }
+
+
+# ======================================================================
+# Aggregation ifadeleri (malzeme kullanım pivotları)
+# ======================================================================
+
+# _extract_operation_date karşılığı: operationDate → timestamp → stored (Date, olmazsa null)
+_OPERATION_DATE_EXPR: Dict[str, Any] = {
+    "$convert": {
+        "input": {
+            "$ifNull": [
+                _opdate_raw_expr(),
+                "$timestamp",
+                "$statement.timestamp",
+                "$stored",
+                "$statement.stored",
+            ]
+        },
+        "to": "date",
+        "onError": None,
+        "onNull": None,
+    }
+}
+
+
+def _operation_date_window(threshold: datetime, anchor: datetime) -> Dict[str, Any]:
+    """
+    [threshold, anchor] penceresinin _OPERATION_DATE_EXPR üzerinden $expr ön
+    elemesi. Python tarafı tz bilgisini dönüştürmeden attığı (_to_naive) için
+    sınırlar bir gün genişletilir; sunucuda tarihe çevrilemeyen kayıtlar
+    elenmez. Kesin kontrol döngüde kalır.
+    """
+    slack = timedelta(days=1)
+    return {
+        "$expr": {
+            "$let": {
+                "vars": {"op": _OPERATION_DATE_EXPR},
+                "in": {
+                    "$or": [
+                        {"$eq": ["$$op", None]},
+                        {
+                            "$and": [
+                                {"$gte": ["$$op", threshold - slack]},
+                                {"$lte": ["$$op", anchor + slack]},
+                            ]
+                        },
+                    ]
+                },
+            }
+        }
+    }
+
+
+def _material_price_query(
+    threshold: Optional[datetime] = None,
+    anchor: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """
+    Fiyat trendlerinin find() filtresi: result extension'ı olan malzeme
+    activity'leri; threshold / anchor verilirse tarih penceresi ön elemesi.
+    Kesin kontroller (tarih, malzeme kodu, fiyat) döngüde kalır.
+    """
+    clauses: List[Dict[str, Any]] = [
+        {
+            "$or": [
+                {"result.extensions": {"$exists": True}},
+                {"statement.result.extensions": {"$exists": True}},
+            ]
+        },
+        {
+            "$or": [
+                {"object.id": {"$regex": "/activities/material/"}},
+                {"statement.object.id": {"$regex": "/activities/material/"}},
+            ]
+        },
+    ]
+    if threshold is not None and anchor is not None:
+        clauses.append(_operation_date_window(threshold, anchor))
+    return {"$and": clauses}
+
+
+# Fiyat trendleri: malzeme activity id'si (root, boşsa statement.object)
+_PRICE_OBJECT_ID_EXPR: Dict[str, Any] = {
+    "$let": {
+        "vars": {"r": "$object.id"},
+        "in": {
+            "$cond": [
+                {"$and": [{"$eq": [{"$type": "$$r"}, "string"]}, {"$ne": ["$$r", ""]}]},
+                "$$r",
+                "$statement.object.id",
+            ]
+        },
+    }
+}
+
+# result.extensions (boşsa statement.result.extensions); obje değilse null
+_PRICE_RESULT_EXTS_EXPR: Dict[str, Any] = {
+    "$let": {
+        "vars": {"r": "$result.extensions", "s": "$statement.result.extensions"},
+        "in": {
+            "$switch": {
+                "branches": [
+                    {
+                        "case": {"$and": [{"$eq": [{"$type": "$$r"}, "object"]}, {"$ne": ["$$r", {}]}]},
+                        "then": "$$r",
+                    },
+                    {"case": {"$eq": [{"$type": "$$s"}, "object"]}, "then": "$$s"},
+                ],
+                "default": None,
+            }
+        },
+    }
+}
+
+
+def _result_ext_double(ext_key: str) -> Dict[str, Any]:
+    """_res içindeki extension → double (yoksa / çevrilemezse null; float() karşılığı)."""
+    return {
+        "$convert": {
+            "input": {"$getField": {"field": ext_key, "input": "$_res"}},
+            "to": "double",
+            "onError": None,
+            "onNull": None,
+        }
+    }
+
+
+_MATERIAL_COST_EXPR = _result_ext_double("https://promptever.com/extensions/materialCost")
+_MATERIAL_QTY_EXPR = _result_ext_double("https://promptever.com/extensions/materialQuantity")
+
+# Miktar pozitifse birim fiyat
+_UNIT_PRICE_EXPR: Dict[str, Any] = {
+    "$let": {
+        "vars": {"c": _MATERIAL_COST_EXPR, "q": _MATERIAL_QTY_EXPR},
+        "in": {"$cond": [{"$gt": ["$$q", 0]}, {"$divide": ["$$c", "$$q"]}, "$$c"]},
+    }
+}
+
+# _op'a göre sıralanmış akışta grubun ilk / son gözlemi ve gözlem sayısı
+_FIRST_LAST_PRICE_ACCUMULATORS: Dict[str, Any] = {
+    "first": {"$first": {"d": "$_op", "p": "$_price"}},
+    "last": {"$last": {"d": "$_op", "p": "$_price"}},
+    "n": {"$sum": 1},
+}
+
+_CHANGE_PCT_EXPR: Dict[str, Any] = {
+    "$multiply": [
+        {"$divide": [{"$subtract": ["$last.p", "$first.p"]}, "$first.p"]},
+        100.0,
+    ]
+}
+
+
+def _price_increase_stages(limit: int) -> List[Dict[str, Any]]:
+    """
+    İlk / son gözlemi olan gruplardan fiyatı artanlar (en az iki gözlem,
+    pozitif ilk fiyat), değişim yüzdesine göre azalan, limit kadar.
+    """
+    stages: List[Dict[str, Any]] = [
+        {
+            "$match": {
+                "n": {"$gte": 2},
+                "first.p": {"$gt": 0},
+                "$expr": {"$gt": ["$last.p", "$first.p"]},
+            }
+        },
+        {"$addFields": {"changePct": _CHANGE_PCT_EXPR}},
+        {"$sort": {"changePct": -1, "_id": 1}},
+    ]
+    if limit:
+        stages.append({"$limit": limit})
+    return stages
+
+
+def _price_change_fields(r: Dict[str, Any]) -> Dict[str, Any]:
+    """_price_increase_stages satırının ilk / son fiyat ve değişim alanları."""
+    first, last = r["first"], r["last"]
+    return {
+        "firstDate": first["d"].date().isoformat(),
+        "lastDate": last["d"].date().isoformat(),
+        "firstPrice": round(first["p"], 2),
+        "lastPrice": round(last["p"], 2),
+        "changeAbs": round(last["p"] - first["p"], 2),
+        "changePct": round(r["changePct"], 1),
+        "observations": r["n"],
+    }
+
+
+# Malzeme adı (tr-TR): root object, boşsa statement.object; kırpılmış
+_MATERIAL_NAME_EXPR: Dict[str, Any] = {
+    "$let": {
+        "vars": {
+            "r": "$object.definition.name.tr-TR",
+            "s": "$statement.object.definition.name.tr-TR",
+        },
+        "in": {
+            "$let": {
+                "vars": {
+                    "n": {
+                        "$cond": [
+                            {"$and": [{"$eq": [{"$type": "$$r"}, "string"]}, {"$ne": ["$$r", ""]}]},
+                            "$$r",
+                            "$$s",
+                        ]
+                    }
+                },
+                "in": {"$cond": [{"$eq": [{"$type": "$$n"}, "string"]}, {"$trim": {"input": "$$n"}}, None]},
+            }
+        },
+    }
+}
+
+# Mevsim (kis / ilkbahar / yaz / sonbahar) ve pivot yılı (Aralık → bir sonraki yılın kışı)
+_SEASON_ORDER = ("kis", "ilkbahar", "yaz", "sonbahar")
+
+# Ay (1–12) → mevsim / pivot yılı farkı; index 0 kullanılmaz
+_SEASON = (
+    None,
+    "kis", "kis",
+    "ilkbahar", "ilkbahar", "ilkbahar",
+    "yaz", "yaz", "yaz",
+    "sonbahar", "sonbahar", "sonbahar",
+    "kis",
+)
+_WINTER_YEAR_BUMP = (0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1)
+
+# Aynı tablolar sunucuda $arrayElemAt ile (dal yok)
+_SEASON_EXPR: Dict[str, Any] = {"$arrayElemAt": [list(_SEASON), "$_m"]}
+_SEASON_YEAR_EXPR: Dict[str, Any] = {
+    "$add": ["$_y", {"$arrayElemAt": [list(_WINTER_YEAR_BUMP), "$_m"]}]
+}
+
+
+# ======================================================================
+# Aggregation ifadeleri (top entities)
+# ======================================================================
+
+_VEHICLE_EXT_KEYS = (
+    "https://promptever.com/extensions/vehicleId",
+    "https://promptever.com/extensions/vehicleNo",
+    "https://promptever.com/extensions/plate",
+    "https://promptever.com/extensions/licensePlate",
 )
 
+
+def _ctx_path(path: str) -> Dict[str, Any]:
+    """_get_context karşılığı: context obje ise oradan, değilse statement.context'ten."""
+    return {
+        "$cond": [
+            {"$eq": [{"$type": "$context"}, "object"]},
+            "$context." + path,
+            "$statement.context." + path,
+        ]
+    }
+
+
+def _ctx_ext(ext_key: str) -> Dict[str, Any]:
+    """Context extension'ı (IRI key'lerinde nokta var → $getField)."""
+    return {"$getField": {"field": ext_key, "input": _ctx_path("extensions")}}
+
+
+def _trimmed_str(expr: Any) -> Dict[str, Any]:
+    """String ise kırpılmış hali, değilse boş string."""
+    return {
+        "$let": {
+            "vars": {"v": expr},
+            "in": {"$cond": [{"$eq": [{"$type": "$$v"}, "string"]}, {"$trim": {"input": "$$v"}}, ""]},
+        }
+    }
+
+
+def _non_empty_ids(ids_expr: Any) -> Dict[str, Any]:
+    """ID dizisinden boş / string olmayan değerleri atar."""
+    return {
+        "$filter": {
+            "input": ids_expr,
+            "cond": {"$and": [{"$eq": [{"$type": "$$this"}, "string"]}, {"$ne": ["$$this", ""]}]},
+        }
+    }
+
+
+# _extract_vehicle_id_from_actor: actor adı (root, yoksa statement) → plaka/araç
+# extension'ları → "vehicle/" öneki atılır
+_VEHICLE_IDS_EXPR: Dict[str, Any] = _non_empty_ids([
+    {
+        "$let": {
+            "vars": {
+                "n": {
+                    "$cond": [
+                        {"$eq": [{"$type": "$actor.account.name"}, "string"]},
+                        "$actor.account.name",
+                        {
+                            "$cond": [
+                                {"$eq": [{"$type": "$statement.actor.account.name"}, "string"]},
+                                "$statement.actor.account.name",
+                                {
+                                    "$arrayElemAt": [
+                                        _non_empty_ids([_trimmed_str(_ctx_ext(k)) for k in _VEHICLE_EXT_KEYS]),
+                                        0,
+                                    ]
+                                },
+                            ]
+                        },
+                    ]
+                }
+            },
+            "in": {
+                "$cond": [
+                    {"$eq": [{"$substrCP": [{"$ifNull": ["$$n", ""]}, 0, 8]}, "vehicle/"]},
+                    {"$substrCP": ["$$n", 8, {"$strLenCP": "$$n"}]},
+                    "$$n",
+                ]
+            },
+        }
+    }
+])
+
+# _extract_customer_ids: grouping içindeki .../activities/customer/XYZ → XYZ (birden çok olabilir)
+_CUSTOMER_IDS_EXPR: Dict[str, Any] = _non_empty_ids({
+    "$map": {
+        "input": {
+            "$filter": {
+                "input": {
+                    "$let": {
+                        "vars": {"g": _ctx_path("contextActivities.grouping")},
+                        "in": {
+                            "$switch": {
+                                "branches": [
+                                    {"case": {"$isArray": "$$g"}, "then": "$$g"},
+                                    {"case": {"$eq": [{"$type": "$$g"}, "object"]}, "then": ["$$g"]},
+                                ],
+                                "default": [],
+                            }
+                        },
+                    }
+                },
+                "cond": {
+                    "$and": [
+                        {"$eq": [{"$type": "$$this.id"}, "string"]},
+                        {"$regexMatch": {"input": "$$this.id", "regex": "/activities/customer/"}},
+                    ]
+                },
+            }
+        },
+        "in": {"$arrayElemAt": [{"$split": ["$$this.id", "/"]}, -1]},
+    }
+})
+
+# _extract_vehicle_type_ids: MAN IRI'si, yoksa key'inde "vehicletype" geçen ilk extension
+_VEHICLE_TYPE_IDS_EXPR: Dict[str, Any] = _non_empty_ids([
+    {
+        "$let": {
+            "vars": {
+                "vt": {
+                    "$let": {
+                        "vars": {"e": _ctx_path("extensions")},
+                        "in": {
+                            "$cond": [
+                                {"$eq": [{"$type": "$$e"}, "object"]},
+                                {
+                                    "$ifNull": [
+                                        {"$getField": {"field": EXT_VEHICLE_TYPE, "input": "$$e"}},
+                                        {
+                                            "$arrayElemAt": [
+                                                {
+                                                    "$map": {
+                                                        "input": {
+                                                            "$filter": {
+                                                                "input": {"$objectToArray": "$$e"},
+                                                                "cond": {
+                                                                    "$regexMatch": {
+                                                                        "input": "$$this.k",
+                                                                        "regex": "vehicletype",
+                                                                        "options": "i",
+                                                                    }
+                                                                },
+                                                            }
+                                                        },
+                                                        "in": "$$this.v",
+                                                    }
+                                                },
+                                                0,
+                                            ]
+                                        },
+                                    ]
+                                },
+                                None,
+                            ]
+                        },
+                    }
+                }
+            },
+            "in": {
+                "$cond": [
+                    {"$in": [{"$ifNull": ["$$vt", None]}, [None, "", 0, "0"]]},
+                    None,
+                    {"$convert": {"input": "$$vt", "to": "string", "onError": None, "onNull": None}},
+                ]
+            },
+        }
+    }
+])
+
+# _extract_material_ids: tr-TR adı (root, boşsa statement.object), kırpılmış
+_MATERIAL_IDS_EXPR: Dict[str, Any] = _non_empty_ids([
+    {
+        "$let": {
+            "vars": {"r": _trimmed_str("$object.definition.name.tr-TR")},
+            "in": {
+                "$cond": [
+                    {"$ne": ["$$r", ""]},
+                    "$$r",
+                    _trimmed_str("$statement.object.definition.name.tr-TR"),
+                ]
+            },
+        }
+    }
+])
+
+# _extract_vehicle_model_ids: modelNo (string / sayı) → kırpılmış string
+_VEHICLE_MODEL_IDS_EXPR: Dict[str, Any] = _non_empty_ids([
+    {
+        "$let": {
+            "vars": {"m": _ctx_ext(EXT_MODEL_NO)},
+            "in": {
+                "$cond": [
+                    {"$in": [{"$type": "$$m"}, ["string", "int", "long", "double", "decimal"]]},
+                    {"$trim": {"input": {"$toString": "$$m"}}},
+                    None,
+                ]
+            },
+        }
+    }
+])
+
+# entity_type → dokümanın entity ID dizisi (_extract_entity_ids karşılığı)
+_ENTITY_IDS_EXPRS: Dict[str, Dict[str, Any]] = {
+    "vehicle": _VEHICLE_IDS_EXPR,
+    "customer": _CUSTOMER_IDS_EXPR,
+    "vehicleType": _VEHICLE_TYPE_IDS_EXPR,
+    "material": _MATERIAL_IDS_EXPR,
+    "vehicleModel": _VEHICLE_MODEL_IDS_EXPR,
+}
+
 class LRSPatternsMixin:
     """
     LRSCore + LRSExamplesMixin ile birlikte kullanıldığında:
 
     - self.statements                : Mongo koleksiyonu (LRSCore'dan)
     - self._doc_matches_period(...)  : dönem filtresi (LRSExamplesMixin'den)
+    - self._build_period_mongo_filter(...)  : dönem filtresinin Mongo karşılığı (LRSExamplesMixin'den)
+    - self._build_period_index_filter(...)  : dönemin index'li operationDateISO ön elemesi (LRSExamplesMixin'den)
     - self._doc_matches_service_filter(...) : servis filtresi (LRSExamplesMixin'den)
-    - self._compute_latest_business_date()  : anchor tarih (LRSExamplesMixin'den)
+    - self._get_latest_business_date()      : anchor tarih (LRSExamplesMixin'den)
 
     Bu mixin:
+    - material_usage_pivot / material_usage_top_per_* / material_usage_overview
     - top_entities_overall
     - answer_top_entities_question
     - material_price_trend
@@ -55,6 +647,77 @@ class LRSPatternsMixin:
     gibi domain fonksiyonlarını sağlar.
     """
 
+    # Dönem / servis / model filtreleri ve _extract_entity_ids'in okuduğu yapraklar
+    # (_get_context: context alt alanlarından biri varsa context dict olarak gelir)
+    _ENTITY_SCAN_PROJECTION: Dict[str, int] = {
+        "_id": 0,
+        "actor.account.name": 1,
+        "statement.actor.account.name": 1,
+        "context.extensions": 1,
+        "context.contextActivities.grouping": 1,
+        "statement.context.extensions": 1,
+        "statement.context.contextActivities.grouping": 1,
+        "object.definition.name.tr-TR": 1,
+        "statement.object.definition.name.tr-TR": 1,
+    }
+
+    # Mevsimsel aile fiyat trendi taraması: _raw_operation_date + malzeme
+    # kodu + result extension'ları (materialCost / materialQuantity). Extension
+    # key'leri nokta içerdiği için tek tek projekte edilemez; extensions objesi bütün gelir
+    _PRICE_TREND_PROJECTION: Dict[str, int] = {
+        "_id": 0,
+        "context.extensions": 1,
+        "statement.context.extensions": 1,
+        "timestamp": 1,
+        "statement.timestamp": 1,
+        "stored": 1,
+        "statement.stored": 1,
+        "object.id": 1,
+        "statement.object.id": 1,
+        "result.extensions": 1,
+        "statement.result.extensions": 1,
+    }
+
+    # Uzun taramalarda cursor batch'i: 16 MiB'lık varsayılan batch'ler yerine
+    # sabit boyutlu akış; sonuç satırı sınırlı aggregate'lerde tek round-trip
+    _SCAN_BATCH_SIZE = 1000
+
+    # Python tarafı sayımda process sayısı ve devreye girdiği koleksiyon boyutu
+    _PARALLEL_SHARDS = LRS_PARALLEL_SHARDS
+    _PARALLEL_MIN_DOCS = LRS_PARALLEL_MIN_DOCS
+
+    def _result_batch_size(self, limit: Optional[int]) -> int:
+        """limit satırlık sonuç tek batch'te gelsin (en fazla _SCAN_BATCH_SIZE)."""
+        if not limit:
+            return self._SCAN_BATCH_SIZE
+        return max(1, min(limit, self._SCAN_BATCH_SIZE))
+
+    def _material_usage_stages(
+        self,
+        mongo_query: Dict[str, Any],
+        period: Optional[dict],
+    ) -> List[Dict[str, Any]]:
+        """
+        Malzeme kullanım pivotlarının ortak ilk aşamaları:
+        verb/dönem $match → (_op, _mat) → yalnızca tarihi ve malzeme adı olanlar → _y, _m.
+        """
+        period_index = self._build_period_index_filter(period)
+        if period_index:
+            mongo_query = {"$and": [mongo_query, period_index]}
+
+        stages: List[Dict[str, Any]] = [{"$match": mongo_query}]
+
+        period_filter = self._build_period_mongo_filter(period)
+        if period_filter:
+            stages.append({"$match": period_filter})
+
+        stages += [
+            {"$project": {"_id": 0, "_op": _OPERATION_DATE_EXPR, "_mat": _MATERIAL_NAME_EXPR}},
+            {"$match": {"_op": {"$type": "date"}, "_mat": {"$type": "string", "$ne": ""}}},
+            {"$addFields": {"_y": {"$year": "$_op"}, "_m": {"$month": "$_op"}}},
+        ]
+        return stages
+
     def material_usage_pivot(self, period: Optional[dict] = None, limit: int = 200) -> Dict[str, Any]:
         """
         Yıllara ve mevsimlere (veya ay bazında) göre malzeme kullanım pivotu.
@@ -65,102 +728,51 @@ class LRSPatternsMixin:
         - year + season + materialName bazında sayım yapar.
         """
 
-        # period dict'inden kind'i çekelim (None da olabilir)
-        kind = (period or {}).get("kind")
-        group_by_month = (kind == "month")
-
-        # Ay modunda: (year, month, material)
-        # Mevsim modunda: (year, season, material)
-        counter: Counter = Counter()
+        pipeline = self._material_usage_stages(_maintenance_verb_filter(), period)
+        pipeline += self._material_pivot_stages(period, limit)
 
-        mongo_query: Dict[str, Any] = {
-            "$or": [
-                {"verb.id": {"$regex": "/verbs/(maintained|repaired)$"}},
-                {"statement.verb.id": {"$regex": "/verbs/(maintained|repaired)$"}},
-            ]
-        }
-
-        cursor = self.statements.find(
-            mongo_query,
-            {
-                "context": 1,
-                "statement.context": 1,
-                "object": 1,
-                "statement.object": 1,
-                "result": 1,
-                "statement.result": 1,
-                "timestamp": 1,
-                "stored": 1,
-                "verb": 1,
-                "statement.verb": 1,
-            },
+        # Sayım sunucuda; yalnızca tablo satırları gelir
+        return self._material_pivot_result(
+            period,
+            self.statements.aggregate(
+                pipeline, allowDiskUse=True, batchSize=self._result_batch_size(limit)
+            ),
         )
 
-        for doc in cursor:
-            # Dönem filtresi (son X yıl, kış 2020 vb.) varsa uygula
-            if not self._doc_matches_period(doc, period):
-                continue
-
-            op_date = _extract_operation_date(doc)
-            if not isinstance(op_date, datetime):
-                continue
-
-            year = op_date.year
-            month = op_date.month
-
-            pivot_year = year  # ← KRİTİK: ayrı değişken
-
-            if group_by_month:
-                second_dim = month  # 1–12
-            else:
-                if month in (12, 1, 2):
-                    second_dim = "kis"
-                    # Aralık ayını bir sonraki yılın kışı olarak say
-                    if month == 12:
-                        pivot_year = year + 1
-                elif month in (3, 4, 5):
-                    second_dim = "ilkbahar"
-                elif month in (6, 7, 8):
-                    second_dim = "yaz"
-                else:
-                    second_dim = "sonbahar"
-
-            mat_name = (
-                _get_nested(doc, "object.definition.name.tr-TR")
-                or _get_nested(doc, "statement.object.definition.name.tr-TR")
-            )
-            if not isinstance(mat_name, str) or not mat_name.strip():
-                continue
-
-            key = (pivot_year, second_dim, mat_name.strip())
-            counter[key] += 1
-
-
-        # Sayaçtan tablo satırlarını üret
-        rows: List[Dict[str, Any]] = []
-        for (year, second_dim, mat_name), cnt in sorted(
-            counter.items(),
-            key=lambda kv: kv[1],
-            reverse=True,
-        ):
-            if group_by_month:
-                row = {
-                    "year": year,
-                    "month": second_dim,      # 1–12
-                    "materialName": mat_name,
-                    "count": cnt,
-                }
-            else:
-                row = {
-                    "year": year,
-                    "season": second_dim,     # kis / ilkbahar / yaz / sonbahar
-                    "materialName": mat_name,
-                    "count": cnt,
-                }
+    @staticmethod
+    def _material_pivot_stages(period: Optional[dict], limit: int) -> List[Dict[str, Any]]:
+        """
+        material_usage_pivot'un ortak aşamalardan sonraki kısmı.
+        Ay modunda: (year, month, material); mevsim modunda: (year, season,
+        material) — Aralık bir sonraki yılın kışı.
+        """
+        if (period or {}).get("kind") == "month":
+            group_key = {"y": "$_y", "d": "$_m"}
+        else:
+            group_key = {"y": _SEASON_YEAR_EXPR, "d": _SEASON_EXPR}
 
-            rows.append(row)
-            if limit and len(rows) >= limit:
-                break
+        stages: List[Dict[str, Any]] = [
+            {"$group": {"_id": {**group_key, "mat": "$_mat"}, "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id.y": -1, "_id.d": 1, "_id.mat": 1}},
+        ]
+        if limit:
+            stages.append({"$limit": limit})
+        return stages
+
+    @staticmethod
+    def _material_pivot_result(period: Optional[dict], results) -> Dict[str, Any]:
+        """_material_pivot_stages çıktısından material_usage_pivot cevabı."""
+        # 1–12 / kis, ilkbahar, yaz, sonbahar
+        second_name = "month" if (period or {}).get("kind") == "month" else "season"
+        rows: List[Dict[str, Any]] = [
+            {
+                "year": r["_id"]["y"],
+                second_name: r["_id"]["d"],
+                "materialName": r["_id"]["mat"],
+                "count": r["count"],
+            }
+            for r in results
+        ]
 
         return {
             "scenario": "material_usage_pivot",
@@ -203,108 +815,65 @@ class LRSPatternsMixin:
                 limit_per_group=10
             )
         """
-        from collections import defaultdict
-        
-        # Veri toplama: (year, season) -> {materialName: count}
-        group_data: Dict[tuple, Counter] = defaultdict(Counter)
-        
-        mongo_query: Dict[str, Any] = {
-            "$or": [
-                {"verb.id": {"$regex": "/verbs/(maintained|repaired)$"}},
-                {"statement.verb.id": {"$regex": "/verbs/(maintained|repaired)$"}},
-            ]
-        }
-        
-        cursor = self.statements.find(
-            mongo_query,
+        pipeline = self._material_usage_stages(_maintenance_verb_filter(), period)
+        pipeline += self._top_per_year_season_stages(limit_per_group, limit)
+
+        return self._top_per_year_season_result(
+            period,
+            limit_per_group,
+            self.statements.aggregate(
+                pipeline, allowDiskUse=True, batchSize=self._result_batch_size(limit)
+            ),
+        )
+
+    @staticmethod
+    def _top_per_year_season_stages(limit_per_group: int, limit: int) -> List[Dict[str, Any]]:
+        """
+        material_usage_top_per_year_season'ın ortak aşamalardan sonraki kısmı:
+        (yıl, mevsim, malzeme) sayımı + grup içi sıra numarası sunucuda; her
+        (yıl, mevsim) için en çok kullanılan limit_per_group malzeme.
+        """
+        stages: List[Dict[str, Any]] = [
             {
-                "context": 1,
-                "statement.context": 1,
-                "object": 1,
-                "statement.object": 1,
-                "result": 1,
-                "statement.result": 1,
-                "timestamp": 1,
-                "stored": 1,
-                "verb": 1,
-                "statement.verb": 1,
+                "$group": {
+                    "_id": {"y": _SEASON_YEAR_EXPR, "s": _SEASON_EXPR, "mat": "$_mat"},
+                    "count": {"$sum": 1},
+                }
             },
-        )
-        
-        for doc in cursor:
-            # Dönem filtresi uygula
-            if not self._doc_matches_period(doc, period):
-                continue
-            
-            op_date = _extract_operation_date(doc)
-            if not isinstance(op_date, datetime):
-                continue
-            
-            year = op_date.year
-            month = op_date.month
-            
-            # Mevsim ve pivot_year hesapla
-            pivot_year = year
-            if month in (12, 1, 2):
-                season = "kis"
-                # Aralık ayını bir sonraki yılın kışı olarak say
-                if month == 12:
-                    pivot_year = year + 1
-            elif month in (3, 4, 5):
-                season = "ilkbahar"
-            elif month in (6, 7, 8):
-                season = "yaz"
-            else:
-                season = "sonbahar"
-            
-            # Malzeme adını çıkar
-            mat_name = (
-                _get_nested(doc, "object.definition.name.tr-TR")
-                or _get_nested(doc, "statement.object.definition.name.tr-TR")
-            )
-            if not isinstance(mat_name, str) or not mat_name.strip():
-                continue
-            
-            # Gruba ekle
-            group_key = (pivot_year, season)
-            group_data[group_key][mat_name.strip()] += 1
-        
-        # Her grup için top N malzemeyi hesapla
-        rows: List[Dict[str, Any]] = []
-        
-        # Mevsim sıralama düzeni
-        season_order = {"kis": 0, "ilkbahar": 1, "yaz": 2, "sonbahar": 3}
-        
-        # Grupları sırala: yıl (desc) -> mevsim (doğal sıra)
-        sorted_groups = sorted(
-            group_data.keys(),
-            key=lambda g: (-g[0], season_order.get(g[1], 99))
-        )
-        
-        for group_key in sorted_groups:
-            year, season = group_key
-            counter = group_data[group_key]
-            
-            # Bu grup için en çok kullanılan malzemeleri al
-            top_materials = counter.most_common(limit_per_group)
-            
-            for rank, (mat_name, count) in enumerate(top_materials, start=1):
-                row = {
-                    "year": year,
-                    "season": season,
-                    "materialName": mat_name,
-                    "count": count,
-                    "rank": rank,
+            {
+                "$setWindowFields": {
+                    "partitionBy": {"y": "$_id.y", "s": "$_id.s"},
+                    "sortBy": {"count": -1, "_id.mat": 1},
+                    "output": {"rank": {"$documentNumber": {}}},
                 }
-                rows.append(row)
-                
-                # Toplam satır limiti kontrolü
-                if len(rows) >= limit:
-                    break
-            
-            if len(rows) >= limit:
-                break
-        
+            },
+            {"$match": {"rank": {"$lte": limit_per_group}}},
+            # Grupları sırala: yıl (desc) -> mevsim (doğal sıra) -> rank
+            {"$addFields": {"_so": {"$indexOfArray": [list(_SEASON_ORDER), "$_id.s"]}}},
+            {"$sort": {"_id.y": -1, "_so": 1, "rank": 1}},
+        ]
+        if limit:
+            stages.append({"$limit": limit})
+        return stages
+
+    @staticmethod
+    def _top_per_year_season_result(
+        period: Optional[dict],
+        limit_per_group: int,
+        results,
+    ) -> Dict[str, Any]:
+        """_top_per_year_season_stages çıktısından material_usage_top_per_year_season cevabı."""
+        rows: List[Dict[str, Any]] = [
+            {
+                "year": r["_id"]["y"],
+                "season": r["_id"]["s"],
+                "materialName": r["_id"]["mat"],
+                "count": r["count"],
+                "rank": r["rank"],
+            }
+            for r in results
+        ]
+
         return {
             "scenario": "material_usage_top_per_year_season",
             "period": period,
@@ -312,6 +881,43 @@ class LRSPatternsMixin:
             "rows": rows,
         }
 
+    def material_usage_overview(
+        self,
+        period: Optional[dict] = None,
+        limit_per_group: int = 5,
+        limit: int = 200,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        material_usage_pivot + material_usage_top_per_year_season tek taramada.
+
+        Ortak $match / $project aşamaları bir kez çalışır, iki görünüm $facet
+        ile aynı doküman akışından üretilir. İki senaryo birlikte gerektiğinde
+        koleksiyon iki kez taranmasın diye kullanılır; dönüş değeri senaryo
+        adı → ilgili metodun cevabı.
+        """
+        pipeline = self._material_usage_stages(_maintenance_verb_filter(), period)
+        pipeline.append(
+            {
+                "$facet": {
+                    "pivot": self._material_pivot_stages(period, limit),
+                    "top_per_year_season": self._top_per_year_season_stages(
+                        limit_per_group, limit
+                    ),
+                }
+            }
+        )
+
+        facets = next(iter(self.statements.aggregate(pipeline, allowDiskUse=True)), {})
+
+        return {
+            "material_usage_pivot": self._material_pivot_result(
+                period, facets.get("pivot") or []
+            ),
+            "material_usage_top_per_year_season": self._top_per_year_season_result(
+                period, limit_per_group, facets.get("top_per_year_season") or []
+            ),
+        }
+
     def material_usage_top_per_dimension(
         self,
         group_dimension: str = "vehicleModel",
@@ -353,58 +959,31 @@ class LRSPatternsMixin:
                 limit_per_group=10
             )
         """
-        from collections import defaultdict
-        
-        # Veri toplama: group_key -> {materialName: count}
-        group_data: Dict[str, Counter] = defaultdict(Counter)
+        mongo_query: Dict[str, Any] = _maintenance_verb_filter()
         
-        mongo_query: Dict[str, Any] = {
-            "$or": [
-                {"verb.id": {"$regex": "/verbs/(maintained|repaired)$"}},
-                {"statement.verb.id": {"$regex": "/verbs/(maintained|repaired)$"}},
-            ]
-        }
+        # Dönem filtresi sunucuda: index'li ön eleme + kesin $expr kontrolü
+        for extra in (
+            self._build_period_index_filter(period),
+            self._build_period_mongo_filter(period),
+        ):
+            if extra:
+                mongo_query.setdefault("$and", []).append(extra)
         
-        cursor = self.statements.find(
-            mongo_query,
-            {
-                "actor": 1,
-                "statement.actor": 1,
-                "context": 1,
-                "statement.context": 1,
-                "object": 1,
-                "statement.object": 1,
-                "result": 1,
-                "statement.result": 1,
-                "timestamp": 1,
-                "stored": 1,
-                "verb": 1,
-                "statement.verb": 1,
-            },
+        cursor = self.statements.find(mongo_query, self._ENTITY_SCAN_PROJECTION).batch_size(
+            self._SCAN_BATCH_SIZE
         )
         
-        for doc in cursor:
-            # Dönem filtresi uygula
-            if not self._doc_matches_period(doc, period):
-                continue
-            
-            # Group dimension değerini çıkar
-            group_ids = self._extract_entity_ids(doc, group_dimension)
-            if not group_ids:
-                continue
-            
-            group_key = group_ids[0]  # İlk değeri al (genellikle tek değer olur)
-            
-            # Malzeme adını çıkar
-            mat_name = (
-                _get_nested(doc, "object.definition.name.tr-TR")
-                or _get_nested(doc, "statement.object.definition.name.tr-TR")
-            )
-            if not isinstance(mat_name, str) or not mat_name.strip():
-                continue
-            
-            # Gruba ekle
-            group_data[group_key][mat_name.strip()] += 1
+        # Tek düz Counter: (group_key, materialName) -> count (C tarafında sayılır)
+        pair_counts: Counter = Counter()
+        pair_counts.update(self._iter_group_materials(cursor, group_dimension))
+        
+        # Tek geçişte gruplara dağıt: group_key -> [(materialName, count), ...]
+        # ve grup toplamlarını aynı geçişte biriktir
+        group_data: Dict[str, List[tuple]] = defaultdict(list)
+        group_totals: Counter = Counter()
+        for (group_key, mat_name), cnt in pair_counts.items():
+            group_data[group_key].append((mat_name, cnt))
+            group_totals[group_key] += cnt
         
         # Her grup için top N malzemeyi hesapla
         rows: List[Dict[str, Any]] = []
@@ -412,15 +991,16 @@ class LRSPatternsMixin:
         # Grupları toplam kullanıma göre sırala (en çok kullanılan grup önce)
         sorted_groups = sorted(
             group_data.keys(),
-            key=lambda g: sum(group_data[g].values()),
+            key=group_totals.__getitem__,
             reverse=True
         )
         
         for group_key in sorted_groups:
-            counter = group_data[group_key]
-            
             # Bu grup için en çok kullanılan malzemeleri al
-            top_materials = counter.most_common(limit_per_group)
+            # (nlargest stabil: eşit sayılarda most_common ile aynı sıra)
+            top_materials = heapq.nlargest(
+                limit_per_group, group_data[group_key], key=itemgetter(1)
+            )
             
             for rank, (mat_name, count) in enumerate(top_materials, start=1):
                 row = {
@@ -480,15 +1060,15 @@ class LRSPatternsMixin:
             mongo_query: Dict[str, Any] = {}
         else:
             # Genel sorgularda verb filtresini uygula
-            mongo_query: Dict[str, Any] = {
-                "$or": [
-                    {"verb.id": {"$regex": "/verbs/(maintained|repaired)$"}},
-                    {"statement.verb.id": {"$regex": "/verbs/(maintained|repaired)$"}},
-                ]
-            }
+            mongo_query: Dict[str, Any] = _maintenance_verb_filter()
 
         # Malzeme filtresi varsa ekle (normalize edilmiş sorgu ile)
-        if material_filter_norm:
+        if material_filter_norm and LRS_NORM_FIELDS_ENABLED:
+            # Normalize alan üzerinde tek regex ({verbKind: 1, materialNameNorm: 1})
+            mongo_query.setdefault("$and", []).append(
+                {MATERIAL_NAME_NORM_FIELD: {"$regex": re.escape(material_filter_norm)}}
+            )
+        elif material_filter_norm:
             if "$and" not in mongo_query:
                 mongo_query["$and"] = []
 
@@ -512,7 +1092,10 @@ class LRSPatternsMixin:
             )
 
         # 🆕 Vehicle filtresi varsa ekle
-        if vehicle_filter_val:
+        if vehicle_filter_val and LRS_VEHICLE_ID_FIELD_ENABLED:
+            # Materialize vehicleIds dizisinde tek eşitlik ({vehicleIds: 1, operationDateISO: 1})
+            mongo_query[VEHICLE_IDS_FIELD] = vehicle_filter_val.lower()
+        elif vehicle_filter_val:
             vehicle_condition = {
                 "$or": [
                     # actor.account.name: "vehicle/70886" veya "70886"
@@ -552,48 +1135,54 @@ class LRSPatternsMixin:
                 mongo_query["$and"] = []
             mongo_query["$and"].append(vehicle_condition)
 
-        cursor = self.statements.find(
-            mongo_query,
-            {
-                "actor": 1,
-                "verb": 1,
-                "statement.actor": 1,
-                "statement.verb": 1,
-                "context": 1,
-                "statement.context": 1,
-                "object": 1,
-                "statement.object": 1,
-                "result": 1,
-                "statement.result": 1,
-            },
-        )
-
-        for doc in cursor:
-            # Servis filtresi
-            if not self._doc_matches_service_filter(doc, service_filter):
-                continue
+        # Dönem aralığı index'li operationDateISO üzerinden ön eleme olarak
+        # sorguya girer ({verbKind: 1, operationDateISO: 1}); kesin kontrol
+        # her iki yolda da $expr ile sunucuda yapılır
+        period_index = self._build_period_index_filter(period)
+        if period_index:
+            mongo_query.setdefault("$and", []).append(period_index)
+
+        # Model filtresi normalize alan üzerinden ön eleme olarak da uygulanır
+        # ({verbKind: 1, vehicleModelNorm: 1}). vehicleModelNorm schema'daki
+        # vehicleModel kaynağından, döngüdeki kontrol context modelNo'dan
+        # hesaplanır; aynı olduğu kanıtlanana kadar kesin kontrol döngüde
+        if model_filter_norm and LRS_NORM_FIELDS_ENABLED:
+            mongo_query.setdefault("$and", []).append(
+                {VEHICLE_MODEL_NORM_FIELD: {"$regex": re.escape(model_filter_norm)}}
+            )
 
-            # Dönem filtresi
-            if not self._doc_matches_period(doc, period):
-                continue
+        # Model filtresi normalize_tr ile karşılaştırıldığından Python'da kalır;
+        # diğer durumlarda filtre + sayım + top-N tamamen sunucuda
+        if not model_filter_norm and entity_type in _ENTITY_IDS_EXPRS:
+            return self._top_entities_aggregate(
+                mongo_query, entity_type, limit, service_filter, period
+            )
 
-            # Model filtresi (normalize edilmiş karşılaştırma)
-            if model_filter_norm:
-                ctx = _get_context(doc)
-                exts = ctx.get("extensions") or {}
-                doc_model = exts.get("https://promptever.com/extensions/modelNo")
+        # Servis filtresi sunucuda ön eleme olarak da uygulanır (kesin kontrol döngüde)
+        service_match = self._build_service_mongo_filter(service_filter)
+        if service_match:
+            mongo_query.setdefault("$and", []).append(service_match)
 
-                if not doc_model:
-                    continue
+        # Dönem filtresi sunucuda ($expr, _doc_matches_period ile aynı davranış);
+        # döngüde doküman başına dönem kontrolü yapılmaz
+        period_filter = self._build_period_mongo_filter(period)
+        if period_filter:
+            mongo_query.setdefault("$and", []).append(period_filter)
 
-                doc_model_norm = normalize_tr(str(doc_model))
-                if model_filter_norm not in doc_model_norm:
-                    continue
+        if self._use_parallel_shards():
+            counter = self._count_top_entities_sharded(
+                mongo_query, entity_type, service_filter, model_filter_norm
+            )
+        else:
+            cursor = self.statements.find(mongo_query, self._ENTITY_SCAN_PROJECTION).batch_size(
+                self._SCAN_BATCH_SIZE
+            )
 
-            # Entity ID'lerini çıkar ve say
-            ids = self._extract_entity_ids(doc, entity_type)
-            for eid in ids:
-                counter[eid] += 1
+            counter.update(
+                self._iter_top_entity_ids(
+                    cursor, entity_type, service_filter, None, model_filter_norm
+                )
+            )
 
         results: List[Dict[str, Any]] = []
         for eid, cnt in counter.most_common(limit):
@@ -607,6 +1196,189 @@ class LRSPatternsMixin:
 
         return results
 
+    @staticmethod
+    def _price_trend_query(
+        kind: Optional[str],
+        threshold_dt: datetime,
+        anchor_dt: datetime,
+    ) -> Dict[str, Any]:
+        """Fiyat trendi find() filtresi; yalnızca last_n_* dönemlerinde tarih penceresi."""
+        if kind in ("last_n_years", "last_n_months"):
+            return _material_price_query(threshold_dt, anchor_dt)
+        return _material_price_query()
+
+    def _price_trend_stages(
+        self,
+        kind: Optional[str],
+        threshold_dt: datetime,
+        anchor_dt: datetime,
+        per_unit: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Fiyat trendi aggregation'larının ortak ilk aşamaları:
+        $match → (_op, _code, _price) → yalnızca pencere içi tarihli ve fiyatlı
+        malzeme kayıtları. per_unit=True ise fiyat miktara bölünür (birim fiyat).
+        """
+        # Anchor sonrası (timestamp / stored'a düşen) kayıtlar her dönemde dışarıda
+        op_match: Dict[str, Any] = {"$type": "date", "$lte": anchor_dt}
+        if kind in ("last_n_years", "last_n_months"):
+            op_match["$gte"] = threshold_dt
+
+        return [
+            {"$match": self._price_trend_query(kind, threshold_dt, anchor_dt)},
+            {
+                "$project": {
+                    "_id": 0,
+                    "_op": _OPERATION_DATE_EXPR,
+                    "_oid": _PRICE_OBJECT_ID_EXPR,
+                    "_res": _PRICE_RESULT_EXTS_EXPR,
+                }
+            },
+            {"$match": {"_op": op_match, "_oid": {"$regex": "/activities/material/"}}},
+            {
+                "$project": {
+                    "_op": 1,
+                    # .../activities/material/XYZ → XYZ (son geçişten sonrası)
+                    "_code": {"$arrayElemAt": [{"$split": ["$_oid", "/activities/material/"]}, -1]},
+                    "_price": _UNIT_PRICE_EXPR if per_unit else _MATERIAL_COST_EXPR,
+                }
+            },
+            {"$match": {"_price": {"$ne": None}}},
+        ]
+
+    def _raw_statements(self):
+        """statements koleksiyonunun dokümanları RawBSONDocument döndüren görünümü."""
+        return self.statements.with_options(
+            codec_options=self.statements.codec_options.with_options(
+                document_class=RawBSONDocument
+            )
+        )
+
+    def _use_parallel_shards(self) -> bool:
+        """Paralel sayım açık ve koleksiyon yeterince büyük mü (tahmini sayı)."""
+        if self._PARALLEL_SHARDS <= 1:
+            return False
+        return self.statements.estimated_document_count() >= self._PARALLEL_MIN_DOCS
+
+    def _count_top_entities_sharded(
+        self,
+        mongo_query: Dict[str, Any],
+        entity_type: str,
+        service_filter: Optional[str],
+        model_filter_norm: Optional[str],
+    ) -> Counter:
+        """
+        top_entities_overall'ın Python sayımını _id hash shard'larına bölüp
+        services.lrs_parallel havuzunda çalıştırır, kısmi Counter'ları birleştirir.
+
+        Dönem filtresi mongo_query'de $expr olarak gelir (anchor tarihi bu
+        process'te çözülür); worker'lar yalnızca servis / model kontrolü ve
+        entity çıkarımı yapar.
+        """
+        connection = (LRS_MONGO_URI, self.statements.database.name, self.statements.name)
+        return count_top_entities_sharded(
+            self._PARALLEL_SHARDS,
+            connection,
+            mongo_query,
+            self._ENTITY_SCAN_PROJECTION,
+            self._SCAN_BATCH_SIZE,
+            entity_type,
+            service_filter,
+            model_filter_norm,
+        )
+
+    def _top_entities_aggregate(
+        self,
+        mongo_query: Dict[str, Any],
+        entity_type: str,
+        limit: int,
+        service_filter: Optional[str] = None,
+        period=None,
+    ) -> List[Dict[str, Any]]:
+        """
+        top_entities_overall'ın sunucu tarafı: $match → entity ID'leri → $unwind
+        → $group → $sort → $limit. İstemciye yalnızca limit kadar satır gelir.
+        """
+        match: List[Dict[str, Any]] = [mongo_query]
+        for extra in (
+            self._build_service_mongo_filter(service_filter),
+            self._build_period_mongo_filter(period),
+        ):
+            if extra:
+                match.append(extra)
+
+        pipeline: List[Dict[str, Any]] = [
+            {"$match": {"$and": match} if len(match) > 1 else match[0]},
+            {"$project": {"_id": 0, "ids": _ENTITY_IDS_EXPRS[entity_type]}},
+            {"$unwind": "$ids"},
+            {"$group": {"_id": "$ids", "count": {"$sum": 1}}},
+            # Eşit sayılarda sıra sabit kalsın
+            {"$sort": {"count": -1, "_id": 1}},
+        ]
+        if limit:
+            pipeline.append({"$limit": limit})
+
+        return [
+            {
+                "entity": r["_id"],
+                "count": r["count"],
+                "entity_type": entity_type,
+            }
+            for r in self.statements.aggregate(
+                pipeline, allowDiskUse=True, batchSize=self._result_batch_size(limit)
+            )
+        ]
+
+    # ------------------------------------------------------------------
+    # Sayım generator'ları (Counter.update ile tüketilir)
+    # ------------------------------------------------------------------
+
+    def _iter_group_materials(self, cursor, group_dimension: str, period=None):
+        """
+        Dönem filtresinden geçen her doküman için (group_key, materialName) verir.
+        group_key, group dimension'ın ilk değeridir (genellikle tek değer olur).
+        """
+        # Döngüde her doküman için global / attribute lookup yapılmasın
+        matches_period = self._doc_matches_period
+        extract_ids = self._extract_entity_ids
+        get_mat_name = _get_mat_name
+
+        for doc in cursor:
+            # Dönem filtresi uygula (sorguda çözülmediyse)
+            if period and not matches_period(doc, period):
+                continue
+
+            # Group dimension değerini çıkar
+            group_ids = extract_ids(doc, group_dimension)
+            if not group_ids:
+                continue
+
+            # Malzeme adını çıkar (string değilse strip yok → atla)
+            try:
+                mat_name = get_mat_name(doc).strip()
+            except AttributeError:
+                continue
+            if not mat_name:
+                continue
+
+            yield group_ids[0], mat_name
+
+    def _iter_top_entity_ids(
+        self,
+        cursor,
+        entity_type: str,
+        service_filter: Optional[str] = None,
+        period=None,
+        model_filter_norm: Optional[str] = None,
+    ):
+        """Servis / dönem / model filtrelerinden geçen dokümanların entity ID'lerini tek tek verir."""
+        period_check = None
+        if period:
+            matches_period = self._doc_matches_period
+            period_check = lambda doc, ctx: matches_period(doc, period, ctx)
+
+        return _iter_entity_ids(cursor, entity_type, service_filter, model_filter_norm, period_check)
+
     def answer_top_entities_question(self, question: TopEntitiesQuestion) -> Dict[str, Any]:
         """
         TopEntitiesQuestion için:
@@ -620,7 +1392,7 @@ class LRSPatternsMixin:
         # ------------------------------------------------------
         # 1) Anchor (referans) tarihi belirle
         # ------------------------------------------------------
-        anchor_date = self._compute_latest_business_date()
+        anchor_date = self._get_latest_business_date()
 
         if anchor_date is None:
             # LRS'te hiç tarih bulunamadı
@@ -636,62 +1408,29 @@ class LRSPatternsMixin:
             effective_period_text: Optional[str] = None
             effective_threshold_date: Optional[str] = None
 
-            kind = None
-            if isinstance(period, dict):
-                kind = period.get("kind")
-
-            if kind == "last_n_months":
-                months = int(period.get("months") or 0)
-                if months > 0:
-                    try:
-                        from dateutil.relativedelta import relativedelta
-
-                        threshold = anchor_date - relativedelta(months=months)
-                        effective_threshold_date = threshold.date().isoformat()
-                        effective_period_text = (
-                            f"Son {months} ay ({threshold.date().isoformat()} "
-                            f"- {anchor_date.date().isoformat()} arası)"
-                        )
-                    except ImportError:
+            kind = period.get("kind") if isinstance(period, dict) else None
+
+            last_n = _LAST_N_PERIODS.get(kind)
+            if last_n is not None:
+                attr, unit, days = last_n
+                n = int(period.get(attr) or 0)
+                if n > 0:
+                    if relativedelta is not None:
+                        threshold = anchor_date - relativedelta(**{attr: n})
+                        approx = ""
+                    else:
                         # dateutil yoksa fallback
-                        threshold = anchor_date - timedelta(days=months * 30)
-                        effective_threshold_date = threshold.date().isoformat()
-                        effective_period_text = (
-                            f"Son {months} ay (yaklaşık {threshold.date().isoformat()} "
-                            f"- {anchor_date.date().isoformat()} arası)"
-                        )
-
-            elif kind == "last_n_years":
-                years = int(period.get("years") or 0)
-                if years > 0:
-                    try:
-                        from dateutil.relativedelta import relativedelta
-
-                        threshold = anchor_date - relativedelta(years=years)
-                        effective_threshold_date = threshold.date().isoformat()
-                        effective_period_text = (
-                            f"Son {years} yıl ({threshold.date().isoformat()} "
-                            f"- {anchor_date.date().isoformat()} arası)"
-                        )
-                    except ImportError:
-                        # dateutil yoksa fallback
-                        threshold = anchor_date - timedelta(days=years * 365)
-                        effective_threshold_date = threshold.date().isoformat()
-                        effective_period_text = (
-                            f"Son {years} yıl (yaklaşık {threshold.date().isoformat()} "
-                            f"- {anchor_date.date().isoformat()} arası)"
-                        )
+                        threshold = anchor_date - timedelta(days=n * days)
+                        approx = "yaklaşık "
+                    effective_threshold_date = threshold.date().isoformat()
+                    effective_period_text = (
+                        f"Son {n} {unit} ({approx}{effective_threshold_date} "
+                        f"- {effective_anchor_date} arası)"
+                    )
 
             elif kind == "season":
                 season = (period.get("season") or "").lower()
-                season_names = {
-                    "winter": "Kış mevsimi (Aralık-Ocak-Şubat)",
-                    "spring": "İlkbahar mevsimi (Mart-Nisan-Mayıs)",
-                    "summer": "Yaz mevsimi (Haziran-Temmuz-Ağustos)",
-                    "autumn": "Sonbahar mevsimi (Eylül-Ekim-Kasım)",
-                    "fall": "Sonbahar mevsimi (Eylül-Ekim-Kasım)",
-                }
-                effective_period_text = season_names.get(
+                effective_period_text = _SEASON_PERIOD_TEXTS.get(
                     season,
                     "Belirtilen mevsim için servis kayıtları",
                 )
@@ -718,160 +1457,72 @@ class LRSPatternsMixin:
                 "entity_type": entity_type,
                 "limit": question.limit,
                 "service_filter": question.service_filter,
-                "period": period,
-                "material_filter": question.material_filter,
-                "model_filter": question.model_filter,
-                "vehicle_filter": question.vehicle_filter,  # 🆕
-            },
-            "rows": rows,
-            "effective_period_text": effective_period_text,
-            "effective_anchor_date": effective_anchor_date,
-            "effective_threshold_date": effective_threshold_date,
-            "period_raw": period,
-        }
-
-    def material_price_trend(
-        self,
-        period: Optional[dict] = None,
-        limit: int = 15,
-    ) -> Dict[str, Any]:
-        """
-        CSV üzerinde çalışan gerçek fiyat trend analizinin Mongo versiyonu.
-        Malzeme kodu bazında ilk ve son fiyat farkını hesaplar.
-        """
-        # ------------------------
-        # 1) Zaman penceresi
-        # ------------------------
-        anchor_date = self._compute_latest_business_date()
-        if not anchor_date:
-            return {"scenario": "material_price_trend", "rows": []}
-
-        if period is None:
-            period = {"kind": "last_n_years", "years": 3}
-
-        kind = period.get("kind")
-        if kind == "last_n_years":
-            years = int(period.get("years", 3))
-            threshold = anchor_date - timedelta(days=years * 365)
-        elif kind == "last_n_months":
-            months = int(period.get("months", 36))
-            threshold = anchor_date - timedelta(days=months * 30)
-        else:
-            threshold = datetime.min
-
-        # 🔧 aware/naive karışmasın
-        threshold_dt = _to_naive(threshold)
-        anchor_dt = _to_naive(anchor_date)
-
-        # ------------------------
-        # 2) Mongo'dan kayıtları çek
-        # ------------------------
-        mongo_query: Dict[str, Any] = {
-            "$or": [
-                {"result.extensions": {"$exists": True}},
-                {"statement.result.extensions": {"$exists": True}},
-            ]
-        }
-
-        cursor = self.statements.find(
-            mongo_query,
-            {
-                "context": 1,
-                "statement.context": 1,
-                "object": 1,
-                "statement.object": 1,
-                "result": 1,
-                "statement.result": 1,
-                "timestamp": 1,
-                "stored": 1,
-            },
-        )
-
-        # ------------------------
-        # 3) Malzeme başına fiyat serisi hesapla
-        # ------------------------
-        materials: Dict[str, Dict[str, Any]] = {}
-
-        for doc in cursor:
-            # Tarih
-            op_date = _extract_operation_date(doc)
-            if not isinstance(op_date, datetime):
-                continue
-
-            op_date = _to_naive(op_date)
-
-            if not (threshold_dt <= op_date <= anchor_dt):
-                continue
-
-            # Malzeme kodu
-            obj_id = (
-                _get_nested(doc, "object.id")
-                or _get_nested(doc, "statement.object.id")
-            )
-            if not obj_id or "/activities/material/" not in str(obj_id):
-                continue
-
-            material_code = str(obj_id).split("/activities/material/")[-1]
-
-            # Fiyat
-            res = _get_nested(doc, "result.extensions") or _get_nested(
-                doc,
-                "statement.result.extensions",
-            )
-            if not isinstance(res, dict):
-                continue
-
-            cost = res.get("https://promptever.com/extensions/materialCost")
-            if cost is None:
-                continue
-
-            try:
-                price_val = float(cost)
-            except (TypeError, ValueError):
-                continue
-
-            bucket = materials.setdefault(
-                material_code,
-                {"prices": []},
-            )
-            bucket["prices"].append((op_date, price_val))
+                "period": period,
+                "material_filter": question.material_filter,
+                "model_filter": question.model_filter,
+                "vehicle_filter": question.vehicle_filter,  # 🆕
+            },
+            "rows": rows,
+            "effective_period_text": effective_period_text,
+            "effective_anchor_date": effective_anchor_date,
+            "effective_threshold_date": effective_threshold_date,
+            "period_raw": period,
+        }
 
+    def material_price_trend(
+        self,
+        period: Optional[dict] = None,
+        limit: int = 15,
+    ) -> Dict[str, Any]:
+        """
+        CSV üzerinde çalışan gerçek fiyat trend analizinin Mongo versiyonu.
+        Malzeme kodu bazında ilk ve son fiyat farkını hesaplar.
+        """
         # ------------------------
-        # 4) İlk-son fiyat değişimini hesapla
+        # 1) Zaman penceresi
         # ------------------------
-        rows: List[Dict[str, Any]] = []
-
-        for code, info in materials.items():
-            prices = sorted(info["prices"], key=lambda x: x[0])
-            if len(prices) < 2:
-                continue
-
-            first_date, first_price = prices[0]
-            last_date, last_price = prices[-1]
+        anchor_date = self._get_latest_business_date()
+        if not anchor_date:
+            return {"scenario": "material_price_trend", "rows": []}
 
-            if first_price <= 0:
-                continue
+        if period is None:
+            period = {"kind": "last_n_years", "years": 3}
 
-            change_abs = last_price - first_price
-            if change_abs <= 0:
-                continue
+        kind = period.get("kind")
+        if kind == "last_n_years":
+            years = int(period.get("years", 3))
+            threshold = anchor_date - timedelta(days=years * 365)
+        elif kind == "last_n_months":
+            months = int(period.get("months", 36))
+            threshold = anchor_date - timedelta(days=months * 30)
+        else:
+            threshold = datetime.min
 
-            change_pct = (change_abs / first_price) * 100.0
+        # 🔧 aware/naive karışmasın
+        threshold_dt = _to_naive(threshold)
+        anchor_dt = _to_naive(anchor_date)
 
-            rows.append(
-                {
-                    "materialCode": code,
-                    "firstDate": first_date.date().isoformat(),
-                    "lastDate": last_date.date().isoformat(),
-                    "firstPrice": round(first_price, 2),
-                    "lastPrice": round(last_price, 2),
-                    "changeAbs": round(change_abs, 2),
-                    "changePct": round(change_pct, 1),
-                    "observations": len(prices),
-                }
+        # ------------------------
+        # 2) Malzeme başına ilk / son fiyat sunucuda
+        # ------------------------
+        # Tarih sırasına göre ilk ve son gözlem; yalnızca artanlar, en çok
+        # artan limit kadar satır istemciye gelir
+        pipeline = self._price_trend_stages(kind, threshold_dt, anchor_dt)
+        pipeline += [
+            {"$sort": {"_op": 1}},
+            {"$group": {"_id": "$_code", **_FIRST_LAST_PRICE_ACCUMULATORS}},
+        ]
+        pipeline += _price_increase_stages(limit)
+
+        rows: List[Dict[str, Any]] = [
+            {
+                "materialCode": r["_id"],
+                **_price_change_fields(r),
+            }
+            for r in self.statements.aggregate(
+                pipeline, allowDiskUse=True, batchSize=self._result_batch_size(limit)
             )
-
-        rows = sorted(rows, key=lambda r: r["changePct"], reverse=True)[:limit]
+        ]
 
         return {
             "scenario": "material_price_trend",
@@ -897,7 +1548,7 @@ class LRSPatternsMixin:
         # ------------------------
         # 1) Zaman penceresi
         # ------------------------
-        anchor_date = self._compute_latest_business_date()
+        anchor_date = self._get_latest_business_date()
         if not anchor_date:
             return {"scenario": "material_price_trend_by_season", "rows": []}
 
@@ -918,133 +1569,37 @@ class LRSPatternsMixin:
         anchor_dt = _to_naive(anchor_date)
 
         # ------------------------
-        # 2) Mongo'dan kayıtları çek
+        # 2) Malzeme + mevsim bazında istatistikler sunucuda
         # ------------------------
-        mongo_query: Dict[str, Any] = {
-            "$or": [
-                {"result.extensions": {"$exists": True}},
-                {"statement.result.extensions": {"$exists": True}},
-            ]
-        }
-
-        cursor = self.statements.find(
-            mongo_query,
+        pipeline = self._price_trend_stages(kind, threshold_dt, anchor_dt)
+        pipeline += [
+            {"$sort": {"_op": 1}},
             {
-                "context": 1,
-                "statement.context": 1,
-                "object": 1,
-                "statement.object": 1,
-                "result": 1,
-                "statement.result": 1,
-                "timestamp": 1,
-                "stored": 1,
+                "$group": {
+                    "_id": {"code": "$_code", "season": {"$arrayElemAt": [list(_SEASON), {"$month": "$_op"}]}},
+                    **_FIRST_LAST_PRICE_ACCUMULATORS,
+                    "avg": {"$avg": "$_price"},
+                    "min": {"$min": "$_price"},
+                    "max": {"$max": "$_price"},
+                }
             },
-        )
-
-        # ------------------------
-        # 3) Malzeme + Mevsim bazında fiyat serisi topla
-        # ------------------------
-        buckets: Dict[tuple, Dict[str, Any]] = defaultdict(lambda: {"prices": []})
-
-        def _get_season_name(month: int) -> str:
-            """Ay numarasından mevsim döndür"""
-            if month in (12, 1, 2):
-                return "kis"
-            elif month in (3, 4, 5):
-                return "ilkbahar"
-            elif month in (6, 7, 8):
-                return "yaz"
-            else:
-                return "sonbahar"
-
-        for doc in cursor:
-            # Tarih
-            op_date = _extract_operation_date(doc)
-            if not isinstance(op_date, datetime):
-                continue
-
-            op_date = _to_naive(op_date)
-
-            if not (threshold_dt <= op_date <= anchor_dt):
-                continue
-
-            # Mevsim hesapla
-            season = _get_season_name(op_date.month)
-
-            # Malzeme kodu
-            obj_id = (
-                _get_nested(doc, "object.id")
-                or _get_nested(doc, "statement.object.id")
-            )
-            if not obj_id or "/activities/material/" not in str(obj_id):
-                continue
-
-            material_code = str(obj_id).split("/activities/material/")[-1]
+        ]
+        pipeline += _price_increase_stages(limit)
 
-            # Fiyat
-            res = _get_nested(doc, "result.extensions") or _get_nested(
-                doc,
-                "statement.result.extensions",
+        rows: List[Dict[str, Any]] = [
+            {
+                "materialCode": r["_id"]["code"],
+                "season": r["_id"]["season"],
+                "avgPrice": round(r["avg"], 2),
+                "minPrice": round(r["min"], 2),
+                "maxPrice": round(r["max"], 2),
+                "priceRange": round(r["max"] - r["min"], 2),
+                **_price_change_fields(r),
+            }
+            for r in self.statements.aggregate(
+                pipeline, allowDiskUse=True, batchSize=self._result_batch_size(limit)
             )
-            if not isinstance(res, dict):
-                continue
-
-            cost = res.get("https://promptever.com/extensions/materialCost")
-            if cost is None:
-                continue
-
-            try:
-                price_val = float(cost)
-            except (TypeError, ValueError):
-                continue
-
-            # Bucket'a ekle
-            key = (material_code, season)
-            buckets[key]["prices"].append((op_date, price_val))
-
-        # ------------------------
-        # 4) Her bucket için istatistik hesapla
-        # ------------------------
-        rows: List[Dict[str, Any]] = []
-
-        for (material_code, season), info in buckets.items():
-            prices = sorted(info["prices"], key=lambda x: x[0])
-            
-            if len(prices) < 2:
-                continue
-
-            price_values = [p[1] for p in prices]
-            
-            first_date, first_price = prices[0]
-            last_date, last_price = prices[-1]
-
-            if first_price <= 0:
-                continue
-
-            change_abs = last_price - first_price
-            change_pct = (change_abs / first_price) * 100.0
-
-            # Sadece artanları al
-            if change_abs <= 0:
-                continue
-
-            rows.append({
-                "materialCode": material_code,
-                "season": season,
-                "avgPrice": round(sum(price_values) / len(price_values), 2),
-                "minPrice": round(min(price_values), 2),
-                "maxPrice": round(max(price_values), 2),
-                "priceRange": round(max(price_values) - min(price_values), 2),
-                "observations": len(prices),
-                "firstDate": first_date.date().isoformat(),
-                "lastDate": last_date.date().isoformat(),
-                "firstPrice": round(first_price, 2),
-                "lastPrice": round(last_price, 2),
-                "changeAbs": round(change_abs, 2),
-                "changePct": round(change_pct, 1),
-            })
-
-        rows = sorted(rows, key=lambda r: r["changePct"], reverse=True)[:limit]
+        ]
 
         return {
             "scenario": "material_price_trend_by_season",
@@ -1070,7 +1625,7 @@ class LRSPatternsMixin:
         # ------------------------
         # 1) Zaman penceresi
         # ------------------------
-        anchor_date = self._compute_latest_business_date()
+        anchor_date = self._get_latest_business_date()
         if not anchor_date:
             return {
                 "scenario": "material_family_price_trend",
@@ -1096,130 +1651,63 @@ class LRSPatternsMixin:
         anchor_dt = _to_naive(anchor_date)
 
         # ------------------------
-        # 2) Mongo'dan fiyat verisi olan kayıtları çek
+        # 2) Aile → malzeme → ilk / son birim fiyat sunucuda
         # ------------------------
-        mongo_query: Dict[str, Any] = {
-            "$or": [
-                {"result.extensions": {"$exists": True}},
-                {"statement.result.extensions": {"$exists": True}},
-            ]
-        }
-
-        cursor = self.statements.find(
-            mongo_query,
+        # Aile: '-' öncesi prefix (örn 81.12501-6101 -> 81.12501). Ailenin
+        # malzeme sayısı tüm malzemeleri, ortalama değişim yalnızca fiyatı
+        # artanları kapsar ($avg null'ları atlar).
+        pipeline = self._price_trend_stages(kind, threshold_dt, anchor_dt, per_unit=True)
+        pipeline += [
+            {"$sort": {"_op": 1}},
             {
-                "context": 1,
-                "statement.context": 1,
-                "object": 1,
-                "statement.object": 1,
-                "result": 1,
-                "statement.result": 1,
-                "timestamp": 1,
-                "stored": 1,
+                "$group": {
+                    "_id": {
+                        "family": {"$arrayElemAt": [{"$split": ["$_code", "-"]}, 0]},
+                        "code": "$_code",
+                    },
+                    **_FIRST_LAST_PRICE_ACCUMULATORS,
+                }
             },
-        )
-
-        # ------------------------
-        # 3) Aile kodu → malzeme kodu → fiyat serisi
-        # ------------------------
-        families: Dict[str, Dict[str, Any]] = {}
-
-        for doc in cursor:
-            op_date = _extract_operation_date(doc)
-            if not isinstance(op_date, datetime):
-                continue
-
-            op_date = _to_naive(op_date)
-
-            if not (threshold_dt <= op_date <= anchor_dt):
-                continue
-
-            obj_id = (
-                _get_nested(doc, "object.id")
-                or _get_nested(doc, "statement.object.id")
-            )
-            if not obj_id or "/activities/material/" not in str(obj_id):
-                continue
-
-            material_code = str(obj_id).split("/activities/material/")[-1]
-            # Aile: '-' öncesi prefix (örn 81.12501-6101 -> 81.12501)
-            family_code = material_code.split("-")[0]
-
-            res = _get_nested(doc, "result.extensions") or _get_nested(
-                doc,
-                "statement.result.extensions",
-            )
-            if not isinstance(res, dict):
-                continue
-
-            cost = res.get("https://promptever.com/extensions/materialCost")
-            if cost is None:
-                continue
-
-            qty = res.get("https://promptever.com/extensions/materialQuantity")
-            try:
-                qty_val = float(qty) if qty is not None else None
-            except (TypeError, ValueError):
-                qty_val = None
-
-            try:
-                price_val = float(cost)
-            except (TypeError, ValueError):
-                continue
-
-            if qty_val and qty_val > 0:
-                price_val = price_val / qty_val
-
-            fam = families.setdefault(
-                family_code,
-                {"materials": defaultdict(list)},
-            )
-            fam["materials"][material_code].append((op_date, price_val))
-
-        # ------------------------
-        # 4) Her aile için ortalama fiyat değişimi
-        # ------------------------
-        rows: List[Dict[str, Any]] = []
-
-        for family_code, info in families.items():
-            material_prices = info["materials"]
-            if len(material_prices) < min_materials:
-                continue
-
-            family_changes: List[float] = []
-
-            for material_code, prices in material_prices.items():
-                prices_sorted = sorted(prices, key=lambda x: x[0])
-                if len(prices_sorted) < 2:
-                    continue
-
-                first_date, first_price = prices_sorted[0]
-                last_date, last_price = prices_sorted[-1]
-
-                if first_price <= 0:
-                    continue
-
-                change_abs = last_price - first_price
-                if change_abs <= 0:
-                    continue
-
-                change_pct = (change_abs / first_price) * 100.0
-                family_changes.append(change_pct)
-
-            if not family_changes:
-                continue
-
-            avg_change_pct = sum(family_changes) / len(family_changes)
-
-            rows.append(
-                {
-                    "materialFamily": family_code,
-                    "avgChangePct": round(avg_change_pct, 1),
-                    "materialsCount": len(material_prices),
+            {
+                "$project": {
+                    "pct": {
+                        "$cond": [
+                            {
+                                "$and": [
+                                    {"$gte": ["$n", 2]},
+                                    {"$gt": ["$first.p", 0]},
+                                    {"$gt": ["$last.p", "$first.p"]},
+                                ]
+                            },
+                            _CHANGE_PCT_EXPR,
+                            None,
+                        ]
+                    }
                 }
-            )
+            },
+            {
+                "$group": {
+                    "_id": "$_id.family",
+                    "materialsCount": {"$sum": 1},
+                    "avgChangePct": {"$avg": "$pct"},
+                }
+            },
+            {"$match": {"materialsCount": {"$gte": min_materials}, "avgChangePct": {"$ne": None}}},
+            {"$sort": {"avgChangePct": -1, "_id": 1}},
+        ]
+        if limit:
+            pipeline.append({"$limit": limit})
 
-        rows = sorted(rows, key=lambda r: r["avgChangePct"], reverse=True)[:limit]
+        rows: List[Dict[str, Any]] = [
+            {
+                "materialFamily": r["_id"],
+                "avgChangePct": round(r["avgChangePct"], 1),
+                "materialsCount": r["materialsCount"],
+            }
+            for r in self.statements.aggregate(
+                pipeline, allowDiskUse=True, batchSize=self._result_batch_size(limit)
+            )
+        ]
 
         return {
             "scenario": "material_family_price_trend",
@@ -1242,7 +1730,7 @@ class LRSPatternsMixin:
         # ------------------------
         # 1) Zaman penceresi (material_family_price_trend ile aynı)
         # ------------------------
-        anchor_date = self._compute_latest_business_date()
+        anchor_date = self._get_latest_business_date()
         if not anchor_date:
             return {
                 "scenario": "material_family_price_trend_by_season",
@@ -1269,73 +1757,52 @@ class LRSPatternsMixin:
         # ------------------------
         # 2) Mongo query (fiyat verisi olan kayıtlar)
         # ------------------------
-        mongo_query: Dict[str, Any] = {
-            "$or": [
-                {"result.extensions": {"$exists": True}},
-                {"statement.result.extensions": {"$exists": True}},
-            ]
-        }
-
-        cursor = self.statements.find(
-            mongo_query,
-            {
-                "context": 1,
-                "statement.context": 1,
-                "object": 1,
-                "statement.object": 1,
-                "result": 1,
-                "statement.result": 1,
-                "timestamp": 1,
-                "stored": 1,
-            },
+        # Yalnızca malzeme activity'leri; pencere dışı kayıtlar cursor'a hiç gelmesin
+        mongo_query = self._price_trend_query(kind, threshold_dt, anchor_dt)
+
+        # Dokümanlar dict'e açılmadan raw BSON gelir; döngü yalnızca birkaç
+        # yaprağı okuduğu için iç içe dict / str nesneleri hiç oluşmaz
+        cursor = (
+            self._raw_statements()
+            .find(mongo_query, self._PRICE_TREND_PROJECTION)
+            .batch_size(self._SCAN_BATCH_SIZE)
         )
 
-        def _get_season_name(month: int) -> str:
-            if month in (12, 1, 2):
-                return "kis"
-            elif month in (3, 4, 5):
-                return "ilkbahar"
-            elif month in (6, 7, 8):
-                return "yaz"
-            return "sonbahar"
-
         # ------------------------
         # 3) (season, family) -> material_code -> [(date, price)]
         # ------------------------
         buckets: Dict[tuple, Dict[str, Any]] = defaultdict(lambda: {"materials": defaultdict(list)})
 
+        # Döngüde her doküman için global lookup yapılmasın
+        extract_date = _raw_operation_date
+        raw_get = _raw_get
+
         for doc in cursor:
-            op_date = _extract_operation_date(doc)
-            if not isinstance(op_date, datetime):
+            op_date = extract_date(doc)
+            # Neredeyse her kayıtta datetime: isinstance yerine EAFP
+            # (None / tarih olmayan değerlerde tzinfo yok → atla); aware → naive
+            try:
+                if op_date.tzinfo is not None:
+                    op_date = op_date.replace(tzinfo=None)
+            except AttributeError:
                 continue
 
-            op_date = _to_naive(op_date)
-
             if not (threshold_dt <= op_date <= anchor_dt):
                 continue
 
-            obj_id = (
-                _get_nested(doc, "object.id")
-                or _get_nested(doc, "statement.object.id")
-            )
+            obj_id = raw_get(doc, _PATH_OBJECT_ID) or raw_get(doc, _PATH_STMT_OBJECT_ID)
             if not obj_id or "/activities/material/" not in str(obj_id):
                 continue
 
             material_code = str(obj_id).split("/activities/material/")[-1]
             family_code = material_code.split("-")[0]
 
-            res = _get_nested(doc, "result.extensions") or _get_nested(
-                doc,
-                "statement.result.extensions",
-            )
-            if not isinstance(res, dict):
-                continue
-
-            cost = res.get("https://promptever.com/extensions/materialCost")
+            res = raw_get(doc, _PATH_RESULT_EXTS) or raw_get(doc, _PATH_STMT_RESULT_EXTS)
+            cost = raw_get(res, _PATH_MATERIAL_COST)
             if cost is None:
                 continue
 
-            qty = res.get("https://promptever.com/extensions/materialQuantity")
+            qty = raw_get(res, _PATH_MATERIAL_QTY)
             try:
                 qty_val = float(qty) if qty is not None else None
             except (TypeError, ValueError):
@@ -1350,7 +1817,7 @@ class LRSPatternsMixin:
                 price_val = price_val / qty_val
 
 
-            season = _get_season_name(op_date.month)
+            season = _SEASON[op_date.month]
 
             bucket = buckets[(season, family_code)]
             bucket["materials"][material_code].append((op_date, price_val))
@@ -1408,8 +1875,7 @@ class LRSPatternsMixin:
 
         out: List[Dict[str, Any]] = []
         for season, items in by_season.items():
-            items.sort(key=lambda r: r["avgChangePct"], reverse=True)
-            out.extend(items[:limit_per_season])
+            out.extend(heapq.nlargest(limit_per_season, items, key=lambda r: r["avgChangePct"]))
 
         season_order = {"kis": 0, "ilkbahar": 1, "yaz": 2, "sonbahar": 3}
         out.sort(key=lambda r: (season_order.get(r["season"], 99), -r["avgChangePct"], r["materialFamily"]))
@@ -1452,12 +1918,7 @@ class LRSPatternsMixin:
         # model filtresini Python tarafında yapacağız.
         query: Dict[str, Any] = {
             "$and": [
-                {
-                    "$or": [
-                        {"verb.id": {"$regex": "/verbs/(maintained|repaired)$"}},
-                        {"statement.verb.id": {"$regex": "/verbs/(maintained|repaired)$"}},
-                    ]
-                },
+                _maintenance_verb_filter(),
                 {
                     "$or": [
                         {"context.extensions": {"$exists": True}},
@@ -1539,10 +2000,7 @@ class LRSPatternsMixin:
 
 
             # Malzeme al
-            mat_name = (
-                _get_nested(doc, "object.definition.name.tr-TR")
-                or _get_nested(doc, "statement.object.definition.name.tr-TR")
-            )
+            mat_name = _get_mat_name(doc)
             if not mat_name:
                 continue
 
@@ -1730,10 +2188,7 @@ class LRSPatternsMixin:
                 elif verb_id.endswith("repaired"):
                     verb_type = "ONARIM"
 
-            mat_name = (
-                _get_nested(doc, "object.definition.name.tr-TR")
-                or _get_nested(doc, "statement.object.definition.name.tr-TR")
-            )
+            mat_name = _get_mat_name(doc)
             if not mat_name:
                 continue
 
@@ -16,7 +16,7 @@ from __future__ import annotations
 
 import re
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 from models import TimeRange
 from services.xapi_nlp.nlp_utils import (
@@ -384,6 +384,21 @@ def _get_nested(doc: Dict[str, Any], path: str, default: Any = None) -> Any:
     return current
 
 
+def _walk_path(doc: Dict[str, Any], path: Tuple[str, ...], default: Any = None) -> Any:
+    """
+    _get_nested'in önceden bölünmüş yol (tuple) alan hali; sıcak döngülerde
+    her çağrıda path.split(".") yapılmasın diye modül sabitleriyle kullanılır.
+    """
+    current: Any = doc
+    for p in path:
+        if not isinstance(current, dict):
+            return default
+        current = current.get(p)
+        if current is None:
+            return default
+    return current
+
+
 def _get_attr(obj: Any, name: str, default=None):
     if obj is None:
         return default
@@ -472,6 +487,33 @@ def _build_time_filter(time_range: Optional[TimeRange]) -> Dict[str, Any]:
     return {"$expr": {"$and": clauses}}
 
 
+def _build_opdate_range(time_range: Optional[TimeRange]) -> Dict[str, Any]:
+    """
+    TimeRange → materialize edilmiş operationDateISO için düz range koşulu.
+
+    {"$gte": start, "$lt": end} döner (end EXCLUSIVE). field operationDate
+    değilse veya string sınırlar parse edilemezse {} döner; çağıran taraf
+    _build_time_filter'a düşer.
+    """
+    if not time_range or (getattr(time_range, "field", None) or "operationDate") != "operationDate":
+        return {}
+
+    start_val = time_range.start_date if getattr(time_range, "start_date", None) else getattr(time_range, "start", None)
+    end_val = time_range.end_date if getattr(time_range, "end_date", None) else getattr(time_range, "end", None)
+
+    cond: Dict[str, Any] = {}
+    for op, val in (("$gte", start_val), ("$lt", end_val)):
+        if val is None:
+            continue
+        if isinstance(val, str):
+            try:
+                val = datetime.fromisoformat(val.strip().replace("Z", "+00:00"))
+            except ValueError:
+                return {}
+        cond[op] = val
+    return cond
+
+
 # ======================================================================
 # Context Helpers
 # ======================================================================
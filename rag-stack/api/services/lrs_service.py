@@ -65,3 +65,7 @@ __all__ = [
     "TimeRange",
     "TopEntitiesQuestion",
 ]
+
+
+if __name__ == "__main__":
+    print(f"[lrs_service] index: {LRSQueryService().ensure_example_indexes()}")
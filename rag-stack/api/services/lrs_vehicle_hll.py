@@ -0,0 +1,123 @@
+"""
+services/lrs_vehicle_hll.py
+===========================
+
+Farklı araç sayısı (uniqueVehicles) için HyperLogLog sketch.
+
+Kesin sayım her çağrıda tüm koleksiyonu tarayıp farklı araç adı başına bir
+$group bucket'ı açar; bellek O(farklı araç). Genel istatistik ekranı için
+~%1.6 hata payı yeterli olduğundan sayı, lrs_stats koleksiyonundaki tek bir
+dokümanda tutulan 4096 register'lık (birkaç KB) bir sketch'ten okunur.
+
+- Register güncellemesi sunucu tarafında $max ile yapılır (read-modify-write yok)
+- Yeni statement'lar materialize maintainer'ının change stream'inden eklenir
+- rebuild_vehicle_hll → sketch'i mevcut kayıtlardan baştan kurar
+
+Tek seferlik kurulum:
+    python -m services.lrs_vehicle_hll
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+from typing import Any, Dict, Iterable, Optional
+
+from config import lrs_db, lrs_statements
+
+# 2^12 register → standart hata ≈ 1.04 / sqrt(4096) ≈ %1.6
+_HLL_P = 12
+_HLL_M = 1 << _HLL_P
+_HLL_ALPHA = 0.7213 / (1 + 1.079 / _HLL_M)
+
+_SKETCH_ID = "vehicle_hll"
+
+lrs_stats = lrs_db["lrs_stats"]
+
+# Statement'lardaki ham actor adları (root + statement.*), sunucuda tekilleştirilmiş
+_VEHICLE_NAME_STAGES = [
+    {"$project": {"_id": 0, "name": ["$actor.account.name", "$statement.actor.account.name"]}},
+    {"$unwind": "$name"},
+    {"$match": {"name": {"$type": "string"}}},
+    {"$group": {"_id": "$name"}},
+]
+
+
+def _vehicle_name(raw: Any) -> Optional[str]:
+    """Actor adı → araç ID ("vehicle/70886" → "70886"); boşsa None."""
+    if not isinstance(raw, str):
+        return None
+    name = raw.strip()
+    if name.startswith("vehicle/"):
+        name = name[len("vehicle/"):]
+    return name or None
+
+
+def _register(name: str) -> tuple:
+    """Araç adı → (register index, rank)."""
+    h = int.from_bytes(hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest(), "big")
+    idx = h >> (64 - _HLL_P)
+    rest = h & ((1 << (64 - _HLL_P)) - 1)
+    return idx, (64 - _HLL_P) - rest.bit_length() + 1
+
+
+def add_vehicle_names(raw_names: Iterable[Any]) -> None:
+    """Actor adlarını sketch'e ekler (tek $max update)."""
+    updates: Dict[str, int] = {}
+    for raw in raw_names:
+        name = _vehicle_name(raw)
+        if name is None:
+            continue
+        idx, rank = _register(name)
+        key = f"r.{idx}"
+        if rank > updates.get(key, 0):
+            updates[key] = rank
+
+    if updates:
+        lrs_stats.update_one({"_id": _SKETCH_ID}, {"$max": updates}, upsert=True)
+
+
+def add_statement(doc: Dict[str, Any]) -> None:
+    """Change stream'den gelen statement'ın araç adını sketch'e ekler."""
+    stmt = doc.get("statement") or {}
+    add_vehicle_names([
+        ((doc.get("actor") or {}).get("account") or {}).get("name"),
+        ((stmt.get("actor") or {}).get("account") or {}).get("name"),
+    ])
+
+
+def estimate_unique_vehicles() -> Optional[int]:
+    """Sketch'ten farklı araç sayısı tahmini; sketch kurulmamışsa None."""
+    doc = lrs_stats.find_one({"_id": _SKETCH_ID}, {"r": 1})
+    if doc is None:
+        return None
+    return _estimate(doc.get("r") or {})
+
+
+def _estimate(registers: Dict[str, int]) -> int:
+    """Register'lar ({"<idx>": rank}, eksik = 0) → kardinalite tahmini."""
+    total = 0.0
+    for idx in range(_HLL_M):
+        total += 2.0 ** -registers.get(str(idx), 0)
+    estimate = _HLL_ALPHA * _HLL_M * _HLL_M / total
+
+    # Küçük kardinalitede linear counting daha isabetli
+    zeros = _HLL_M - len(registers)
+    if estimate <= 2.5 * _HLL_M and zeros:
+        estimate = _HLL_M * math.log(_HLL_M / zeros)
+    return int(round(estimate))
+
+
+def rebuild_vehicle_hll(collection=None) -> None:
+    """Sketch'i statements koleksiyonundaki tüm araç adlarından baştan kurar."""
+    coll = collection if collection is not None else lrs_statements
+    lrs_stats.delete_one({"_id": _SKETCH_ID})
+    cursor = coll.aggregate(_VEHICLE_NAME_STAGES, allowDiskUse=True)
+    add_vehicle_names(doc["_id"] for doc in cursor)
+    # Hiç araç yoksa da sketch var sayılsın (tahmin 0 döner)
+    lrs_stats.update_one({"_id": _SKETCH_ID}, {"$setOnInsert": {"r": {}}}, upsert=True)
+
+
+if __name__ == "__main__":
+    rebuild_vehicle_hll()
+    print(f"[lrs_vehicle_hll] uniqueVehicles ≈ {estimate_unique_vehicles()}")
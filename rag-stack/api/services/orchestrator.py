@@ -151,9 +151,7 @@ def _get_anchor_date() -> Optional[datetime]:
         return _ANCHOR_DATE_CACHE
 
     try:
-        from services.lrs_core import LRSCore
-        lrs_core = LRSCore()
-        anchor = lrs_core.get_anchor_date()
+        anchor = _LRS.get_anchor_date()
 
         if anchor:
             _ANCHOR_DATE_CACHE = anchor
@@ -182,9 +180,7 @@ def _get_date_range() -> Optional[dict]:
         return _ANCHOR_DATE_RANGE_CACHE
 
     try:
-        from services.lrs_core import LRSCore
-        lrs_core = LRSCore()
-        date_range = lrs_core.get_date_range()
+        date_range = _LRS.get_date_range()
 
         if date_range:
             _ANCHOR_DATE_RANGE_CACHE = date_range
@@ -209,6 +205,7 @@ def clear_anchor_date_cache():
     global _ANCHOR_DATE_CACHE, _ANCHOR_DATE_RANGE_CACHE
     _ANCHOR_DATE_CACHE = None
     _ANCHOR_DATE_RANGE_CACHE = None
+    _LRS.reset_date_cache()
     print("[Orchestrator] Anchor date cache temizlendi")
 # ============================================================================
 # PERIOD HELPERS
@@ -24,12 +24,15 @@ def normalize_tr(text: str | None) -> str:
     if not text:
         return ""
 
-    s = str(text).lower()
+    s = str(text)
 
-    # ✅ Tek kaynak (SSOT)
+    # ✅ Tek kaynak (SSOT). Katlama lower()'dan önce: "İ".lower() "i" + birleşik
+    # nokta (U+0307) verir ve nokta aşağıda boşluğa dönüşürdü ("FİLTRE" → "fi ltre")
     for src, dst in REPLACEMENTS.items():
         s = s.replace(src, dst)
 
+    s = s.lower()
+
     # JS'teki /[^a-z0-9 ]/g karşılığı
     s = re.sub(r"[^a-z0-9 ]+", " ", s)
 
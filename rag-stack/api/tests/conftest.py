@@ -0,0 +1,13 @@
+"""
+rag-stack/api testleri.
+
+Uygulama modülleri `services.*`, `config`, `models` gibi api kökünden import
+edilir; pytest hangi dizinden çalıştırılırsa çalıştırılsın kök sys.path'te olsun.
+"""
+
+import os
+import sys
+
+API_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if API_ROOT not in sys.path:
+    sys.path.insert(0, API_ROOT)
@@ -0,0 +1,51 @@
+"""email_service: para birimi kolon tespiti ve HTML escape."""
+
+import pytest
+
+from services.email_service import (
+    _is_currency,
+    generate_alert_email_html,
+    generate_chat_email_html,
+)
+
+
+@pytest.mark.parametrize(
+    "name",
+    ["cost", "materialCost", "Toplam Maliyet", "TUTAR", "birim_fiyat", "unitPrice", "totalCOST"],
+)
+def test_is_currency(name):
+    assert _is_currency(name)
+
+
+@pytest.mark.parametrize("name", ["count", "adet", "materialName", "km", ""])
+def test_is_not_currency(name):
+    assert not _is_currency(name)
+
+
+_XSS = "<script>alert(1)</script>"
+
+
+def test_chat_email_escapes_user_text():
+    body = generate_chat_email_html(
+        _XSS,
+        {
+            "intent": _XSS,
+            "scenario": _XSS,
+            "tables": [{"title": _XSS, "description": _XSS, "columns": ["a"], "rows": [{"a": _XSS}]}],
+        },
+        report_name=_XSS,
+        user_note=_XSS,
+    )
+    assert "<script>" not in body
+    assert body.count("&lt;script&gt;alert(1)&lt;/script&gt;") == 8
+
+
+def test_chat_email_user_note():
+    body = generate_chat_email_html("soru", {}, user_note="a < b & <b>c</b>")
+    assert "a &lt; b &amp; &lt;b&gt;c&lt;/b&gt;" in body
+
+
+def test_alert_email_escapes_fields():
+    body = generate_alert_email_html(_XSS, _XSS, _XSS, _XSS, "<i>", change_pct=5)
+    assert "<script>" not in body
+    assert "<i>" not in body
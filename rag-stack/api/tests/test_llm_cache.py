@@ -0,0 +1,110 @@
+"""llm_cache: request_key ve ExactCache (TTL + LRU)."""
+
+import pytest
+
+from models import LLMAnalysis
+from services import llm_cache
+from services.llm_cache import ExactCache, request_key
+
+
+def _key(**overrides):
+    args = dict(
+        provider_id="groq",
+        model="llama",
+        system_prompt="sys",
+        prompt="soru",
+        temperature=0.0,
+        max_tokens=256,
+    )
+    args.update(overrides)
+    return request_key(**args)
+
+
+def test_request_key_is_stable():
+    assert _key() == _key()
+    assert len(_key()) == 64
+
+
+@pytest.mark.parametrize(
+    "field, value",
+    [
+        ("provider_id", "google"),
+        ("model", "gemma"),
+        ("system_prompt", None),
+        ("prompt", "başka soru"),
+        ("temperature", 0.7),
+        ("max_tokens", 512),
+    ],
+)
+def test_request_key_depends_on_every_field(field, value):
+    assert _key(**{field: value}) != _key()
+
+
+def test_request_key_extra_fields():
+    assert _key(top_p=0.9) != _key()
+    assert _key(top_p=0.9) == _key(top_p=0.9)
+
+
+def test_make_key_only_for_zero_temperature():
+    assert ExactCache.make_key("groq", "llama", None, "soru", 0.7, 256) is None
+    assert ExactCache.make_key("groq", "llama", None, "soru", 0, 256) == request_key(
+        "groq", "llama", None, "soru", 0, 256
+    )
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = _Clock()
+    monkeypatch.setattr(llm_cache.time, "monotonic", c)
+    return c
+
+
+def test_exact_cache_hit_is_marked(clock):
+    cache = ExactCache(max_entries=4, ttl=60)
+    cache.put("k", LLMAnalysis(answer="cevap", latency_sec=1.5))
+
+    hit = cache.get("k")
+    assert hit.answer == "cevap"
+    assert hit.latency_sec == 0
+    assert hit.provider_info == {"cache": "exact"}
+
+
+def test_exact_cache_none_key_is_ignored(clock):
+    cache = ExactCache(max_entries=4, ttl=60)
+    cache.put(None, LLMAnalysis(answer="cevap"))
+    assert cache.get(None) is None
+    assert len(cache._entries) == 0
+
+
+def test_exact_cache_ttl(clock):
+    cache = ExactCache(max_entries=4, ttl=60)
+    cache.put("k", LLMAnalysis(answer="cevap"))
+
+    clock.now += 60
+    assert cache.get("k") is not None
+
+    clock.now += 1
+    assert cache.get("k") is None
+    assert "k" not in cache._entries
+
+
+def test_exact_cache_lru_eviction(clock):
+    cache = ExactCache(max_entries=2, ttl=60)
+    cache.put("a", LLMAnalysis(answer="a"))
+    cache.put("b", LLMAnalysis(answer="b"))
+
+    # "a" okununca en yeni olur; taşmada "b" düşer
+    assert cache.get("a") is not None
+    cache.put("c", LLMAnalysis(answer="c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a").answer == "a"
+    assert cache.get("c").answer == "c"
@@ -0,0 +1,200 @@
+"""llm_providers: async single-flight ve 429 / Retry-After davranışı."""
+
+import asyncio
+
+import pytest
+
+from models import LLMAnalysis
+from services.llm_cache import semantic_cache
+from services import llm_providers
+from services.llm_providers import (
+    HTTPLLMProvider,
+    MultiplexedProvider,
+    _RETRY_MAX_SLEEP,
+    _CappedRetry,
+    _apost_with_retry,
+)
+
+
+class _FakeProvider(HTTPLLMProvider):
+    """Upstream çağrısı release set edilene kadar bekleyen sahte provider."""
+
+    provider_id = "fake"
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+        self.release = None
+
+    def _build_request(self, *args, **kwargs):
+        raise AssertionError("kullanılmamalı")
+
+    def _parse_response(self, data):
+        raise AssertionError("kullanılmamalı")
+
+    def _health_request(self):
+        return "http://fake/health", None, None
+
+    async def _arequest(self, prompt, model, *args, **kwargs):
+        self.calls += 1
+        await self.release.wait()
+        return LLMAnalysis(provider=self.provider_id, model=model, answer=f"cevap: {prompt}")
+
+
+@pytest.fixture(autouse=True)
+def no_semantic_cache(monkeypatch):
+    monkeypatch.setattr(semantic_cache, "enabled", False)
+
+
+def test_identical_requests_share_one_upstream_call():
+    provider = _FakeProvider()
+
+    async def main():
+        provider.release = asyncio.Event()
+        calls = [asyncio.ensure_future(provider.agenerate("soru", "m")) for _ in range(3)]
+        await asyncio.sleep(0)
+        provider.release.set()
+        return await asyncio.gather(*calls)
+
+    results = asyncio.run(main())
+    assert provider.calls == 1
+    assert [r.answer for r in results] == ["cevap: soru"] * 3
+
+
+def test_cancelling_first_caller_does_not_cancel_others():
+    provider = _FakeProvider()
+
+    async def main():
+        provider.release = asyncio.Event()
+        first = asyncio.ensure_future(provider.agenerate("soru", "m"))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(provider.agenerate("soru", "m"))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        await asyncio.sleep(0)
+        provider.release.set()
+
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()).answer == "cevap: soru"
+    assert provider.calls == 1
+
+
+def test_inflight_is_per_event_loop():
+    provider = _FakeProvider()
+
+    async def main():
+        provider.release = asyncio.Event()
+        provider.release.set()
+        return await provider.agenerate("soru", "m")
+
+    # Her loop kendi tablosunu kullanır; biten çağrı tablodan silinir
+    assert asyncio.run(main()).answer == "cevap: soru"
+    assert asyncio.run(main()).answer == "cevap: soru"
+    assert provider.calls == 2
+    assert all(not table for table in HTTPLLMProvider._ainflight.values())
+
+
+# ---------------------------------------------------------------------------
+# 429 / Retry-After
+# ---------------------------------------------------------------------------
+
+
+class _Headers(dict):
+    def get(self, key, default=None):
+        return super().get(key, default)
+
+
+class _Response:
+    def __init__(self, status_code, retry_after=None):
+        self.status_code = status_code
+        self.headers = _Headers({"Retry-After": retry_after} if retry_after else {})
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name, default)
+
+
+def test_sync_retry_after_is_capped():
+    retry = _CappedRetry(total=3, respect_retry_after_header=True)
+    assert retry.get_retry_after(_Response(429, "600")) == _RETRY_MAX_SLEEP
+    assert retry.get_retry_after(_Response(429, "2")) == 2
+    assert retry.get_retry_after(_Response(429)) is None
+
+
+class _Client:
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.posts = 0
+
+    async def post(self, url, **kwargs):
+        self.posts += 1
+        return _Response(self.statuses.pop(0))
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    async def sleep(delay):
+        pass
+
+    monkeypatch.setattr(llm_providers.asyncio, "sleep", sleep)
+
+
+def test_async_retries_429_by_default(monkeypatch, no_sleep):
+    client = _Client([429, 429, 200])
+    monkeypatch.setattr(llm_providers, "_get_async_client", lambda: client)
+
+    response = asyncio.run(_apost_with_retry("http://x"))
+    assert response.status_code == 200
+    assert client.posts == 3
+
+
+def test_async_failover_statuses_return_429_at_once(monkeypatch, no_sleep):
+    client = _Client([429, 200])
+    monkeypatch.setattr(llm_providers, "_get_async_client", lambda: client)
+
+    statuses = llm_providers._FAILOVER_RETRY_STATUSES
+    response = asyncio.run(_apost_with_retry("http://x", statuses))
+    assert response.status_code == 429
+    assert client.posts == 1
+
+
+class _RecordingProvider:
+    """Mux girişinin aldığı kwargs'ları kaydeder."""
+
+    def __init__(self):
+        self.kwargs = []
+
+    def is_configured(self):
+        return True
+
+    def generate(self, *args, **kwargs):
+        self.kwargs.append(kwargs)
+        return LLMAnalysis(answer="ok", latency_sec=0.1)
+
+    async def agenerate(self, *args, **kwargs):
+        return self.generate(*args, **kwargs)
+
+
+def test_multiplexer_disables_provider_429_retries():
+    inner = _RecordingProvider()
+    mux = MultiplexedProvider([(inner, "m", 1.0)])
+
+    assert mux.generate("soru").answer == "ok"
+    assert asyncio.run(mux.agenerate("soru")).answer == "ok"
+    assert [kw["rate_limit_retry"] for kw in inner.kwargs] == [False, False]
+
+
+def test_health_check_uses_session_without_retries(monkeypatch):
+    calls = []
+
+    class _Session:
+        def get(self, url, **kwargs):
+            calls.append(url)
+            return _Response(200)
+
+    monkeypatch.setattr(llm_providers, "_HEALTH_SESSION", _Session())
+    assert _FakeProvider().health_check()
+    assert calls == ["http://fake/health"]
@@ -0,0 +1,83 @@
+"""lrs_core: vehicleId_eq → Mongo koşulları ve genel istatistikler."""
+
+import pytest
+from pymongo.errors import OperationFailure
+
+from services import lrs_core
+from services.lrs_core import LRSCore, _VID_ACTOR_PATHS, _VID_EXT_PATHS, _vehicle_id_clauses
+
+
+def _actor_values(ors):
+    values = [c[p]["$in"] for c in ors for p in c if p in _VID_ACTOR_PATHS]
+    assert len(values) == len(_VID_ACTOR_PATHS)
+    assert all(v == values[0] for v in values)
+    return set(values[0])
+
+
+def test_numeric_id_matches_bare_and_prefixed():
+    ors = _vehicle_id_clauses("70886")
+    assert _actor_values(ors) == {"70886", "vehicle/70886"}
+    assert [c for c in ors if set(c) & set(_VID_EXT_PATHS)] == [
+        {p: "70886"} for p in _VID_EXT_PATHS
+    ]
+
+
+def test_plate_matches_case_variants():
+    assert _actor_values(_vehicle_id_clauses("34Abc12")) == {
+        "34Abc12", "34ABC12", "34abc12",
+        "vehicle/34Abc12", "vehicle/34ABC12", "vehicle/34abc12",
+    }
+
+
+def test_no_regex_conditions():
+    # sabit değerli $in index bound'u üretir; regex metakarakterleri literal kalır
+    ors = _vehicle_id_clauses("a.b*")
+    assert "$regex" not in repr(ors)
+    assert "vehicle/a.b*" in _actor_values(ors)
+
+
+def test_mixed_case_stored_id_needs_exact_input():
+    # yalnızca yazıldığı hali / tamamı büyük / tamamı küçük denenir
+    assert "34aBc12" not in _actor_values(_vehicle_id_clauses("34ABC12"))
+    assert "34aBc12" in _actor_values(_vehicle_id_clauses("34aBc12"))
+
+
+class _Statements:
+    """aggregate'i kaydeden sahte koleksiyon; araç facet'i istenirse hata verir."""
+
+    def __init__(self, fail_vehicles):
+        self.fail_vehicles = fail_vehicles
+        self.facets = []
+
+    def aggregate(self, pipeline, **kwargs):
+        facet = pipeline[0]["$facet"]
+        self.facets.append(sorted(facet))
+        if self.fail_vehicles and "vehicles" in facet:
+            raise OperationFailure("$group exceeded memory limit")
+        docs = {"total": [{"n": 10}], "faults": [{"n": 4}], "vehicles": [{"n": 3}]}
+        return iter([{name: docs[name] for name in facet}])
+
+
+@pytest.fixture
+def exact_vehicles(monkeypatch):
+    monkeypatch.setattr(lrs_core, "_USE_VEHICLE_HLL", False)
+
+
+def test_general_statistics(exact_vehicles):
+    stats = LRSCore(_Statements(fail_vehicles=False)).get_general_statistics()
+    assert stats == {
+        "totalStatements": 10,
+        "uniqueVehicles": 3,
+        "statementsWithFaults": 4,
+        "faultCodeRatio": 40.0,
+    }
+
+
+def test_general_statistics_survives_vehicle_facet_failure(exact_vehicles):
+    statements = _Statements(fail_vehicles=True)
+    stats = LRSCore(statements).get_general_statistics()
+
+    assert statements.facets == [["faults", "total", "vehicles"], ["faults", "total"]]
+    assert stats["totalStatements"] == 10
+    assert stats["statementsWithFaults"] == 4
+    assert stats["uniqueVehicles"] == 0
@@ -0,0 +1,78 @@
+"""lrs_entities: servis filtresi deseni ve entity sayım döngüsü."""
+
+import re
+
+import pytest
+
+from services.lrs_entities import (
+    EXT_MODEL_NO,
+    _iter_entity_ids,
+    _matches_service_filter,
+    _service_regex,
+)
+
+
+def _doc(vehicle, service=None, model=None):
+    ctx = {"extensions": {}}
+    if service is not None:
+        ctx["contextActivities"] = {
+            "grouping": [{"id": f"https://promptever.com/activities/service-location/{service}"}]
+        }
+    if model is not None:
+        ctx["extensions"][EXT_MODEL_NO] = model
+    return {"actor": {"account": {"name": f"vehicle/{vehicle}"}}, "context": ctx}
+
+
+@pytest.mark.parametrize(
+    "grouping_id, expected",
+    [
+        ("https://promptever.com/activities/service-location/R600", True),
+        ("https://promptever.com/activities/service-location/TR-R600", True),
+        ("https://promptever.com/activities/service-location/R6001", True),
+        ("https://promptever.com/activities/service-location/R700", False),
+        # servis kodu yalnızca service-location ID'lerinde aranır
+        ("https://promptever.com/activities/customer/R600", False),
+    ],
+)
+def test_service_regex(grouping_id, expected):
+    assert (re.search(_service_regex("R600"), grouping_id) is not None) is expected
+
+
+def test_service_regex_escapes_code():
+    pattern = _service_regex("R.6")
+    assert re.search(pattern, "/activities/service-location/R.6")
+    assert not re.search(pattern, "/activities/service-location/RX6")
+
+
+def test_matches_service_filter():
+    assert _matches_service_filter(_doc("1", service="R600")["context"], "R600")
+    assert not _matches_service_filter(_doc("1", service="R700")["context"], "R600")
+    assert not _matches_service_filter(_doc("1")["context"], "R600")
+    assert not _matches_service_filter({"contextActivities": {"grouping": "x"}}, "R600")
+
+
+def test_iter_entity_ids_filters():
+    docs = [
+        _doc("1", service="R600", model="TGS 18.440"),
+        _doc("2", service="R700", model="TGS 18.440"),
+        _doc("3", service="R600", model="TGX 26.510"),
+        _doc("4", service="R600"),
+    ]
+
+    assert list(_iter_entity_ids(docs, "vehicle")) == ["1", "2", "3", "4"]
+    assert list(_iter_entity_ids(docs, "vehicle", service_filter="R600")) == ["1", "3", "4"]
+    assert list(_iter_entity_ids(docs, "vehicle", model_filter_norm="tgs")) == ["1", "2"]
+    assert list(_iter_entity_ids(docs, "vehicleModel", service_filter="R600")) == [
+        "TGS 18.440",
+        "TGX 26.510",
+    ]
+
+
+def test_iter_entity_ids_period_check():
+    docs = [_doc("1"), _doc("2")]
+    check = lambda doc, ctx: doc["actor"]["account"]["name"].endswith("2")
+    assert list(_iter_entity_ids(docs, "vehicle", period_check=check)) == ["2"]
+
+
+def test_iter_entity_ids_unknown_type():
+    assert list(_iter_entity_ids([_doc("1")], "unknown")) == []
@@ -0,0 +1,155 @@
+"""lrs_examples: dönem predicate'i ve index ön elemesi için tarih sınırları."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from services.lrs_examples import LRSExamplesMixin, _month_start, _period_predicate
+
+UTC = timezone.utc
+
+
+def _dt(year, month, day=15):
+    return datetime(year, month, day, tzinfo=UTC)
+
+
+def _pred(kind=None, months=None, years=None, year=None, month=None, season="", anchor=None):
+    return _period_predicate(kind, months, years, year, month, season, anchor)
+
+
+@pytest.mark.parametrize(
+    "year, month, expected",
+    [
+        (2024, 1, (2024, 1)),
+        (2024, 12, (2024, 12)),
+        (2024, 13, (2025, 1)),
+        (2024, 15, (2025, 3)),
+        (2024, 0, (2023, 12)),
+    ],
+)
+def test_month_start(year, month, expected):
+    assert _month_start(year, month) == datetime(*expected, 1, tzinfo=UTC)
+
+
+def test_period_predicate_unknown_kind_requires_date():
+    pred = _pred(kind="decade")
+    assert pred(_dt(2020, 1))
+    assert not pred(None)
+
+
+def test_period_predicate_year():
+    pred = _pred(kind="year", year="2024")
+    assert pred(_dt(2024, 6))
+    assert not pred(_dt(2023, 6))
+    assert not pred(None)
+
+
+def test_period_predicate_month():
+    with_year = _pred(kind="month", month=3, year=2024)
+    assert with_year(_dt(2024, 3))
+    assert not with_year(_dt(2023, 3))
+
+    any_year = _pred(kind="month", month=3)
+    assert any_year(_dt(2023, 3)) and any_year(_dt(2024, 3))
+    assert not any_year(_dt(2024, 4))
+
+
+def test_period_predicate_winter_spans_previous_december():
+    pred = _pred(kind="season", season="winter", year=2024)
+    assert pred(_dt(2023, 12))
+    assert pred(_dt(2024, 2))
+    assert not pred(_dt(2024, 12))
+    assert not pred(_dt(2024, 3))
+
+
+def test_period_predicate_season_without_year():
+    pred = _pred(kind="season", season="summer")
+    assert pred(_dt(2019, 7)) and pred(_dt(2024, 8))
+    assert not pred(_dt(2024, 9))
+
+
+def test_period_predicate_last_n_months():
+    anchor = _dt(2024, 6, 30)
+    pred = _pred(kind="last_n_months", months=2, anchor=anchor)
+    assert pred(anchor - timedelta(days=60))
+    assert not pred(anchor - timedelta(days=61))
+
+    # anchor yoksa yalnızca tarih varlığı aranır
+    assert _pred(kind="last_n_months", months=2)(_dt(2000, 1))
+
+
+class _Examples(LRSExamplesMixin):
+    def __init__(self, anchor=None):
+        self.anchor = anchor
+
+    def _get_latest_business_date(self):
+        return self.anchor
+
+
+@pytest.mark.parametrize(
+    "period, expected",
+    [
+        ({"kind": "year", "year": 2024}, ((2024, 1), (2025, 1))),
+        ({"kind": "month", "year": 2024, "month": 12}, ((2024, 12), (2025, 1))),
+        ({"kind": "season", "year": 2024, "season": "winter"}, ((2023, 12), (2024, 3))),
+        ({"kind": "season", "year": 2024, "season": "Autumn"}, ((2024, 9), (2024, 12))),
+    ],
+)
+def test_period_date_bounds(period, expected):
+    lo, hi = expected
+    assert _Examples()._period_date_bounds(period) == (
+        datetime(*lo, 1, tzinfo=UTC),
+        datetime(*hi, 1, tzinfo=UTC),
+    )
+
+
+@pytest.mark.parametrize(
+    "period",
+    [
+        None,
+        {"kind": "month", "month": 3},
+        {"kind": "month", "year": 2024, "month": 13},
+        {"kind": "season", "year": 2024, "season": "monsoon"},
+        {"kind": "decade", "year": 2024},
+        {"kind": "last_n_months", "months": "x"},
+    ],
+)
+def test_period_date_bounds_not_a_range(period):
+    assert _Examples(anchor=_dt(2024, 6))._period_date_bounds(period) is None
+
+
+def test_period_date_bounds_last_n():
+    anchor = _dt(2024, 6, 30)
+    examples = _Examples(anchor=anchor)
+    assert examples._period_date_bounds({"kind": "last_n_months", "months": 3}) == (
+        anchor - timedelta(days=90),
+        None,
+    )
+    assert examples._period_date_bounds({"kind": "last_n_years", "years": 1}) == (
+        anchor - timedelta(days=365),
+        None,
+    )
+    assert _Examples()._period_date_bounds({"kind": "last_n_years", "years": 1}) is None
+
+
+@pytest.mark.parametrize(
+    "period",
+    [
+        {"kind": "year", "year": 2024},
+        {"kind": "month", "year": 2024, "month": 2},
+        {"kind": "season", "year": 2024, "season": "winter"},
+        {"kind": "season", "year": 2024, "season": "summer"},
+    ],
+)
+def test_period_date_bounds_agree_with_predicate(period):
+    lo, hi = _Examples()._period_date_bounds(period)
+    pred = _pred(
+        kind=period["kind"],
+        year=period.get("year"),
+        month=period.get("month"),
+        season=period.get("season", ""),
+    )
+    day = datetime(2022, 1, 1, tzinfo=UTC)
+    while day < datetime(2027, 1, 1, tzinfo=UTC):
+        assert pred(day) == (lo <= day < hi), day
+        day += timedelta(days=1)
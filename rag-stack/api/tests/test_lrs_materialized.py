@@ -0,0 +1,261 @@
+"""
+lrs_materialized: sunucu tarafı normalize ifadesi ↔ normalize_tr ve
+change stream maintainer'ının resume / yeniden deneme davranışı.
+
+_norm_expr'in kullandığı aggregation operatörleri burada küçük bir
+yorumlayıcıyla değerlendirilir; sonuç Python'daki normalize_tr ile
+birebir aynı olmalı (materialNameNorm / vehicleModelNorm filtreleri
+normalize_tr çıktısıyla regex eşleştirilir).
+"""
+
+import re
+
+import pytest
+from pymongo.errors import AutoReconnect, OperationFailure
+
+from services import lrs_materialized
+from services.lrs_materialized import _RESUME_TOKEN_ID, _STATE_COLLECTION, _norm_expr
+from services.xapi_nlp.nlp_utils import normalize_tr
+
+
+def _type(v):
+    if v is None:
+        return "null"
+    if isinstance(v, str):
+        return "string"
+    return type(v).__name__
+
+
+def _eval(expr, env):
+    """_norm_expr'in kullandığı operatör alt kümesi için MongoDB semantiği."""
+    if isinstance(expr, str):
+        if expr.startswith("$$"):
+            return env[expr[2:]]
+        return expr
+    if isinstance(expr, list):
+        return [_eval(e, env) for e in expr]
+    if not isinstance(expr, dict):
+        return expr
+
+    (op, arg), = expr.items()
+    if op == "$let":
+        scope = dict(env)
+        scope.update({k: _eval(v, env) for k, v in arg["vars"].items()})
+        return _eval(arg["in"], scope)
+    if op == "$cond":
+        cond, then, other = arg
+        return _eval(then, env) if _eval(cond, env) else _eval(other, env)
+    if op == "$eq":
+        a, b = _eval(arg, env)
+        return a == b
+    if op == "$ne":
+        a, b = _eval(arg, env)
+        return a != b
+    if op == "$type":
+        return _type(_eval(arg, env))
+    if op == "$replaceAll":
+        return _eval(arg["input"], env).replace(arg["find"], arg["replacement"])
+    if op == "$toLower":
+        # MongoDB yalnızca ASCII harfleri küçültür
+        return "".join(c.lower() if c.isascii() else c for c in _eval(arg, env))
+    if op == "$strLenCP":
+        return len(_eval(arg, env))
+    if op == "$range":
+        start, end = _eval(arg, env)
+        return list(range(start, end))
+    if op == "$substrCP":
+        s, i, n = _eval(arg, env)
+        return s[i:i + n]
+    if op == "$concat":
+        return "".join(_eval(arg, env))
+    if op == "$regexMatch":
+        return re.search(arg["regex"], _eval(arg["input"], env)) is not None
+    if op == "$split":
+        s, sep = _eval(arg, env)
+        return s.split(sep)
+    if op == "$filter":
+        items = _eval(arg["input"], env)
+        return [x for x in items if _eval(arg["cond"], {**env, "this": x})]
+    if op == "$reduce":
+        value = _eval(arg["initialValue"], env)
+        for x in _eval(arg["input"], env):
+            value = _eval(arg["in"], {**env, "value": value, "this": x})
+        return value
+    raise NotImplementedError(op)
+
+
+def _server_norm(text):
+    return _eval(_norm_expr("$$input"), {"input": text})
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "FİLTRE",
+        "YAĞ FİLTRESİ",
+        "ŞANZIMAN YAĞI",
+        "ÇAMURLUK ÖN SAĞ",
+        "GÜNEŞLİK",
+        "ırmak ISITICI İTİCİ",
+        "TGS 18.440 4x2 BLS",
+        "  Lion's   Coach—L  ",
+        "Ölçüm/Ünite-İç",
+        "",
+    ],
+)
+def test_norm_expr_matches_normalize_tr(text):
+    assert _server_norm(text) == normalize_tr(text)
+
+
+def test_normalize_tr_folds_dotted_capital_i():
+    assert normalize_tr("FİLTRE") == "filtre"
+    assert normalize_tr("İç Dikiz") == "ic dikiz"
+
+
+def test_norm_expr_non_string_is_null():
+    assert _server_norm(None) is None
+    assert _server_norm(12) is None
+
+
+# ---------------------------------------------------------------------------
+# Maintainer (sahte koleksiyon / change stream)
+# ---------------------------------------------------------------------------
+
+
+class _UpdateResult:
+    modified_count = 0
+
+
+class _State:
+    def __init__(self):
+        self.docs = {}
+
+    def find_one(self, query):
+        return self.docs.get(query["_id"])
+
+    def update_one(self, query, update, upsert=False):
+        self.docs[query["_id"]] = {"_id": query["_id"], **update["$set"]}
+
+    def delete_one(self, query):
+        self.docs.pop(query["_id"], None)
+
+
+class _Database:
+    def __init__(self):
+        self.state = _State()
+
+    def __getitem__(self, name):
+        assert name == _STATE_COLLECTION
+        return self.state
+
+
+class _Stream:
+    def __init__(self, coll, start):
+        self.coll = coll
+        self.n = start
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @property
+    def resume_token(self):
+        return {"n": self.n}
+
+    def try_next(self):
+        if not self.coll.pending:
+            lrs_materialized._maintainer_stop.set()
+            return None
+        self.n += 1
+        return {"documentKey": {"_id": self.coll.pending.pop(0)}}
+
+
+class _Statements:
+    """watch() sırayla errors'daki hataları fırlatır, sonra pending insert'leri verir."""
+
+    def __init__(self, pending=(), errors=(), database=None):
+        self.database = database or _Database()
+        self.pending = list(pending)
+        self.errors = list(errors)
+        self.watch_tokens = []
+        self.updated = []
+        self.backfills = 0
+
+    def watch(self, pipeline, max_await_time_ms=None, start_after=None):
+        self.watch_tokens.append(start_after)
+        if self.errors:
+            raise self.errors.pop(0)
+        return _Stream(self, (start_after or {}).get("n", 0))
+
+    def update_one(self, query, update):
+        self.updated.append(query["_id"])
+
+    def update_many(self, query, update):
+        self.backfills += 1
+        return _UpdateResult()
+
+
+@pytest.fixture
+def maintainer(monkeypatch):
+    monkeypatch.setattr(lrs_materialized, "_MAINTAIN_FIELDS", True)
+    monkeypatch.setattr(lrs_materialized, "_MAINTAIN_HLL", False)
+    monkeypatch.setattr(lrs_materialized, "_RETRY_MIN_DELAY", 0)
+    monkeypatch.setattr(lrs_materialized, "LRS_MATERIALIZE_BACKFILL_INTERVAL", 0)
+
+    def run(coll):
+        lrs_materialized._maintainer_stop.clear()
+        lrs_materialized._maintain_loop(coll)
+        return coll
+
+    yield run
+    lrs_materialized._maintainer_stop.clear()
+
+
+def _saved_token(coll):
+    doc = coll.database.state.docs.get(_RESUME_TOKEN_ID)
+    return doc and doc["token"]
+
+
+def test_maintainer_retries_transient_errors_and_saves_token(maintainer):
+    coll = maintainer(_Statements(pending=["a", "b"], errors=[AutoReconnect("blip")]))
+
+    assert coll.watch_tokens == [None, None]
+    assert coll.updated == ["a", "b"]
+    assert coll.backfills == 1
+    assert _saved_token(coll) == {"n": 2}
+
+
+def test_maintainer_resumes_from_saved_token(maintainer):
+    first = maintainer(_Statements(pending=["a", "b"]))
+    second = maintainer(_Statements(pending=["c"], database=first.database))
+
+    assert second.watch_tokens == [{"n": 2}]
+    assert second.updated == ["c"]
+    assert _saved_token(second) == {"n": 3}
+
+
+def test_maintainer_restarts_when_history_is_lost(maintainer):
+    db = _Database()
+    db.state.docs[_RESUME_TOKEN_ID] = {"_id": _RESUME_TOKEN_ID, "token": {"n": 7}}
+    coll = maintainer(
+        _Statements(
+            pending=["a"],
+            errors=[OperationFailure("history lost", code=286)],
+            database=db,
+        )
+    )
+
+    assert coll.watch_tokens == [{"n": 7}, None]
+    assert coll.updated == ["a"]
+    assert _saved_token(coll) == {"n": 1}
+
+
+def test_maintainer_falls_back_to_backfill_without_change_streams(maintainer):
+    coll = maintainer(
+        _Statements(errors=[OperationFailure("replica set required", code=40573)])
+    )
+
+    assert coll.watch_tokens == [None]
+    assert coll.backfills == 1
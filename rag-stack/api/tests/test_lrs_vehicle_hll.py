@@ -0,0 +1,37 @@
+"""lrs_vehicle_hll: register (index, rank) ve kardinalite tahmini."""
+
+import pytest
+
+from services.lrs_vehicle_hll import _HLL_M, _HLL_P, _estimate, _register, _vehicle_name
+
+
+def test_vehicle_name():
+    assert _vehicle_name("vehicle/70886") == "70886"
+    assert _vehicle_name("  70886 ") == "70886"
+    assert _vehicle_name("vehicle/") is None
+    assert _vehicle_name(None) is None
+    assert _vehicle_name(70886) is None
+
+
+def test_register_is_deterministic_and_in_range():
+    for i in range(1000):
+        idx, rank = _register(str(i))
+        assert (idx, rank) == _register(str(i))
+        assert 0 <= idx < _HLL_M
+        assert 1 <= rank <= 64 - _HLL_P + 1
+
+
+def test_estimate_empty_sketch():
+    assert _estimate({}) == 0
+
+
+@pytest.mark.parametrize("n", [10, 1000, 20000])
+def test_estimate_accuracy(n):
+    registers = {}
+    for i in range(n):
+        idx, rank = _register(f"vehicle-{i}")
+        key = str(idx)
+        registers[key] = max(registers.get(key, 0), rank)
+
+    # standart hata ~%1.6; 4 sigma
+    assert abs(_estimate(registers) - n) <= max(1, 0.065 * n)